@@ -0,0 +1,103 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from braces.views import GroupRequiredMixin
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.http import Http404
+from django.utils.functional import SimpleLazyObject
+
+from .models import Cliente, Fotografo
+
+
+# Dados de acesso do usuário logado (grupos, clientes e fotógrafo), carregados
+# uma vez e guardados no cache até algo deles mudar (ver signals.py).
+# Disponível como request.principal nas views e nos templates
+class Principal:
+
+    def __init__(self, user_id=None, superusuario=False, grupos=(), clientes=(), fotografo_id=None):
+        self.user_id = user_id
+        self.superusuario = superusuario
+        self.grupos = frozenset(grupos)
+        self.clientes = frozenset(clientes)
+        self.fotografo_id = fotografo_id
+
+    def tem_grupo(self, *grupos):
+        return self.superusuario or bool(self.grupos.intersection(grupos))
+
+    @property
+    def e_admin(self):
+        return self.tem_grupo("Admin")
+
+    @property
+    def e_fotografo(self):
+        return self.fotografo_id is not None
+
+
+def chave_principal(user_id):
+    return f"paginas:principal:{user_id}"
+
+
+def carregar_principal(user):
+    return Principal(
+        user_id=user.pk,
+        superusuario=user.is_superuser,
+        grupos=user.groups.values_list("name", flat=True),
+        # lido do principal mesmo nas views que usam a réplica (ver banco.py),
+        # porque o resultado fica em cache
+        clientes=Cliente.objects.using(DEFAULT_DB_ALIAS).filter(user=user).values_list("pk", flat=True),
+        fotografo_id=Fotografo.objects.using(DEFAULT_DB_ALIAS).filter(user=user).values_list("pk", flat=True).first(),
+    )
+
+
+def obter_principal(user):
+    if not user.is_authenticated:
+        return Principal()
+    tempo = getattr(settings, "PAGINAS_PRINCIPAL_TIMEOUT", 60 * 15)
+    if not tempo:
+        return carregar_principal(user)
+    principal = cache.get(chave_principal(user.pk))
+    # is_superuser vem do próprio usuário, que já foi carregado na requisição
+    if principal is None or principal.superusuario != user.is_superuser:
+        principal = carregar_principal(user)
+        cache.set(chave_principal(user.pk), principal, tempo)
+    return principal
+
+
+def limpar_principal(user_id):
+    cache.delete(chave_principal(user_id))
+
+
+# Funciona no WSGI e no ASGI: no modo assíncrono get_response devolve uma
+# corrotina, que o Django aguarda. O principal continua sendo carregado sob
+# demanda; as views assíncronas o carregam numa thread (ver assincrono.py)
+class PrincipalMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        request.principal = SimpleLazyObject(lambda: obter_principal(request.user))
+        return self.get_response(request)
+
+
+# GroupRequiredMixin do braces lendo os grupos de request.principal
+# em vez de consultar user.groups a cada requisição
+class GrupoRequeridoMixin(GroupRequiredMixin):
+
+    def check_membership(self, groups):
+        if self.request.user.is_superuser:
+            return True
+        return self.request.principal.tem_grupo(*groups)
+
+
+class FotografoDoUsuarioMixin:
+
+    def get_fotografo_id(self):
+        fotografo_id = self.request.principal.fotografo_id
+        if fotografo_id is None:
+            raise Http404("Nenhum fotógrafo vinculado a este usuário.")
+        return fotografo_id
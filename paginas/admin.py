@@ -1,8 +1,12 @@
 from django.contrib import admin
-from.models import Cliente, Fotografo, Sessao, Portfolio
+from.models import Cliente, Fotografo, Sessao, SessaoArquivada, Portfolio, Link, Tarefa, Lembrete
 
 # Register your models here.
 admin.site.register(Cliente)
 admin.site.register(Fotografo)
 admin.site.register(Sessao)
+admin.site.register(SessaoArquivada)
 admin.site.register(Portfolio)
+admin.site.register(Link)
+admin.site.register(Tarefa)
+admin.site.register(Lembrete)
@@ -0,0 +1,117 @@
+from calendar import monthrange
+from datetime import date, datetime, time, timedelta
+
+from django.utils import timezone
+
+from .models import Sessao
+
+
+# Horário de atendimento considerado na busca por horários livres
+INICIO_EXPEDIENTE = time(8, 0)
+FIM_EXPEDIENTE = time(20, 0)
+# Os horários sugeridos começam sempre em múltiplos deste passo
+PASSO = timedelta(minutes=30)
+
+
+def blocos_ocupados(fotografo, inicio, fim):
+    # Uma consulta pelo índice (fotografo, inicio); sobreposições são unidas
+    intervalos = (
+        Sessao.objects.conflitantes(fotografo, inicio, fim)
+        .order_by("inicio")
+        .values_list("inicio", "fim")
+    )
+    blocos = []
+    for ini, fi in intervalos:
+        if blocos and ini <= blocos[-1][1]:
+            blocos[-1][1] = max(blocos[-1][1], fi)
+        else:
+            blocos.append([ini, fi])
+    return [tuple(bloco) for bloco in blocos]
+
+
+def _expediente(dia):
+    return (
+        timezone.make_aware(datetime.combine(dia, INICIO_EXPEDIENTE)),
+        timezone.make_aware(datetime.combine(dia, FIM_EXPEDIENTE)),
+    )
+
+
+def _alinhar(momento, base):
+    passos = -(-(momento - base) // PASSO)
+    return base + passos * PASSO
+
+
+# Próximos horários livres do fotógrafo entre data_inicial e data_final
+# (inclusive) com a duração pedida em horas
+def horarios_livres(fotografo, data_inicial, data_final, duracao, limite=10, a_partir_de=None):
+    duracao = timedelta(hours=duracao)
+    inicio_periodo = _expediente(data_inicial)[0]
+    fim_periodo = _expediente(data_final)[1]
+    ocupados = blocos_ocupados(fotografo, inicio_periodo, fim_periodo)
+    a_partir_de = a_partir_de or timezone.now()
+
+    livres = []
+    dia = data_inicial
+    i = 0
+    while dia <= data_final and len(livres) < limite:
+        abertura, fechamento = _expediente(dia)
+        candidato = _alinhar(max(abertura, a_partir_de), abertura)
+        while candidato + duracao <= fechamento and len(livres) < limite:
+            # descarta blocos que já terminaram antes do candidato
+            while i < len(ocupados) and ocupados[i][1] <= candidato:
+                i += 1
+            if i < len(ocupados) and ocupados[i][0] < candidato + duracao:
+                candidato = _alinhar(ocupados[i][1], abertura)
+                continue
+            livres.append((candidato, candidato + duracao))
+            candidato += PASSO
+        dia += timedelta(days=1)
+    return livres
+
+
+def _hora(momento):
+    return timezone.localtime(momento).strftime("%H:%M")
+
+
+# Blocos livres e ocupados de cada dia do mês, calculados com uma consulta
+def disponibilidade_do_mes(fotografo, ano, mes):
+    primeiro_dia = date(ano, mes, 1)
+    ultimo_dia = date(ano, mes, monthrange(ano, mes)[1])
+    inicio_mes = timezone.make_aware(datetime.combine(primeiro_dia, time.min))
+    fim_mes = timezone.make_aware(datetime.combine(ultimo_dia + timedelta(days=1), time.min))
+    ocupados = blocos_ocupados(fotografo, inicio_mes, fim_mes)
+
+    dias = []
+    i = 0
+    dia = primeiro_dia
+    while dia <= ultimo_dia:
+        comeco_dia = timezone.make_aware(datetime.combine(dia, time.min))
+        fim_dia = comeco_dia + timedelta(days=1)
+        abertura, fechamento = _expediente(dia)
+
+        while i < len(ocupados) and ocupados[i][1] <= comeco_dia:
+            i += 1
+        do_dia = []
+        j = i
+        while j < len(ocupados) and ocupados[j][0] < fim_dia:
+            do_dia.append((max(ocupados[j][0], comeco_dia), min(ocupados[j][1], fim_dia)))
+            j += 1
+
+        livres = []
+        cursor = abertura
+        for ini, fi in do_dia:
+            if ini > cursor and cursor < fechamento:
+                livres.append((cursor, min(ini, fechamento)))
+            cursor = max(cursor, fi)
+        if cursor < fechamento:
+            livres.append((cursor, fechamento))
+
+        dias.append({
+            "data": dia.isoformat(),
+            # 24:00 marca um bloco que continua no dia seguinte
+            "ocupados": [[_hora(ini), _hora(fi) if fi < fim_dia else "24:00"] for ini, fi in do_dia],
+            "livres": [[_hora(ini), _hora(fi)] for ini, fi in livres],
+        })
+        dia += timedelta(days=1)
+
+    return {"fotografo": getattr(fotografo, "pk", fotografo), "ano": ano, "mes": mes, "dias": dias}
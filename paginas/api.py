@@ -0,0 +1,109 @@
+import hashlib
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, HttpResponse, JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+
+
+LIMITE_MAXIMO = 1000
+
+
+class Embutido:
+
+    def __init__(self, chave, modelo, campos):
+        self.chave = chave  # campo da linha com a chave estrangeira
+        self.modelo = modelo
+        self.campos = campos
+
+
+# API JSON somente leitura. Usar antes da classe de listagem, como o
+# ExportarCsvMixin, para herdar o get_queryset e as mesmas regras de acesso:
+# class SessaoApi(ApiMixin, SessaoList)
+#
+# As linhas saem direto de values(), sem instanciar modelos. ?campos=a,b
+# restringe as colunas do SELECT; ?incluir=cliente embute os objetos
+# relacionados com uma consulta por relação (não uma por linha); ?limite=
+# muda o tamanho da página (até LIMITE_MAXIMO) e ?depois= continua a partir
+# do cursor devolvido em "proxima". A ETag é o hash da resposta: com
+# If-None-Match igual a resposta é 304, sem corpo
+class ApiMixin:
+    campos = ()  # nomes dos campos do modelo, que são também os nomes no JSON
+    embutidos = {}  # nome em ?incluir= -> Embutido
+
+    def handle_no_permission(self):
+        if not self.request.user.is_authenticated:
+            return JsonResponse({"erro": "Autenticação necessária."}, status=401)
+        return JsonResponse({"erro": "Acesso negado."}, status=403)
+
+    def lista_do_parametro(self, nome, validos, padrao):
+        valor = self.request.GET.get(nome)
+        if valor is None:
+            return list(padrao)
+        nomes = [item.strip() for item in valor.split(",") if item.strip()]
+        desconhecidos = [item for item in nomes if item not in validos]
+        if desconhecidos:
+            raise ValueError(f"{nome}: valor(es) desconhecido(s): {', '.join(desconhecidos)}.")
+        return nomes
+
+    def get_paginate_by(self, queryset):
+        limite = self.request.GET.get("limite", "")
+        return min(int(limite), LIMITE_MAXIMO) if limite.isdigit() and int(limite) > 0 else self.paginate_by
+
+    # as linhas são dicts; "pk" no cursor é a coluna id
+    def chave_cursor(self, linha):
+        return [linha["id" if campo == "pk" else campo] for campo in self.ordenacao_cursor]
+
+    def embutir(self, linhas, incluir):
+        for nome in incluir:
+            embutido = self.embutidos[nome]
+            ids = {linha[embutido.chave] for linha in linhas} - {None}
+            objetos = {
+                objeto["id"]: objeto for objeto in embutido.modelo.objects.filter(pk__in=ids).values(*embutido.campos)
+            }
+            for linha in linhas:
+                linha[nome] = objetos.get(linha[embutido.chave])
+
+    def get(self, request, *args, **kwargs):
+        try:
+            campos = self.lista_do_parametro("campos", self.campos, self.campos)
+            incluir = self.lista_do_parametro("incluir", self.embutidos, ())
+        except ValueError as erro:
+            return JsonResponse({"erro": str(erro)}, status=400)
+
+        # colunas que o cursor e os embutidos precisam, mesmo fora de ?campos=;
+        # saem da resposta depois de usadas
+        necessarias = ["id", *(c for c in self.ordenacao_cursor if c != "pk"), *(self.embutidos[n].chave for n in incluir)]
+        extras = [coluna for coluna in dict.fromkeys(necessarias) if coluna not in campos]
+        qs = self.get_queryset().values(*campos, *extras)
+
+        if "pk" in kwargs:
+            linhas = list(qs.filter(pk=kwargs["pk"]))
+            if not linhas:
+                return JsonResponse({"erro": "Não encontrado."}, status=404)
+        else:
+            try:
+                _, pagina, linhas, _ = self.paginate_queryset(qs, self.get_paginate_by(qs))
+            except Http404:
+                return JsonResponse({"erro": "Cursor inválido."}, status=400)
+
+        self.embutir(linhas, incluir)
+        if extras:
+            for linha in linhas:
+                for coluna in extras:
+                    del linha[coluna]
+        if "pk" in kwargs:
+            dados = linhas[0]
+        else:
+            dados = {"resultados": linhas, "proxima": pagina.proximo, "anterior": pagina.anterior}
+
+        conteudo = json.dumps(dados, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(",", ":")).encode()
+        etag = f'"{hashlib.sha256(conteudo).hexdigest()[:32]}"'
+        resposta = get_conditional_response(request, etag=etag)
+        if resposta is None:
+            resposta = HttpResponse(conteudo, content_type="application/json")
+        resposta["ETag"] = etag
+        # dados do usuário logado: só o navegador/app guarda, e sempre revalida
+        patch_cache_control(resposta, private=True, no_cache=True)
+        patch_vary_headers(resposta, ["Cookie"])
+        return resposta
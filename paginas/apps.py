@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class PaginasConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "paginas"
+
+    def ready(self):
+        from . import banco, signals  # noqa: F401
@@ -0,0 +1,110 @@
+from django.db import connections, router, transaction
+from django.db.models import DateTimeField, Value
+from django.utils import timezone
+
+from . import busca
+from .caches import limpar_disponibilidade
+from .models import Fotografo, Lembrete, Sessao, SessaoArquivada
+
+
+# Arquivo das sessões: a tabela de Sessao guarda só a agenda ativa, e o que
+# não muda mais vai para SessaoArquivada, que só é lida quando a listagem ou
+# a exportação pedem ?arquivadas=1.
+#
+# - arquivar(): as finalizadas com data anterior a antes_de, em lotes, cada
+#   lote numa transação. Continuam contando nos resumos (é histórico), mas
+#   saem da busca, da disponibilidade e do feed da agenda.
+# - excluir(): exclusão lógica pela SessaoDelete. A sessão é excluída de Sessao
+#   como antes (signals: resumos, agenda, busca), mas uma cópia fica no
+#   arquivo marcada como excluída, até o cliente ou o fotógrafo ser excluído
+
+LOTE = 1000
+CAMPOS = [
+    "id", "data", "horario", "tipo", "duracao", "valor", "finalizado",
+    "cliente_id", "fotografo_id", "cadastrado_por_id", "inicio", "fim", "atualizado_em",
+]
+
+
+def excluir(sessao):
+    with transaction.atomic():
+        SessaoArquivada.objects.create(**{campo: getattr(sessao, campo) for campo in CAMPOS}, excluida=True)
+        sessao.delete()
+
+
+# As cópias das excluídas não seguram o cliente nem o fotógrafo: quem as
+# excluiu já abriu mão delas. Chamado pelas views de exclusão antes do delete()
+def descartar_excluidas(**filtro):
+    SessaoArquivada.objects.filter(excluida=True, **filtro).delete()
+
+
+# INSERT ... SELECT: as linhas são copiadas dentro do banco, sem passar por
+# objetos Python (várias vezes mais rápido que values() + bulk_create())
+def copiar(ids, agora, banco):
+    connection = connections[banco]
+    select, parametros = Sessao.objects.using(banco).filter(pk__in=ids).values(
+        *CAMPOS, arquivada_em=Value(agora, output_field=DateTimeField()), excluida=Value(False)
+    ).query.sql_with_params()
+    meta = SessaoArquivada._meta
+    colunas = ", ".join(
+        connection.ops.quote_name(meta.get_field(campo).column) for campo in [*CAMPOS, "arquivada_em", "excluida"]
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {connection.ops.quote_name(meta.db_table)} ({colunas}) {select}", parametros)
+
+
+# DELETE direto, sem signals: o delete() normal tiraria as sessões dos resumos,
+# e elas continuam contando (agora pelo arquivo). Os lembretes são excluídos antes
+def remover(ids, banco):
+    if not ids:
+        return
+    connection = connections[banco]
+    meta = Sessao._meta
+    tabela, chave = connection.ops.quote_name(meta.db_table), connection.ops.quote_name(meta.pk.column)
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {tabela} WHERE {chave} IN ({', '.join(['%s'] * len(ids))})", ids)
+
+
+def arquivar_lote(ids, antes_de):
+    agora = timezone.now()
+    # tudo no principal, inclusive as leituras (com réplicas, db_for_read pode
+    # apontar para uma delas)
+    banco = router.db_for_write(Sessao)
+    with transaction.atomic(using=banco):
+        # o primeiro comando escreve: no SQLite a transação já pega a trava de
+        # escrita (ver SessaoFormMixin); o feed .ics usa essa data na ETag
+        Fotografo.objects.filter(sessao__pk__in=ids).update(agenda_atualizada_em=agora)
+        linhas = list(
+            Sessao.objects.using(banco).filter(pk__in=ids, finalizado=True, data__lt=antes_de)
+            .values_list("pk", "fotografo_id", "inicio", "fim")
+        )
+        ids = [pk for pk, *_ in linhas]
+        copiar(ids, agora, banco)
+        Lembrete.objects.filter(sessao_id__in=ids).delete()
+        remover(ids, banco)
+        busca.remover([Sessao(pk=pk) for pk in ids], using=banco)
+
+    meses = set()
+    for _, fotografo_id, inicio, fim in linhas:
+        local_inicio, local_fim = timezone.localtime(inicio), timezone.localtime(fim)
+        chave = (fotografo_id, local_inicio.year, local_inicio.month, local_fim.year, local_fim.month)
+        if chave not in meses:
+            meses.add(chave)
+            limpar_disponibilidade(fotografo_id, inicio, fim)
+    return len(ids)
+
+
+def arquivar(antes_de, lote=LOTE):
+    banco = router.db_for_write(Sessao)
+    total = 0
+    ultimo = 0
+    while True:
+        # pelo índice da chave primária, sempre adiante: um lote que não
+        # arquivou tudo (sessão reaberta no meio) não trava o próximo
+        ids = list(
+            Sessao.objects.using(banco).filter(pk__gt=ultimo, finalizado=True, data__lt=antes_de)
+            .order_by("pk").values_list("pk", flat=True)[:lote]
+        )
+        if not ids:
+            return total
+        total += arquivar_lote(ids, antes_de)
+        ultimo = ids[-1]
@@ -0,0 +1,46 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+
+
+# Listagens assíncronas, usadas no lugar das síncronas quando o projeto roda
+# no ASGI (PAGINAS_ASYNC, ligado em pw2025/asgi.py). Usar antes da classe de
+# listagem, que fornece queryset, template e regras de acesso:
+# class PortfolioListAsync(ListaAssincronaMixin, PortfolioList)
+#
+# A página é lida com o ORM assíncrono e corre junto, com asyncio.gather, com
+# o que contexto_extra() buscar (filtros em cache, por exemplo). O template é
+# renderizado pelo Django numa thread, como nas views síncronas
+class ViewAssincronaMixin:
+
+    async def dispatch(self, request, *args, **kwargs):
+        # usuário e principal são carregados sob demanda, o que consulta o
+        # banco; dentro do loop isso é proibido, então acontece numa thread
+        await sync_to_async(lambda: request.principal.user_id)()
+        resposta = super().dispatch(request, *args, **kwargs)
+        # o LoginRequiredMixin devolve o redirecionamento para o login sem await
+        return await resposta if asyncio.iscoroutine(resposta) else resposta
+
+
+class ListaAssincronaMixin(ViewAssincronaMixin):
+
+    async def contexto_extra(self):
+        return {}
+
+    async def get(self, request, *args, **kwargs):
+        self.object_list = self.get_queryset()
+        (_, pagina, itens, paginada), extra = await asyncio.gather(
+            self.apaginate_queryset(self.object_list, self.get_paginate_by(self.object_list)),
+            self.contexto_extra(),
+        )
+        context = {
+            "view": self,
+            "paginator": None,
+            "page_obj": pagina,
+            "is_paginated": paginada,
+            "object_list": itens,
+            self.context_object_name: itens,
+            **(self.extra_context or {}),
+            **extra,
+        }
+        return self.render_to_response(context)
@@ -0,0 +1,99 @@
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+# Aplica settings.PAGINAS_SQLITE_PRAGMAS em cada conexão nova com o SQLite
+@receiver(connection_created)
+def configurar_sqlite(sender, connection, **kwargs):
+    if connection.vendor != "sqlite":
+        return
+    pragmas = getattr(settings, "PAGINAS_SQLITE_PRAGMAS", {})
+    with connection.cursor() as cursor:
+        for nome, valor in pragmas.items():
+            cursor.execute(f"PRAGMA {nome} = {valor}")
+
+
+############################################################################ RÉPLICAS #############
+
+# Leituras das listagens e relatórios vão para uma réplica (settings.PAGINAS_REPLICAS);
+# todo o resto, e toda escrita, fica no banco principal. As views que podem ler
+# da réplica marcam usar_replica = True.
+#
+# Depois de um POST o navegador recebe um cookie curto (PAGINAS_REPLICA_JANELA
+# segundos) e, enquanto ele existir, lê do principal: quem acabou de cadastrar
+# uma sessão a vê na listagem mesmo que a réplica ainda não tenha recebido
+
+COOKIE_PRIMARIO = "paginas_primario"
+
+_ler_da_replica = ContextVar("paginas_ler_da_replica", default=False)
+
+
+class RoteadorReplica:
+
+    def db_for_read(self, model, **hints):
+        replicas = getattr(settings, "PAGINAS_REPLICAS", [])
+        # sessão e usuário (carregados sob demanda durante a view) ficam no principal
+        if replicas and _ler_da_replica.get() and model._meta.app_label == "paginas":
+            return random.choice(replicas)
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    # a réplica recebe o esquema pela replicação, não pelo migrate
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in getattr(settings, "PAGINAS_REPLICAS", [])
+
+
+class ReplicaMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.assincrono = iscoroutinefunction(get_response)
+        if self.assincrono:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.assincrono:
+            return self.__acall__(request)
+        marca = _ler_da_replica.set(False)
+        try:
+            resposta = self.get_response(request)
+        finally:
+            _ler_da_replica.reset(marca)
+        return self.marcar_escrita(request, resposta)
+
+    async def __acall__(self, request):
+        marca = _ler_da_replica.set(False)
+        try:
+            resposta = await self.get_response(request)
+        finally:
+            _ler_da_replica.reset(marca)
+        return self.marcar_escrita(request, resposta)
+
+    def marcar_escrita(self, request, resposta):
+        if request.method not in ("GET", "HEAD", "OPTIONS"):
+            janela = getattr(settings, "PAGINAS_REPLICA_JANELA", 10)
+            resposta.set_cookie(COOKIE_PRIMARIO, "1", max_age=janela, httponly=True, samesite="Lax")
+        return resposta
+
+    # vale para a requisição inteira, inclusive a renderização do template
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, "view_class", None)
+        if (
+            getattr(view_class, "usar_replica", False)
+            and request.method in ("GET", "HEAD")
+            and COOKIE_PRIMARIO not in request.COOKIES
+        ):
+            _ler_da_replica.set(True)
@@ -0,0 +1,163 @@
+import re
+from itertools import islice
+
+from django.apps import apps as apps_do_projeto
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+
+# Índice de busca textual de clientes, fotógrafos, sessões e fotos do
+# portfólio. No SQLite é uma tabela FTS5; no PostgreSQL, uma tabela com
+# tsvector e índice GIN (precisa da extensão unaccent). Nos dois casos a
+# busca ignora acentos e casa prefixos ("joa" encontra "João").
+#
+# Cada objeto é uma linha com id = pk * 10 + código do tipo, então atualizar
+# ou remover um objeto é uma operação pela chave primária. dono_id guarda o
+# usuário dono do objeto (vazio no portfólio, que é público) para a busca
+# já descartar o que o usuário não vê. Mantido por signals.py; bulk_create
+# não dispara signals, então quem usa chama indexar() ou reindexar()
+
+TABELA = "paginas_busca"
+LOTE = 2000
+
+
+def so_digitos(texto):
+    return re.sub(r"\D", "", texto or "")
+
+
+def juntar(*partes):
+    return " ".join(parte for parte in partes if parte)
+
+
+class Tipo:
+
+    def __init__(self, codigo, modelo, texto, dono):
+        self.codigo = codigo
+        self.modelo = modelo
+        self.texto = texto
+        self.dono = dono
+
+
+TIPOS = {
+    # o telefone também vai só com os dígitos, para "2799" achar "(27) 99..."
+    "cliente": Tipo(1, "Cliente", lambda o: juntar(o.nome, o.telefone, so_digitos(o.telefone)), lambda o: o.user_id),
+    "fotografo": Tipo(2, "Fotografo", lambda o: juntar(o.nome, o.especialidade), lambda o: o.user_id),
+    "sessao": Tipo(3, "Sessao", lambda o: o.tipo, lambda o: o.cadastrado_por_id),
+    "portfolio": Tipo(4, "Portfolio", lambda o: o.descricao, lambda o: None),
+}
+TIPO_DO_MODELO = {tipo.modelo: nome for nome, tipo in TIPOS.items()}
+
+
+def chave(tipo, pk):
+    return pk * 10 + tipo.codigo
+
+
+def termos(texto):
+    return re.findall(r"\w+", texto or "")
+
+
+############################################################################ ESTRUTURA #############
+
+def criar_indice(connection):
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+            cursor.execute(
+                f"CREATE TABLE {TABELA} (id bigint PRIMARY KEY, dono_id integer NULL, documento tsvector NOT NULL)"
+            )
+            cursor.execute(f"CREATE INDEX {TABELA}_documento_idx ON {TABELA} USING gin (documento)")
+        else:
+            # remove_diacritics ignora acentos; prefix cria índices para prefixos de 2 e 3 letras
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE {TABELA} USING fts5("
+                "texto, dono_id UNINDEXED, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+            )
+
+
+def remover_indice(connection):
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {TABELA}")
+
+
+############################################################################ ESCRITA #############
+
+def _gravar(connection, linhas, novas=False):
+    if not linhas:
+        return
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.executemany(
+                f"INSERT INTO {TABELA} (id, dono_id, documento) "
+                "VALUES (%s, %s, to_tsvector('simple', unaccent(%s))) "
+                "ON CONFLICT (id) DO UPDATE SET dono_id = EXCLUDED.dono_id, documento = EXCLUDED.documento",
+                [(id_, dono, texto) for id_, texto, dono in linhas],
+            )
+        else:
+            # FTS5 não tem upsert
+            if not novas:
+                cursor.executemany(f"DELETE FROM {TABELA} WHERE rowid = %s", [(id_,) for id_, _, _ in linhas])
+            cursor.executemany(f"INSERT INTO {TABELA} (rowid, texto, dono_id) VALUES (%s, %s, %s)", linhas)
+
+
+def indexar(objetos, using=DEFAULT_DB_ALIAS):
+    linhas = []
+    for obj in objetos:
+        tipo = TIPOS[TIPO_DO_MODELO[obj._meta.object_name]]
+        linhas.append((chave(tipo, obj.pk), tipo.texto(obj) or "", tipo.dono(obj)))
+    _gravar(connections[using], linhas)
+
+
+def remover(objetos, using=DEFAULT_DB_ALIAS):
+    ids = [(chave(TIPOS[TIPO_DO_MODELO[obj._meta.object_name]], obj.pk),) for obj in objetos]
+    coluna = "id" if connections[using].vendor == "postgresql" else "rowid"
+    with connections[using].cursor() as cursor:
+        cursor.executemany(f"DELETE FROM {TABELA} WHERE {coluna} = %s", ids)
+
+
+# Refaz o índice inteiro numa transação só (no SQLite, fazer commit a cada
+# lote deixa o FTS5 várias vezes mais lento). Também usado pela migração,
+# com os modelos históricos
+def reindexar(using=DEFAULT_DB_ALIAS, apps=apps_do_projeto):
+    connection = connections[using]
+    total = 0
+    with transaction.atomic(using=using):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {TABELA}")
+        for tipo in TIPOS.values():
+            objetos = apps.get_model("paginas", tipo.modelo)._default_manager.using(using).iterator(chunk_size=LOTE)
+            while lote := list(islice(objetos, LOTE)):
+                linhas = [(chave(tipo, obj.pk), tipo.texto(obj) or "", tipo.dono(obj)) for obj in lote]
+                _gravar(connection, linhas, novas=True)
+                total += len(lote)
+    return total
+
+
+############################################################################ BUSCA #############
+
+# Chaves primárias do tipo que casam com o texto, das mais relevantes para as
+# menos. Com dono_id, só objetos desse usuário ou públicos
+def buscar(texto, tipo, dono_id=None, limite=10, deslocamento=0, using=DEFAULT_DB_ALIAS):
+    palavras = termos(texto)
+    if not palavras:
+        return []
+    tipo = TIPOS[tipo]
+    connection = connections[using]
+    filtro_dono = " AND (dono_id = %s OR dono_id IS NULL)" if dono_id is not None else ""
+    dono = [dono_id] if dono_id is not None else []
+    if connection.vendor == "postgresql":
+        consulta = " & ".join(f"{palavra}:*" for palavra in palavras)
+        sql = (
+            f"SELECT id FROM {TABELA} WHERE documento @@ to_tsquery('simple', unaccent(%s)) AND id %% 10 = %s"
+            f"{filtro_dono} ORDER BY ts_rank(documento, to_tsquery('simple', unaccent(%s))) DESC, id LIMIT %s OFFSET %s"
+        )
+        parametros = [consulta, tipo.codigo, *dono, consulta, limite, deslocamento]
+    else:
+        # cada palavra entre aspas: o texto do usuário não vira sintaxe do FTS5
+        consulta = " ".join(f'"{palavra}"*' for palavra in palavras)
+        sql = (
+            f"SELECT rowid FROM {TABELA} WHERE {TABELA} MATCH %s AND rowid %% 10 = %s"
+            f"{filtro_dono} ORDER BY rank, rowid LIMIT %s OFFSET %s"
+        )
+        parametros = [consulta, tipo.codigo, *dono, limite, deslocamento]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, parametros)
+        return [id_ // 10 for (id_,) in cursor.fetchall()]
@@ -0,0 +1,112 @@
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.db import DEFAULT_DB_ALIAS
+from django.http import HttpResponse
+from django.utils import timezone, translation
+
+from .agenda import disponibilidade_do_mes
+from .models import Fotografo
+
+
+CHAVE_FOTOGRAFOS_FILTRO = "paginas:fotografos-filtro"
+
+
+# Página inteira em cache para visitantes não logados, por idioma e caminho.
+# Usuários logados veem o menu completo e sempre passam pela view. Com
+# querystring também: cada ?a=1, ?a=2... seria mais uma página no cache, e
+# qualquer um poderia enchê-lo e expulsar as de verdade
+class PaginaPublicaCacheMixin:
+    tempo_cache = 60 * 10
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method != "GET" or request.user.is_authenticated or request.GET:
+            return super().dispatch(request, *args, **kwargs)
+
+        chave = f"paginas:pagina:{translation.get_language()}:{request.path}"
+        guardada = cache.get(chave)
+        if guardada is not None:
+            conteudo, tipo = guardada
+            return HttpResponse(conteudo, content_type=tipo)
+
+        resposta = super().dispatch(request, *args, **kwargs)
+        if resposta.status_code == 200:
+            resposta.add_post_render_callback(
+                lambda r: cache.set(chave, (r.content, r["Content-Type"]), self.tempo_cache)
+            )
+        return resposta
+
+
+# Lista usada no filtro da galeria. Muda pouco, então fica em cache até
+# algum fotógrafo ser salvo ou excluído (ver signals.py)
+def fotografos_para_filtro():
+    fotografos = cache.get(CHAVE_FOTOGRAFOS_FILTRO)
+    if fotografos is None:
+        # lido do principal: a réplica pode estar atrasada e o cache duraria uma hora
+        fotografos = list(
+            Fotografo.objects.using(DEFAULT_DB_ALIAS).order_by("nome").values("id", "nome", "especialidade")
+        )
+        cache.set(CHAVE_FOTOGRAFOS_FILTRO, fotografos, 60 * 60)
+    return fotografos
+
+
+def limpar_cache_fotografos():
+    cache.delete(CHAVE_FOTOGRAFOS_FILTRO)
+
+
+def especialidades_para_filtro(fotografos=None):
+    if fotografos is None:
+        fotografos = fotografos_para_filtro()
+    return sorted({f["especialidade"] for f in fotografos if f["especialidade"]})
+
+
+# Versões para as views assíncronas (assincrono.py). A leitura do cache roda
+# numa thread à parte (thread_sensitive=False), ao mesmo tempo que as
+# consultas da requisição; só a falta de cache vai para a thread do banco
+async def afotografos_para_filtro():
+    fotografos = await sync_to_async(cache.get, thread_sensitive=False)(CHAVE_FOTOGRAFOS_FILTRO)
+    if fotografos is None:
+        fotografos = await sync_to_async(fotografos_para_filtro)()
+    return fotografos
+
+
+def chave_disponibilidade(fotografo_id, ano, mes):
+    return f"paginas:disponibilidade:{fotografo_id}:{ano}-{mes:02d}"
+
+
+# Disponibilidade do mês em cache até uma sessão daquele mês mudar.
+# Devolve None se o fotógrafo não existe
+def disponibilidade_em_cache(fotografo_id, ano, mes):
+    chave = chave_disponibilidade(fotografo_id, ano, mes)
+    dados = cache.get(chave)
+    if dados is None:
+        if not Fotografo.objects.filter(pk=fotografo_id).exists():
+            return None
+        dados = disponibilidade_do_mes(fotografo_id, ano, mes)
+        cache.set(chave, dados, 60 * 60 * 24)
+    return dados
+
+
+async def adisponibilidade_em_cache(fotografo_id, ano, mes):
+    dados = await sync_to_async(cache.get, thread_sensitive=False)(chave_disponibilidade(fotografo_id, ano, mes))
+    if dados is None:
+        dados = await sync_to_async(disponibilidade_em_cache)(fotografo_id, ano, mes)
+    return dados
+
+
+def limpar_disponibilidade(fotografo_id, inicio, fim):
+    # uma sessão pode atravessar a virada do mês
+    chaves = set()
+    for momento in (inicio, fim - timedelta(microseconds=1)):
+        local = timezone.localtime(momento)
+        chaves.add(chave_disponibilidade(fotografo_id, local.year, local.month))
+    cache.delete_many(chaves)
+
+
+# Cards de fotógrafo e portfólio ({% cache %} nos templates). A chave inclui
+# atualizado_em, então uma edição já gera um card novo; na exclusão o card
+# antigo é removido pelos signals
+def limpar_card(nome, *vary_on):
+    cache.delete(make_template_fragment_key(nome, vary_on))
@@ -0,0 +1,81 @@
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.utils import timezone
+
+from .models import Sessao
+
+
+# Geração do feed iCalendar (RFC 5545) de um fotógrafo, evento por evento,
+# para ser enviado com StreamingHttpResponse
+
+# Sessões mais antigas que isso ficam fora do feed
+HISTORICO = timedelta(days=365)
+
+
+# A janela do feed anda uma vez por dia, à meia-noite, e não a cada segundo:
+# devolve o início dela e o momento em que andou pela última vez, que entram
+# na ETag e no Last-Modified junto com Fotografo.agenda_atualizada_em
+def janela():
+    meia_noite = timezone.make_aware(datetime.combine(timezone.localdate(), time.min))
+    return meia_noite - HISTORICO, meia_noite
+
+
+def escapar(texto):
+    return (
+        str(texto or "")
+        .replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\n", "\\n")
+    )
+
+
+def formatar_data(momento):
+    return momento.astimezone(dt_timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def linha(texto):
+    # linhas de no máximo 75 bytes; a continuação começa com espaço
+    dados = texto.encode()
+    partes = []
+    while len(dados) > 75:
+        corte = 75 if not partes else 74
+        # não corta no meio de um caractere UTF-8
+        while corte > 0 and (dados[corte] & 0xC0) == 0x80:
+            corte -= 1
+        partes.append(dados[:corte].decode())
+        dados = dados[corte:]
+    partes.append(dados.decode())
+    return "\r\n ".join(partes) + "\r\n"
+
+
+def gerar_ics(fotografo_id, nome, desde):
+    yield linha("BEGIN:VCALENDAR")
+    yield linha("VERSION:2.0")
+    yield linha("PRODID:-//Hermsdorff & Capel Studio//pw2025//PT-BR")
+    yield linha("CALSCALE:GREGORIAN")
+    yield linha(f"X-WR-CALNAME:{escapar(f'Sessões - {nome}')}")
+
+    sessoes = (
+        Sessao.objects.filter(fotografo_id=fotografo_id, inicio__gte=desde)
+        .order_by("inicio")
+        .values_list("pk", "inicio", "fim", "tipo", "cliente__nome", "cliente__telefone", "finalizado", "atualizado_em")
+    )
+    for pk, inicio, fim, tipo, cliente, telefone, finalizado, atualizado_em in sessoes.iterator(chunk_size=1000):
+        descricao = f"Cliente: {cliente} ({telefone or 'sem telefone'})"
+        if finalizado:
+            descricao += "\nSessão finalizada"
+        yield (
+            linha("BEGIN:VEVENT")
+            + linha(f"UID:sessao-{pk}@pw2025")
+            + linha(f"DTSTAMP:{formatar_data(atualizado_em)}")
+            + linha(f"LAST-MODIFIED:{formatar_data(atualizado_em)}")
+            + linha(f"DTSTART:{formatar_data(inicio)}")
+            + linha(f"DTEND:{formatar_data(fim)}")
+            + linha(f"SUMMARY:{escapar(f'{tipo} - {cliente}')}")
+            + linha(f"DESCRIPTION:{escapar(descricao)}")
+            + linha("STATUS:CONFIRMED")
+            + linha("END:VEVENT")
+        )
+
+    yield linha("END:VCALENDAR")
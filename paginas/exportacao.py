@@ -0,0 +1,66 @@
+import csv
+import heapq
+from datetime import date, time
+from decimal import Decimal
+
+from django.http import StreamingHttpResponse
+
+
+# Buffer falso: o csv.writer devolve a linha pronta em vez de guardá-la
+class Eco:
+    def write(self, valor):
+        return valor
+
+
+def formatar_valor(valor):
+    if valor is None:
+        return ""
+    if isinstance(valor, bool):
+        return "Sim" if valor else "Não"
+    if isinstance(valor, date):
+        return valor.strftime("%d/%m/%Y")
+    if isinstance(valor, time):
+        return valor.strftime("%H:%M")
+    if isinstance(valor, Decimal):
+        return str(valor).replace(".", ",")
+    valor = str(valor)
+    # evita que o Excel interprete o texto como fórmula
+    if valor[:1] in ("=", "+", "-", "@"):
+        return "'" + valor
+    return valor
+
+
+# Exporta o queryset da listagem em CSV, linha por linha, sem montar o arquivo
+# em memória. Usar antes da classe de listagem para herdar as mesmas regras
+# de acesso: class SessaoExportar(ExportarCsvMixin, SessaoList)
+class ExportarCsvMixin:
+    colunas = []  # pares (cabeçalho, campo)
+    nome_arquivo = "exportacao.csv"
+    tamanho_lote = 2000
+
+    # mais de um queryset (sessões ativas e arquivadas, por exemplo): as
+    # linhas são intercaladas pela ordenação da listagem
+    def querysets(self):
+        return [self.get_queryset()]
+
+    def linhas(self):
+        campos = [campo for _, campo in self.colunas]
+        chave = len(self.ordenacao_cursor)
+        fontes = [
+            qs.order_by(*self.ordenacao_cursor).values_list(*self.ordenacao_cursor, *campos).iterator(chunk_size=self.tamanho_lote)
+            for qs in self.querysets()
+        ]
+        for linha in heapq.merge(*fontes, key=lambda linha: linha[:chave]):
+            yield [formatar_valor(valor) for valor in linha[chave:]]
+
+    def conteudo(self):
+        # ";" e BOM para o arquivo abrir direto no Excel em português
+        escritor = csv.writer(Eco(), delimiter=";")
+        yield "\ufeff" + escritor.writerow([cabecalho for cabecalho, _ in self.colunas])
+        for linha in self.linhas():
+            yield escritor.writerow(linha)
+
+    def get(self, request, *args, **kwargs):
+        resposta = StreamingHttpResponse(self.conteudo(), content_type="text/csv; charset=utf-8")
+        resposta["Content-Disposition"] = f'attachment; filename="{self.nome_arquivo}"'
+        return resposta
@@ -1,6 +1,10 @@
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
 from django import forms
+from django.urls import reverse_lazy
+from django.utils import timezone
+
+from .models import Cliente, Fotografo, Sessao, intervalo_da_sessao
 
 
 # Crie uma classe de formulário para o cadastro de usuários
@@ -27,3 +31,100 @@ class UsuarioCadastroForm(UserCreationForm):
         if User.objects.filter(email=email).exists():
             raise forms.ValidationError("Este email já está em uso.")
         return email
+
+
+# Select que renderiza só a opção escolhida; as demais são buscadas no
+# servidor enquanto o usuário digita (ver OpcoesSessaoView e sessao_form.html).
+# Assim o formulário não carrega todos os clientes a cada GET ou POST inválido
+class AutocompleteSelect(forms.Select):
+
+    def __init__(self, url, attrs=None):
+        super().__init__(attrs)
+        self.url = url
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context["widget"]["attrs"]["data-autocomplete"] = str(self.url)
+        return context
+
+    def optgroups(self, name, value, attrs=None):
+        todas = self.choices
+        selecionados = [v for v in value if str(v).isdigit()]
+        escolhas = [("", todas.field.empty_label)] if todas.field.empty_label is not None else []
+        if selecionados:
+            escolhas += [todas.choice(obj) for obj in todas.queryset.filter(pk__in=selecionados)]
+        self.choices = escolhas
+        try:
+            return super().optgroups(name, value, attrs)
+        finally:
+            self.choices = todas
+
+
+# O que o usuário pode escolher em cada campo da sessão: o queryset e o dono
+# usado para filtrar o índice de busca (None = sem filtro). Clientes seguem a
+# regra da listagem de clientes; qualquer fotógrafo pode ser escolhido
+def opcoes_da_sessao(campo, usuario):
+    if campo == "cliente":
+        if usuario is None or usuario.is_staff or usuario.is_superuser:
+            return Cliente.objects.all(), None
+        return Cliente.objects.filter(user=usuario), usuario.pk
+    return Fotografo.objects.all(), None
+
+
+# Formulário de sessão usado no cadastro e na edição.
+# Recusa sessões que se sobrepõem a outra do mesmo fotógrafo
+class SessaoForm(forms.ModelForm):
+
+    class Meta:
+        model = Sessao
+        fields = ["data", "horario", "duracao", "tipo", "valor", "finalizado", "cliente", "fotografo"]
+        widgets = {
+            "cliente": AutocompleteSelect(reverse_lazy("opcoes-sessao", args=["cliente"])),
+            "fotografo": AutocompleteSelect(reverse_lazy("opcoes-sessao", args=["fotografo"])),
+        }
+
+    # Com o usuário, os campos só aceitam o que ele pode escolher; a validação
+    # de cada campo é uma consulta pela chave primária enviada
+    def __init__(self, *args, usuario=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        for campo in ("cliente", "fotografo"):
+            self.fields[campo].queryset = opcoes_da_sessao(campo, usuario)[0]
+
+    def clean(self):
+        cleaned_data = super().clean()
+        self.verificar_conflito()
+        return cleaned_data
+
+    # Também é chamado pela view dentro da transação, com o fotógrafo travado
+    def verificar_conflito(self):
+        dados = self.cleaned_data
+        if not all(dados.get(campo) for campo in ("data", "horario", "duracao", "fotografo")):
+            return True
+        inicio, fim = intervalo_da_sessao(dados["data"], dados["horario"], dados["duracao"])
+        conflito = (
+            Sessao.objects.conflitantes(dados["fotografo"], inicio, fim)
+            .exclude(pk=self.instance.pk)
+            .order_by("inicio")
+            .first()
+        )
+        if conflito is None:
+            return True
+        self.add_error(None, forms.ValidationError(
+            "O fotógrafo já tem uma sessão de %(inicio)s até %(fim)s.",
+            code="conflito",
+            params={
+                "inicio": timezone.localtime(conflito.inicio).strftime("%d/%m/%Y %H:%M"),
+                "fim": timezone.localtime(conflito.fim).strftime("%H:%M"),
+            },
+        ))
+        return False
+
+
+# Upload da importação em massa (ver importacao.py)
+class ImportacaoForm(forms.Form):
+    tipo = forms.ChoiceField(choices=[
+        ("clientes", "Clientes (nome, telefone)"),
+        ("fotografos", "Fotógrafos (usuario, email, nome, especialidade, telefone, foto_perfil)"),
+        ("portfolio", "Portfólio (fotografo, foto_url, descricao)"),
+    ])
+    arquivo = forms.FileField(help_text="Arquivo CSV com cabeçalho, separado por vírgula ou ponto e vírgula.")
@@ -0,0 +1,245 @@
+import codecs
+import csv
+import io
+from itertools import chain, islice
+
+from django import forms
+from django.contrib.auth.models import User, Group
+from django.db import transaction
+
+from . import busca
+from .acesso import limpar_principal
+from .caches import limpar_cache_fotografos
+from .models import Cliente, Fotografo, Portfolio
+
+
+# Importação em massa a partir de CSV (separado por "," ou ";").
+# O arquivo é lido linha a linha; cada lote é validado com os mesmos
+# formulários do cadastro e gravado com bulk_create em uma transação, para
+# não segurar a escrita do banco (e os agendamentos) durante o arquivo todo:
+# um erro inesperado no meio deixa gravados os lotes anteriores.
+# Linhas com erro não são gravadas e entram no relatório.
+
+TAMANHO_LOTE = 500
+# o Excel no Windows salva CSV em cp1252
+CODIFICACOES = ["utf-8-sig", "cp1252"]
+BLOCO = 64 * 1024
+
+
+class Relatorio:
+
+    def __init__(self):
+        self.criados = 0
+        self.erros = []  # pares (número da linha, mensagem)
+
+    def erro(self, linha, mensagem):
+        self.erros.append((linha, mensagem))
+
+
+def ler_csv(arquivo):
+    primeira = arquivo.readline()
+    delimitador = ";" if primeira.count(";") > primeira.count(",") else ","
+    leitor = csv.reader(chain([primeira], arquivo), delimiter=delimitador)
+    cabecalho = [coluna.strip().lower() for coluna in next(leitor, [])]
+    # a linha 1 é o cabeçalho
+    for numero, valores in enumerate(leitor, start=2):
+        if any(valor.strip() for valor in valores):
+            yield numero, dict(zip(cabecalho, (valor.strip() for valor in valores)))
+
+
+def mensagens(form):
+    return "; ".join(
+        f"{campo}: {' '.join(erros)}" if campo != "__all__" else " ".join(erros)
+        for campo, erros in form.errors.items()
+    )
+
+
+class Importador:
+    form_class = None
+
+    def __init__(self, usuario):
+        self.usuario = usuario
+
+    # Ajustes feitos na instância já validada (dono, relações...)
+    def preparar(self, obj, form):
+        pass
+
+    # Validações que precisam olhar o lote inteiro; devolve os itens aceitos
+    def validar_lote(self, itens, relatorio):
+        return itens
+
+    def gravar(self, forms):
+        objetos = []
+        for form in forms:
+            self.preparar(form.instance, form)
+            objetos.append(form.instance)
+        self.form_class._meta.model.objects.bulk_create(objetos, batch_size=TAMANHO_LOTE)
+        # bulk_create não dispara post_save
+        busca.indexar(objetos)
+
+    def processar_lote(self, lote, relatorio):
+        itens = []
+        for numero, dados in lote:
+            form = self.form_class(dados)
+            if form.is_valid():
+                itens.append((numero, form))
+            else:
+                relatorio.erro(numero, mensagens(form))
+        itens = self.validar_lote(itens, relatorio)
+        if not itens:
+            return
+        with transaction.atomic():
+            self.gravar([form for _, form in itens])
+        relatorio.criados += len(itens)
+
+    def importar_texto(self, arquivo):
+        relatorio = Relatorio()
+        linhas = ler_csv(arquivo)
+        while True:
+            lote = list(islice(linhas, TAMANHO_LOTE))
+            if not lote:
+                return relatorio
+            self.processar_lote(lote, relatorio)
+
+    def importar(self, arquivo):
+        if isinstance(arquivo, (bytes, bytearray)):
+            arquivo = io.BytesIO(arquivo)
+        if isinstance(arquivo, io.TextIOBase):
+            return self.importar_texto(arquivo)
+        texto = io.TextIOWrapper(arquivo, encoding=detectar_codificacao(arquivo), newline="")
+        try:
+            return self.importar_texto(texto)
+        finally:
+            texto.detach()  # sem fechar o arquivo enviado
+
+
+# A codificação é escolhida antes de gravar qualquer lote: o arquivo é
+# decodificado inteiro, em blocos, com cada uma de CODIFICACOES até uma servir.
+# UnicodeDecodeError quando nenhuma serve
+def detectar_codificacao(arquivo):
+    for codificacao in CODIFICACOES:
+        arquivo.seek(0)
+        decodificador = codecs.getincrementaldecoder(codificacao)()
+        try:
+            while bloco := arquivo.read(BLOCO):
+                decodificador.decode(bloco)
+            decodificador.decode(b"", final=True)
+        except UnicodeDecodeError:
+            if codificacao == CODIFICACOES[-1]:
+                raise
+            continue
+        arquivo.seek(0)
+        return codificacao
+
+
+############################################################################ CLIENTES #############
+
+class ClienteImportacaoForm(forms.ModelForm):
+    class Meta:
+        model = Cliente
+        fields = ["nome", "telefone"]
+
+
+class ImportadorClientes(Importador):
+    form_class = ClienteImportacaoForm
+
+    def preparar(self, obj, form):
+        obj.user = self.usuario
+
+    def gravar(self, forms):
+        super().gravar(forms)
+        # a lista de clientes do usuário mudou e bulk_create não dispara post_save
+        transaction.on_commit(lambda: limpar_principal(self.usuario.pk))
+
+
+############################################################################ FOTÓGRAFOS #############
+
+# Cada fotógrafo tem o próprio usuário (OneToOne), criado junto sem senha
+# utilizável; o acesso é liberado depois pelo "esqueci minha senha" ou pelo admin
+class FotografoImportacaoForm(forms.ModelForm):
+    usuario = forms.CharField(max_length=150)
+    email = forms.EmailField(required=False)
+
+    class Meta:
+        model = Fotografo
+        fields = ["nome", "especialidade", "telefone", "foto_perfil"]
+
+
+class ImportadorFotografos(Importador):
+    form_class = FotografoImportacaoForm
+
+    def validar_lote(self, itens, relatorio):
+        nomes = [form.cleaned_data["usuario"] for _, form in itens]
+        existentes = set(User.objects.filter(username__in=nomes).values_list("username", flat=True))
+        aceitos = []
+        vistos = set()
+        for numero, form in itens:
+            usuario = form.cleaned_data["usuario"]
+            if usuario in existentes or usuario in vistos:
+                relatorio.erro(numero, f"usuario: o usuário \"{usuario}\" já existe.")
+                continue
+            vistos.add(usuario)
+            aceitos.append((numero, form))
+        return aceitos
+
+    def gravar(self, forms):
+        usuarios = []
+        for form in forms:
+            usuario = User(username=form.cleaned_data["usuario"], email=form.cleaned_data["email"])
+            usuario.set_unusable_password()
+            usuarios.append(usuario)
+        User.objects.bulk_create(usuarios, batch_size=TAMANHO_LOTE)
+
+        ids = dict(User.objects.filter(username__in=[u.username for u in usuarios]).values_list("username", "id"))
+        for form, usuario in zip(forms, usuarios):
+            form.instance.user_id = ids[usuario.username]
+        Fotografo.objects.bulk_create([form.instance for form in forms], batch_size=TAMANHO_LOTE)
+        busca.indexar([form.instance for form in forms])
+
+        grupo, _ = Group.objects.get_or_create(name="Fotógrafo")
+        User.groups.through.objects.bulk_create(
+            [User.groups.through(user_id=user_id, group_id=grupo.pk) for user_id in ids.values()],
+            batch_size=TAMANHO_LOTE,
+        )
+        # bulk_create não dispara post_save
+        transaction.on_commit(limpar_cache_fotografos)
+
+
+############################################################################ PORTFÓLIO #############
+
+# A coluna "fotografo" aceita o id do fotógrafo ou o nome de usuário dele
+class PortfolioImportacaoForm(forms.ModelForm):
+    fotografo = forms.CharField(max_length=150)
+
+    class Meta:
+        model = Portfolio
+        fields = ["foto_url", "descricao"]
+
+
+class ImportadorPortfolio(Importador):
+    form_class = PortfolioImportacaoForm
+
+    def validar_lote(self, itens, relatorio):
+        referencias = {form.cleaned_data["fotografo"] for _, form in itens}
+        # isdigit() aceita "²" e outros dígitos que int() recusa
+        ids = [int(ref) for ref in referencias if ref.isascii() and ref.isdigit()]
+        encontrados = {str(pk): pk for pk in Fotografo.objects.filter(pk__in=ids).values_list("pk", flat=True)}
+        for pk, username in Fotografo.objects.filter(user__username__in=referencias).values_list("pk", "user__username"):
+            encontrados.setdefault(username, pk)
+
+        aceitos = []
+        for numero, form in itens:
+            referencia = form.cleaned_data["fotografo"]
+            if referencia not in encontrados:
+                relatorio.erro(numero, f"fotografo: \"{referencia}\" não encontrado.")
+                continue
+            form.instance.fotografo_id = encontrados[referencia]
+            aceitos.append((numero, form))
+        return aceitos
+
+
+IMPORTADORES = {
+    "clientes": ImportadorClientes,
+    "fotografos": ImportadorFotografos,
+    "portfolio": ImportadorPortfolio,
+}
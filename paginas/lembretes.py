@@ -0,0 +1,248 @@
+import json
+import queue
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from http.client import HTTPConnection, HTTPException, HTTPSConnection
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from .models import Lembrete, Sessao
+
+
+# Lembretes das sessões que começam nas próximas PAGINAS_LEMBRETES_HORAS,
+# enviados por "manage.py enviar_lembretes" (cron). As sessões saem de uma
+# consulta só, pela faixa do índice de inicio, e cada usuário (o dono do
+# cliente e o do fotógrafo) recebe uma mensagem com todas as suas sessões.
+#
+# Antes de enviar, cada par sessão/destinatário é reservado com uma linha em
+# Lembrete; as já reservadas ficam de fora nas rodadas seguintes, mesmo se a
+# anterior caiu no meio (fica "enviando": melhor perder um lembrete que
+# mandar dois). Só os que falharam com certeza voltam a ser tentados, e as
+# reservas que a rodada não chega a usar (sessão remarcada, sem email) são
+# desfeitas.
+#
+# O envio é feito por PAGINAS_LEMBRETES_CONEXOES threads, cada uma com uma
+# conexão aberta com o backend que é usada para vários lotes de
+# PAGINAS_LEMBRETES_LOTE mensagens
+
+TEMPO_LIMITE = 30
+LOTE_BANCO = 500
+
+
+class Mensagem:
+
+    def __init__(self, destinatario_id, email):
+        self.destinatario_id = destinatario_id
+        self.email = email
+        self.sessoes = []
+        self.lembretes = []
+
+    @property
+    def assunto(self):
+        quantidade = len(self.sessoes)
+        return "Lembrete: 1 sessão agendada" if quantidade == 1 else f"Lembrete: {quantidade} sessões agendadas"
+
+    @property
+    def texto(self):
+        linhas = [
+            f"{timezone.localtime(sessao['inicio']).strftime('%d/%m/%Y %H:%M')} - {sessao['tipo']} - "
+            f"cliente {sessao['cliente']}, fotógrafo {sessao['fotografo']}"
+            for sessao in self.sessoes
+        ]
+        return "Sessões agendadas:\n\n" + "\n".join(linhas) + "\n"
+
+    def como_dict(self):
+        return {"email": self.email, "lembretes": self.lembretes, "sessoes": self.sessoes}
+
+
+# Um backend por conexão: enviar(lote) devolve o erro de cada mensagem,
+# "" quando foi entregue
+
+class BackendEmail:
+
+    def __init__(self):
+        self.conexao = get_connection(timeout=TEMPO_LIMITE)
+
+    def enviar(self, mensagens):
+        erros = []
+        for mensagem in mensagens:
+            # uma a uma na mesma conexão, para saber exatamente quais foram
+            try:
+                # send_messages() sem open() antes abre e fecha uma conexão a cada chamada
+                self.conexao.open()
+                self.conexao.send_messages([EmailMessage(mensagem.assunto, mensagem.texto, to=[mensagem.email])])
+            except Exception as erro:
+                self.conexao.close()  # reabre na próxima
+                erros.append(str(erro) or erro.__class__.__name__)
+            else:
+                erros.append("")
+        return erros
+
+    def fechar(self):
+        self.conexao.close()
+
+
+# POST de cada lote como uma lista JSON numa conexão HTTP mantida aberta.
+# Os ids em "lembretes" permitem ao receptor ignorar um lote repetido
+class BackendWebhook:
+
+    def __init__(self):
+        partes = urlsplit(settings.PAGINAS_LEMBRETES_WEBHOOK_URL)
+        classe = HTTPSConnection if partes.scheme == "https" else HTTPConnection
+        self.conexao = classe(partes.hostname, partes.port, timeout=TEMPO_LIMITE)
+        self.caminho = (partes.path or "/") + (f"?{partes.query}" if partes.query else "")
+
+    def enviar(self, mensagens):
+        corpo = json.dumps([mensagem.como_dict() for mensagem in mensagens], cls=DjangoJSONEncoder).encode()
+        try:
+            self.conexao.request("POST", self.caminho, corpo, {"Content-Type": "application/json"})
+            resposta = self.conexao.getresponse()
+            resposta.read()
+        except (OSError, HTTPException) as erro:
+            self.conexao.close()
+            erro = str(erro) or erro.__class__.__name__
+        else:
+            erro = "" if 200 <= resposta.status < 300 else f"HTTP {resposta.status}"
+        return [erro] * len(mensagens)
+
+    def fechar(self):
+        self.conexao.close()
+
+
+BACKENDS = {
+    "email": BackendEmail,
+    "webhook": BackendWebhook,
+}
+
+
+def sessoes_proximas(agora, horas):
+    return (
+        Sessao.objects.filter(inicio__gte=agora, inicio__lt=agora + timedelta(hours=horas), finalizado=False)
+        .order_by("inicio", "pk")
+        .values(
+            "id", "inicio", "tipo", "cliente__nome", "fotografo__nome",
+            "cliente__user_id", "cliente__user__email", "fotografo__user_id", "fotografo__user__email",
+        )
+    )
+
+
+# Reserva os lembretes ainda não enviados e monta uma mensagem por destinatário
+def reservar(agora, horas):
+    fim = agora + timedelta(hours=horas)
+    na_faixa = Lembrete.objects.filter(inicio__gte=agora, inicio__lt=fim)
+    reservados = set(na_faixa.exclude(estado=Lembrete.FALHOU).values_list("sessao_id", "destinatario_id", "inicio"))
+
+    lote = uuid.uuid4().hex
+    sessoes, desejados, novos = {}, set(), []
+    for linha in sessoes_proximas(agora, horas):
+        sessoes[linha["id"]] = linha
+        destinatarios = {
+            linha["cliente__user_id"]: linha["cliente__user__email"],
+            linha["fotografo__user_id"]: linha["fotografo__user__email"],
+        }
+        for user_id, email in destinatarios.items():
+            if email and (linha["id"], user_id, linha["inicio"]) not in reservados:
+                desejados.add((linha["id"], user_id, linha["inicio"]))
+                novos.append(Lembrete(sessao_id=linha["id"], destinatario_id=user_id, inicio=linha["inicio"], lote=lote))
+    # outra rodada ao mesmo tempo: o que ela reservou primeiro fica com o lote dela
+    Lembrete.objects.bulk_create(novos, batch_size=LOTE_BANCO, ignore_conflicts=True)
+
+    # as que falharam, só das sessões que ainda estão na faixa, voltam
+    # conferindo a reserva que tinham (estado e lote): se outra rodada as pegou
+    # entre a leitura e o UPDATE, ficam com ela
+    falhas = {}
+    for pk, anterior, *chave in na_faixa.filter(estado=Lembrete.FALHOU).values_list(
+        "pk", "lote", "sessao_id", "destinatario_id", "inicio"
+    ):
+        if tuple(chave) in desejados:
+            falhas.setdefault(anterior, []).append(pk)
+    for anterior, pks in falhas.items():
+        for inicio in range(0, len(pks), LOTE_BANCO):
+            Lembrete.objects.filter(pk__in=pks[inicio:inicio + LOTE_BANCO], estado=Lembrete.FALHOU, lote=anterior).update(
+                estado=Lembrete.ENVIANDO, lote=lote, erro=""
+            )
+
+    emails = {}
+    for linha in sessoes.values():
+        emails[linha["cliente__user_id"]] = linha["cliente__user__email"]
+        emails[linha["fotografo__user_id"]] = linha["fotografo__user__email"]
+    mensagens, pulados = {}, []
+    for lembrete_id, sessao_id, user_id in Lembrete.objects.filter(lote=lote).values_list("id", "sessao_id", "destinatario_id"):
+        linha = sessoes.get(sessao_id)
+        if linha is None or not emails.get(user_id):
+            pulados.append(lembrete_id)  # a sessão saiu da faixa (foi remarcada)
+            continue
+        if user_id not in mensagens:
+            mensagens[user_id] = Mensagem(user_id, emails[user_id])
+        mensagens[user_id].lembretes.append(lembrete_id)
+        mensagens[user_id].sessoes.append({
+            "id": sessao_id,
+            "inicio": linha["inicio"],
+            "tipo": linha["tipo"],
+            "cliente": linha["cliente__nome"],
+            "fotografo": linha["fotografo__nome"],
+        })
+    # nada foi enviado por elas: sem a linha, uma rodada futura pode reservar de novo
+    for inicio in range(0, len(pulados), LOTE_BANCO):
+        Lembrete.objects.filter(pk__in=pulados[inicio:inicio + LOTE_BANCO], lote=lote).delete()
+    for mensagem in mensagens.values():
+        mensagem.sessoes.sort(key=lambda sessao: (sessao["inicio"], sessao["id"]))
+    return lote, list(mensagens.values())
+
+
+def despachar(mensagens, backend, conexoes, tamanho_lote):
+    lotes = queue.SimpleQueue()
+    for inicio in range(0, len(mensagens), tamanho_lote):
+        lotes.put(mensagens[inicio:inicio + tamanho_lote])
+
+    def trabalhar():
+        resultados = []
+        conexao = backend()
+        try:
+            while True:
+                try:
+                    lote = lotes.get_nowait()
+                except queue.Empty:
+                    return resultados
+                resultados.extend(zip(lote, conexao.enviar(lote)))
+        finally:
+            conexao.fechar()
+
+    conexoes = max(1, min(conexoes, -(-len(mensagens) // tamanho_lote)))
+    with ThreadPoolExecutor(conexoes) as executor:
+        return [resultado for futuro in [executor.submit(trabalhar) for _ in range(conexoes)] for resultado in futuro.result()]
+
+
+def gravar(lote, resultados):
+    agora = timezone.now()
+    entregues = [mensagem.destinatario_id for mensagem, erro in resultados if not erro]
+    for inicio in range(0, len(entregues), LOTE_BANCO):
+        Lembrete.objects.filter(lote=lote, destinatario_id__in=entregues[inicio:inicio + LOTE_BANCO]).update(
+            estado=Lembrete.ENVIADO, enviado_em=agora
+        )
+    for mensagem, erro in resultados:
+        if erro:
+            Lembrete.objects.filter(lote=lote, destinatario_id=mensagem.destinatario_id).update(
+                estado=Lembrete.FALHOU, erro=erro[:1000]
+            )
+
+
+# Devolve (mensagens enviadas, mensagens com erro, lembretes enviados)
+def enviar(horas=None, backend=None, conexoes=None, tamanho_lote=None, agora=None):
+    lote, mensagens = reservar(agora or timezone.now(), horas or settings.PAGINAS_LEMBRETES_HORAS)
+    if not mensagens:
+        return 0, 0, 0
+    resultados = despachar(
+        mensagens,
+        BACKENDS[backend or settings.PAGINAS_LEMBRETES_BACKEND],
+        conexoes or settings.PAGINAS_LEMBRETES_CONEXOES,
+        tamanho_lote or settings.PAGINAS_LEMBRETES_LOTE,
+    )
+    gravar(lote, resultados)
+    falhas = sum(bool(erro) for _, erro in resultados)
+    return len(resultados) - falhas, falhas, sum(len(mensagem.lembretes) for mensagem, erro in resultados if not erro)
@@ -0,0 +1,243 @@
+import asyncio
+import socket
+import ssl
+import time
+from urllib.parse import quote, urljoin, urlsplit
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .miniaturas import TAMANHO_MAXIMO_ORIGEM, endereco_permitido
+from .models import Fotografo, Link, Portfolio
+
+
+# Verificação das URLs de imagem cadastradas (fotos do portfólio e de perfil),
+# rodada por "manage.py verificar_links" fora das requisições. As URLs são
+# verificadas ao mesmo tempo com asyncio: no máximo PAGINAS_LINKS_CONEXOES
+# conexões abertas, PAGINAS_LINKS_POR_HOST por servidor e um intervalo mínimo
+# entre pedidos ao mesmo servidor. Cada URL recebe um HEAD e, se o servidor
+# não aceitar HEAD, um GET. Respostas 429/5xx e erros de conexão são repetidos
+# com espera dobrando a cada tentativa (ou a do Retry-After), e a espera vale
+# para o servidor inteiro.
+#
+# O resultado fica na tabela Link; a listagem do portfólio usa o campo
+# quebrado para esconder as fotos que não carregam sem verificar nada durante
+# a requisição
+
+TEMPO_LIMITE = 10
+TENTATIVAS = 3
+ESPERA_INICIAL = 1  # segundos; dobra a cada tentativa
+ESPERA_MAXIMA = 60
+REDIRECIONAMENTOS = 5
+LOTE = 1000
+
+REPETIR = {429, 500, 502, 503, 504}
+SEM_HEAD = {403, 405, 501}  # servidores que recusam HEAD mas atendem GET
+DEFINITIVOS = {404, 410}  # quebrado já na primeira vez
+FALHAS_PARA_QUEBRADO = 2  # os outros erros precisam se repetir
+
+
+class LinkRecusado(Exception):
+    pass
+
+
+class Resultado:
+
+    def __init__(self, status=None, tipo_conteudo="", tamanho=None, erro="", espera=None):
+        self.status = status
+        self.tipo_conteudo = tipo_conteudo
+        self.tamanho = tamanho
+        self.erro = erro
+        self.espera = espera  # Retry-After, em segundos
+
+    @property
+    def ok(self):
+        return self.status is not None and 200 <= self.status < 300 and self.tipo_conteudo.startswith("image/")
+
+
+class Host:
+
+    def __init__(self, conexoes, intervalo):
+        self.conexoes = asyncio.Semaphore(conexoes)
+        self.intervalo = intervalo
+        self.proximo = 0
+
+    async def aguardar_vez(self):
+        agora = time.monotonic()
+        espera = self.proximo - agora
+        self.proximo = max(agora, self.proximo) + self.intervalo
+        if espera > 0:
+            await asyncio.sleep(espera)
+
+    def adiar(self, segundos):
+        self.proximo = max(self.proximo, time.monotonic() + segundos)
+
+
+class Verificador:
+
+    def __init__(self, conexoes=None, por_host=None, intervalo=None, espera=ESPERA_INICIAL, tempo_limite=TEMPO_LIMITE):
+        self.conexoes = asyncio.Semaphore(conexoes or settings.PAGINAS_LINKS_CONEXOES)
+        self.por_host = por_host or settings.PAGINAS_LINKS_POR_HOST
+        self.intervalo = settings.PAGINAS_LINKS_INTERVALO if intervalo is None else intervalo
+        self.espera = espera
+        self.tempo_limite = tempo_limite
+        self.hosts = {}
+        self.enderecos = {}
+        self.contexto_ssl = ssl.create_default_context()
+
+    def host(self, nome):
+        if nome not in self.hosts:
+            self.hosts[nome] = Host(self.por_host, self.intervalo)
+        return self.hosts[nome]
+
+    async def resolver(self, nome, porta):
+        if (nome, porta) not in self.enderecos:
+            enderecos = await asyncio.get_running_loop().getaddrinfo(nome, porta, proto=socket.IPPROTO_TCP)
+            ips = [endereco[0] for *_, endereco in enderecos]
+            # mesma regra das miniaturas: nada de sondar a rede interna
+            if not all(endereco_permitido(ip) for ip in ips):
+                raise LinkRecusado(f"Endereço interno recusado: {nome}")
+            self.enderecos[nome, porta] = ips[0]
+        return self.enderecos[nome, porta]
+
+    async def requisitar(self, metodo, url):
+        partes = urlsplit(url)
+        if partes.scheme not in ("http", "https") or not partes.hostname:
+            raise LinkRecusado(f"URL não suportada: {url}")
+        host = self.host(partes.hostname)
+        async with host.conexoes:
+            await host.aguardar_vez()
+            async with self.conexoes:
+                return await asyncio.wait_for(self.http(metodo, partes), self.tempo_limite)
+
+    async def http(self, metodo, partes):
+        https = partes.scheme == "https"
+        porta = partes.port or (443 if https else 80)
+        # conecta no IP já verificado, não no nome (que poderia resolver diferente)
+        ip = await self.resolver(partes.hostname, porta)
+        leitor, escritor = await asyncio.open_connection(
+            ip, porta, ssl=self.contexto_ssl if https else None, server_hostname=partes.hostname if https else None
+        )
+        try:
+            caminho = quote((partes.path or "/") + (f"?{partes.query}" if partes.query else ""), safe="/?&=%:@+,;!$'()*~")
+            nome = f"[{partes.hostname}]" if ":" in partes.hostname else partes.hostname.encode("idna").decode()
+            escritor.write(
+                f"{metodo} {caminho} HTTP/1.1\r\n"
+                f"Host: {nome}{f':{partes.port}' if partes.port else ''}\r\n"
+                "User-Agent: pw2025-links\r\nAccept: image/*\r\nConnection: close\r\n\r\n".encode("latin-1")
+            )
+            await escritor.drain()
+            try:
+                status = int((await leitor.readline()).split()[1])
+            except (IndexError, ValueError):
+                raise ConnectionError("Resposta HTTP inválida")
+            cabecalhos = {}
+            while (linha := await leitor.readline()).strip():
+                chave, _, valor = linha.decode("latin-1").partition(":")
+                cabecalhos[chave.strip().lower()] = valor.strip()
+
+            tamanho = cabecalhos.get("content-length", "")
+            tamanho = int(tamanho) if tamanho.isdigit() else None
+            # sem Content-Length, o GET conta o corpo (até o limite das miniaturas)
+            if metodo == "GET" and tamanho is None and "chunked" not in cabecalhos.get("transfer-encoding", ""):
+                tamanho = 0
+                while tamanho <= TAMANHO_MAXIMO_ORIGEM and (bloco := await leitor.read(64 * 1024)):
+                    tamanho += len(bloco)
+            return status, cabecalhos, tamanho
+        finally:
+            escritor.close()
+
+    async def seguir(self, url):
+        for _ in range(REDIRECIONAMENTOS + 1):
+            status, cabecalhos, tamanho = await self.requisitar("HEAD", url)
+            if status in SEM_HEAD or (200 <= status < 300 and "content-type" not in cabecalhos):
+                status, cabecalhos, tamanho = await self.requisitar("GET", url)
+            if 300 <= status < 400 and cabecalhos.get("location"):
+                url = urljoin(url, cabecalhos["location"])
+                continue
+            espera = cabecalhos.get("retry-after", "")
+            return Resultado(
+                status,
+                cabecalhos.get("content-type", "").split(";")[0].strip().lower(),
+                tamanho,
+                espera=int(espera) if espera.isdigit() else None,
+            )
+        raise LinkRecusado("Redirecionamentos demais")
+
+    async def verificar(self, url):
+        espera = self.espera
+        for tentativa in range(TENTATIVAS):
+            try:
+                resultado = await self.seguir(url)
+            except (LinkRecusado, UnicodeError) as erro:
+                return Resultado(erro=str(erro))
+            except (OSError, asyncio.TimeoutError) as erro:
+                resultado = Resultado(erro=str(erro) or erro.__class__.__name__)
+            else:
+                if resultado.status not in REPETIR:
+                    return resultado
+                resultado.erro = f"HTTP {resultado.status}"
+                espera = max(espera, resultado.espera or 0)
+            if tentativa + 1 < TENTATIVAS:
+                # a próxima tentativa, e qualquer outro pedido ao servidor, esperam
+                self.host(urlsplit(url).hostname).adiar(min(espera, ESPERA_MAXIMA))
+                espera *= 2
+        return resultado
+
+    async def verificar_todos(self, urls):
+        resultados = await asyncio.gather(*(self.verificar(url) for url in urls))
+        return dict(zip(urls, resultados))
+
+
+############################################################################ BANCO #############
+
+def urls_cadastradas():
+    fotos = Portfolio.objects.values_list("foto_url", flat=True)
+    perfis = Fotografo.objects.exclude(Q(foto_perfil__isnull=True) | Q(foto_perfil="")).values_list("foto_perfil", flat=True)
+    return set(fotos) | set(perfis)
+
+
+# URLs nunca verificadas ou verificadas antes de "antes_de", as mais antigas primeiro
+def urls_a_verificar(antes_de=None):
+    urls = urls_cadastradas()
+    verificadas = Link.objects.filter(verificado_em__gte=antes_de) if antes_de else Link.objects.none()
+    urls -= set(verificadas.values_list("url", flat=True))
+    ordem = dict(Link.objects.values_list("url", "verificado_em"))
+    return sorted(urls, key=lambda url: (url in ordem, ordem.get(url)))
+
+
+def gravar(resultados):
+    agora = timezone.now()
+    existentes = Link.objects.in_bulk(list(resultados), field_name="url")
+    novos, alterados = [], []
+    for url, resultado in resultados.items():
+        link = existentes.get(url) or Link(url=url)
+        link.status = resultado.status
+        link.tipo_conteudo = resultado.tipo_conteudo[:100]
+        link.tamanho = resultado.tamanho
+        link.erro = resultado.erro[:255]
+        link.falhas = 0 if resultado.ok else link.falhas + 1
+        link.quebrado = not resultado.ok and (resultado.status in DEFINITIVOS or link.falhas >= FALHAS_PARA_QUEBRADO)
+        link.verificado_em = agora
+        (alterados if link.pk else novos).append(link)
+    Link.objects.bulk_create(novos)
+    Link.objects.bulk_update(alterados, ["status", "tipo_conteudo", "tamanho", "erro", "falhas", "quebrado", "verificado_em"])
+
+
+def remover_orfaos():
+    return Link.objects.exclude(
+        Q(url__in=Portfolio.objects.values("foto_url")) | Q(url__in=Fotografo.objects.values("foto_perfil"))
+    ).delete()[0]
+
+
+# Verifica as URLs em lotes de LOTE, gravando cada lote, para uma execução
+# interrompida não perder o que já foi verificado
+def verificar(urls, **opcoes):
+    urls = list(urls)
+    falhas = 0
+    for inicio in range(0, len(urls), LOTE):
+        resultados = asyncio.run(Verificador(**opcoes).verificar_todos(urls[inicio:inicio + LOTE]))
+        gravar(resultados)
+        falhas += sum(not resultado.ok for resultado in resultados.values())
+    return falhas
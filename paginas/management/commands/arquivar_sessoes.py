@@ -0,0 +1,22 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from paginas import arquivo
+
+
+# Para rodar periodicamente (cron): move as sessões finalizadas com mais de
+# --dias para SessaoArquivada (ver paginas/arquivo.py). O padrão acompanha o
+# histórico do feed .ics, que mostra o último ano
+class Command(BaseCommand):
+    help = "Move as sessões finalizadas antigas para o arquivo, em lotes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dias", type=int, default=365, help="Arquiva sessões com data anterior a N dias atrás.")
+        parser.add_argument("--lote", type=int, default=arquivo.LOTE, help="Sessões por transação.")
+
+    def handle(self, *args, **options):
+        antes_de = timezone.localdate() - timedelta(days=options["dias"])
+        total = arquivo.arquivar(antes_de, lote=options["lote"])
+        self.stdout.write(self.style.SUCCESS(f"{total} sessão(ões) finalizadas antes de {antes_de:%d/%m/%Y} arquivadas."))
@@ -0,0 +1,153 @@
+import json
+import statistics
+import time
+import tracemalloc
+from contextlib import ExitStack
+from datetime import date
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from paginas.metricas import Consultas
+from paginas.models import Cliente, Fotografo, Portfolio, Sessao
+from paginas.urls import urlpatterns
+
+
+# logout encerraria a sessão; miniatura depende de baixar fotos de fora
+IGNORADAS = {"logout", "miniatura"}
+
+
+# Chama (GET) cada rota de paginas/urls.py como um usuário logado e mede
+# latência, consultas SQL e pico de memória. Com --salvar grava o resultado
+# como base; sem ele compara com a base e falha se alguma rota piorou além da
+# tolerância. Os dados vêm de "manage.py gerar_dados"
+class Command(BaseCommand):
+    help = "Mede as rotas de paginas e compara com uma base salva."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--usuario", default="bench_estudio_0")
+        parser.add_argument("--vezes", type=int, default=10)
+        parser.add_argument("--base", default=str(settings.BASE_DIR / "benchmark_base.json"))
+        parser.add_argument("--salvar", action="store_true", help="Grava o resultado como nova base.")
+        parser.add_argument("--tolerancia", type=float, default=0.25, help="Piora relativa aceita (0.25 = 25%%).")
+        parser.add_argument("--folga-ms", type=float, default=2.0, help="Piora absoluta de latência sempre aceita.")
+        parser.add_argument("--folga-kb", type=float, default=64.0, help="Piora absoluta de memória sempre aceita.")
+
+    def handle(self, *args, **options):
+        try:
+            self.usuario = User.objects.get(username=options["usuario"])
+        except User.DoesNotExist:
+            raise CommandError(f'Usuário "{options["usuario"]}" não encontrado; rode "manage.py gerar_dados" antes.')
+
+        client = Client(raise_request_exception=False)
+        client.force_login(self.usuario)
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+            resultados = {nome: self.medir(client, url, options["vezes"]) for nome, url in self.rotas()}
+        self.tabela(resultados)
+
+        base = Path(options["base"])
+        if options["salvar"]:
+            base.write_text(json.dumps(resultados, indent=2, sort_keys=True), encoding="utf-8")
+            self.stdout.write(self.style.SUCCESS(f"Base gravada em {base}."))
+            return
+        if not base.exists():
+            raise CommandError(f"Base {base} não encontrada; rode com --salvar para criá-la.")
+        pioras = self.comparar(json.loads(base.read_text(encoding="utf-8")), resultados, options)
+        if pioras:
+            raise CommandError("Rotas mais lentas que a base:\n" + "\n".join(pioras))
+        self.stdout.write(self.style.SUCCESS("Nenhuma rota piorou em relação à base."))
+
+    # Parâmetros de exemplo para as rotas que precisam de um objeto
+    def parametros(self, nome):
+        modelos = {
+            "cliente": Cliente.objects.filter(user=self.usuario),
+            "fotografo": Fotografo.objects.all(),
+            "sessao": Sessao.objects.filter(cadastrado_por=self.usuario),
+            "portfolio": Portfolio.objects.all(),
+        }
+        if nome == "agenda-fotografo":
+            fotografo = Fotografo.objects.order_by("pk").first()
+            return fotografo and fotografo.get_url_agenda(), {}
+        if nome == "opcoes-sessao":
+            return reverse(nome, args=["cliente"]), {"termo": "a"}
+        if nome == "disponibilidade-fotografo":
+            fotografo_id = Fotografo.objects.order_by("pk").values_list("pk", flat=True).first()
+            hoje = date.today()
+            return reverse(nome), {"fotografo": fotografo_id, "ano": hoje.year, "mes": hoje.month}
+        pk = modelos[nome.split("-")[-1]].order_by("pk").values_list("pk", flat=True).first()
+        return pk and reverse(nome, args=[pk]), {}
+
+    def rotas(self):
+        for padrao in urlpatterns:
+            if not padrao.name or padrao.name in IGNORADAS:
+                continue
+            if padrao.pattern.converters or padrao.name == "disponibilidade-fotografo":
+                url, dados = self.parametros(padrao.name)
+                if url is None:
+                    self.stderr.write(f"{padrao.name}: sem objeto para usar como exemplo, ignorada.")
+                    continue
+                yield padrao.name, (url, dados)
+            else:
+                yield padrao.name, (reverse(padrao.name), {})
+
+    def requisitar(self, client, url, dados):
+        resposta = client.get(url, dados)
+        # respostas em streaming só custam ao serem lidas
+        if resposta.streaming:
+            for _ in resposta.streaming_content:
+                pass
+        return resposta
+
+    def medir(self, client, rota, vezes):
+        url, dados = rota
+        self.requisitar(client, url, dados)  # aquecimento (caches, conexão)
+
+        tempos = []
+        consultas = Consultas()
+        with ExitStack() as pilha:
+            for conexao in connections.all():
+                pilha.enter_context(conexao.execute_wrapper(consultas))
+            for _ in range(vezes):
+                comeco = time.perf_counter()
+                resposta = self.requisitar(client, url, dados)
+                tempos.append(time.perf_counter() - comeco)
+
+        # memória numa passada separada: o tracemalloc deixa tudo mais lento
+        tracemalloc.start()
+        try:
+            self.requisitar(client, url, dados)
+            _, pico = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        return {
+            "status": resposta.status_code,
+            "latencia_ms": round(statistics.median(tempos) * 1000, 2),
+            "consultas": consultas.quantidade // vezes,
+            "memoria_kb": round(pico / 1024, 1),
+        }
+
+    def tabela(self, resultados):
+        self.stdout.write(f"{'rota':<28}{'status':>7}{'ms':>9}{'SQL':>6}{'KB':>9}")
+        for nome, r in resultados.items():
+            self.stdout.write(f"{nome:<28}{r['status']:>7}{r['latencia_ms']:>9.1f}{r['consultas']:>6}{r['memoria_kb']:>9.1f}")
+
+    def comparar(self, base, resultados, options):
+        tolerancia = 1 + options["tolerancia"]
+        pioras = []
+        for nome, atual in resultados.items():
+            anterior = base.get(nome)
+            if anterior is None:
+                continue
+            if atual["consultas"] > anterior["consultas"]:
+                pioras.append(f"  {nome}: {anterior['consultas']} -> {atual['consultas']} consultas")
+            if atual["latencia_ms"] > anterior["latencia_ms"] * tolerancia + options["folga_ms"]:
+                pioras.append(f"  {nome}: {anterior['latencia_ms']} -> {atual['latencia_ms']} ms")
+            if atual["memoria_kb"] > anterior["memoria_kb"] * tolerancia + options["folga_kb"]:
+                pioras.append(f"  {nome}: {anterior['memoria_kb']} -> {atual['memoria_kb']} KB")
+        return pioras
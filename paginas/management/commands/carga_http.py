@@ -0,0 +1,115 @@
+import asyncio
+import statistics
+import time
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+from paginas.models import Fotografo
+
+
+# Teste de carga HTTP contra servidores já rodando, para comparar o mesmo
+# projeto no WSGI e no ASGI (views assíncronas), por exemplo:
+#
+#   gunicorn pw2025.wsgi:application -w 4 -b :8000
+#   gunicorn pw2025.asgi:application -w 4 -k uvicorn.workers.UvicornWorker -b :8001
+#   manage.py carga_http --servidor wsgi=http://127.0.0.1:8000 \
+#       --servidor asgi=http://127.0.0.1:8001 --usuario bench_estudio_0 --concorrencia 200
+#
+# Mantém --concorrencia requisições abertas ao mesmo tempo durante --duracao
+# segundos em cada caminho e mostra vazão, latências e erros
+class Command(BaseCommand):
+    help = "Mede vazão e latência de servidores HTTP rodando o projeto, com muitas requisições simultâneas."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--servidor", action="append", required=True, help="nome=url base (pode repetir).")
+        parser.add_argument(
+            "--caminho", action="append",
+            help="Caminho a pedir (pode repetir). Padrão: portfólio, fotógrafos e disponibilidade.",
+        )
+        parser.add_argument("--usuario", help="Usuário logado nas requisições (a sessão é criada no banco).")
+        parser.add_argument("--concorrencia", type=int, default=100)
+        parser.add_argument("--duracao", type=float, default=10)
+
+    def handle(self, *args, **options):
+        servidores = []
+        for item in options["servidor"]:
+            nome, _, url = item.partition("=")
+            if not url or urlsplit(url).scheme != "http":
+                raise CommandError(f'Servidor inválido: "{item}" (use nome=http://host:porta).')
+            servidores.append((nome, url.rstrip("/")))
+        caminhos = options["caminho"] or ["/listar/portfolio/", "/listar/fotografos/", self.disponibilidade()]
+
+        cookie = ""
+        if options["usuario"]:
+            try:
+                usuario = User.objects.get(username=options["usuario"])
+            except User.DoesNotExist:
+                raise CommandError(f'Usuário "{options["usuario"]}" não encontrado.')
+            client = Client()
+            client.force_login(usuario)
+            cookie = f"{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}"
+
+        self.stdout.write(f"{'servidor':<10}{'caminho':<32}{'req/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'erros':>7}")
+        for nome, url in servidores:
+            for caminho in caminhos:
+                resultado = asyncio.run(self.carga(url + caminho, cookie, options["concorrencia"], options["duracao"]))
+                self.stdout.write(
+                    f"{nome:<10}{caminho[:31]:<32}{resultado['vazao']:>9.1f}"
+                    f"{resultado['p50'] * 1000:>9.1f}{resultado['p99'] * 1000:>9.1f}{resultado['erros']:>7}"
+                )
+
+    def disponibilidade(self):
+        fotografo_id = Fotografo.objects.order_by("pk").values_list("pk", flat=True).first()
+        hoje = time.localtime()
+        return f"/agenda/disponibilidade/?fotografo={fotografo_id or 1}&ano={hoje.tm_year}&mes={hoje.tm_mon}"
+
+    async def pedir(self, url, cookie):
+        partes = urlsplit(url)
+        leitor, escritor = await asyncio.open_connection(partes.hostname, partes.port or 80)
+        try:
+            caminho = partes.path + (f"?{partes.query}" if partes.query else "")
+            linhas = [f"GET {caminho} HTTP/1.1", f"Host: {partes.netloc}", "Connection: close"]
+            if cookie:
+                linhas.append(f"Cookie: {cookie}")
+            escritor.write(("\r\n".join(linhas) + "\r\n\r\n").encode("latin-1"))
+            await escritor.drain()
+            status = int((await leitor.readline()).split()[1])
+            # lê a resposta inteira: o tempo conta até o último byte
+            while await leitor.read(64 * 1024):
+                pass
+            return status
+        finally:
+            escritor.close()
+
+    async def carga(self, url, cookie, concorrencia, duracao):
+        latencias = []
+        erros = 0
+        fim = time.perf_counter() + duracao
+
+        async def trabalhador():
+            nonlocal erros
+            while time.perf_counter() < fim:
+                comeco = time.perf_counter()
+                try:
+                    status = await self.pedir(url, cookie)
+                except (OSError, IndexError, ValueError):
+                    status = None
+                if status == 200:
+                    latencias.append(time.perf_counter() - comeco)
+                else:
+                    erros += 1
+
+        comeco = time.perf_counter()
+        await asyncio.gather(*(trabalhador() for _ in range(concorrencia)))
+        decorrido = time.perf_counter() - comeco
+        latencias.sort()
+        return {
+            "vazao": len(latencias) / decorrido,
+            "p50": statistics.median(latencias) if latencias else 0,
+            "p99": latencias[int(len(latencias) * 0.99)] if latencias else 0,
+            "erros": erros,
+        }
@@ -0,0 +1,164 @@
+import os
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from paginas.models import Cliente, Fotografo
+
+
+# Configuração padrão do SQLite, para comparar com PAGINAS_SQLITE_PRAGMAS
+PRAGMAS_PADRAO = {"journal_mode": "DELETE", "synchronous": "FULL"}
+
+
+# Teste de carga das reservas: alguns usuários cadastram sessões (cada um com
+# o próprio fotógrafo, sem conflitos entre si) enquanto outros abrem a
+# listagem. Roda duas vezes num banco temporário, uma com o SQLite padrão e
+# outra com os PRAGMAs do settings, e mostra vazão, erros e latências
+class Command(BaseCommand):
+    help = "Compara a vazão de reservas simultâneas no SQLite padrão e com PAGINAS_SQLITE_PRAGMAS."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--escritores", type=int, default=4)
+        parser.add_argument("--leitores", type=int, default=4)
+        parser.add_argument("--reservas", type=int, default=50, help="Reservas por escritor.")
+        parser.add_argument("--leituras", type=int, default=50, help="Listagens por leitor.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("O teste de carga compara configurações do SQLite; o banco atual é " + connection.vendor)
+
+        setup_test_environment()
+        try:
+            for nome, pragmas in [("padrão", PRAGMAS_PADRAO), ("ajustado", settings.PAGINAS_SQLITE_PRAGMAS)]:
+                with override_settings(PAGINAS_SQLITE_PRAGMAS=pragmas):
+                    self.rodada(nome, pragmas, options)
+        finally:
+            teardown_test_environment()
+
+    def rodada(self, nome, pragmas, options):
+        # banco novo a cada rodada: o journal_mode fica gravado no arquivo
+        pasta = tempfile.mkdtemp(prefix="carga_")
+        arquivo = os.path.join(pasta, "carga.sqlite3")
+        settings_dict = connection.settings_dict
+        original = settings_dict["NAME"], dict(settings_dict.get("TEST", {}))
+        settings_dict.setdefault("TEST", {})["NAME"] = arquivo
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            escritores = self.preparar(options["escritores"], "escritor")
+            leitores = self.preparar(options["leitores"], "leitor")
+            resultados = {"escrita": [], "leitura": [], "erros": []}
+            trava = threading.Lock()
+
+            threads = [
+                threading.Thread(target=self.escrever, args=(usuario, options["reservas"], resultados, trava))
+                for usuario in escritores
+            ] + [
+                threading.Thread(target=self.ler, args=(usuario, options["leituras"], resultados, trava))
+                for usuario in leitores
+            ]
+            comeco = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            duracao = time.perf_counter() - comeco
+
+            self.relatorio(nome, pragmas, duracao, resultados)
+        finally:
+            connections.close_all()
+            connection.creation.destroy_test_db(original[0], verbosity=0)
+            settings_dict["TEST"] = original[1]
+            shutil.rmtree(pasta, ignore_errors=True)
+
+    def preparar(self, quantidade, prefixo):
+        clientes = []
+        for i in range(quantidade):
+            usuario = User.objects.create_user(f"{prefixo}{i}", password="carga")
+            Fotografo.objects.create(user=usuario, nome=f"Fotógrafo {prefixo} {i}", especialidade="Carga")
+            Cliente.objects.create(user=usuario, nome=f"Cliente {prefixo} {i}")
+            # login antes de começar a medir
+            client = Client()
+            client.force_login(usuario)
+            clientes.append((usuario, client))
+        return clientes
+
+    def escrever(self, dono, quantidade, resultados, trava):
+        usuario, client = dono
+        fotografo = Fotografo.objects.get(user=usuario)
+        cliente = Cliente.objects.get(user=usuario)
+        url = reverse("cadastrar-sessao")
+        tempos, erros = [], []
+        try:
+            for i in range(quantidade):
+                dados = {
+                    "data": (date(2030, 1, 1) + timedelta(days=i)).isoformat(),
+                    "horario": "10:00",
+                    "duracao": 1,
+                    "tipo": "Carga",
+                    "valor": "100.00",
+                    "cliente": cliente.pk,
+                    "fotografo": fotografo.pk,
+                }
+                comeco = time.perf_counter()
+                try:
+                    resposta = client.post(url, dados)
+                except Exception as erro:
+                    erros.append(f"{usuario.username}: {erro}")
+                    continue
+                tempos.append(time.perf_counter() - comeco)
+                if resposta.status_code != 302:
+                    erros.append(f"{usuario.username}: status {resposta.status_code}")
+        finally:
+            connection.close()
+        with trava:
+            resultados["escrita"].extend(tempos)
+            resultados["erros"].extend(erros)
+
+    def ler(self, dono, quantidade, resultados, trava):
+        usuario, client = dono
+        url = reverse("listar-sessoes")
+        tempos, erros = [], []
+        try:
+            for _ in range(quantidade):
+                comeco = time.perf_counter()
+                try:
+                    resposta = client.get(url)
+                except Exception as erro:
+                    erros.append(f"{usuario.username}: {erro}")
+                    continue
+                tempos.append(time.perf_counter() - comeco)
+                if resposta.status_code != 200:
+                    erros.append(f"{usuario.username}: status {resposta.status_code}")
+        finally:
+            connection.close()
+        with trava:
+            resultados["leitura"].extend(tempos)
+            resultados["erros"].extend(erros)
+
+    def relatorio(self, nome, pragmas, duracao, resultados):
+        total = len(resultados["escrita"]) + len(resultados["leitura"])
+        self.stdout.write(self.style.MIGRATE_HEADING(f"SQLite {nome}: {pragmas}"))
+        self.stdout.write(f"  {total} requisições em {duracao:.2f}s ({total / duracao:.1f}/s)")
+        for tipo in ("escrita", "leitura"):
+            tempos = sorted(resultados[tipo])
+            if not tempos:
+                continue
+            p95 = tempos[min(len(tempos) - 1, int(len(tempos) * 0.95))]
+            self.stdout.write(
+                f"  {tipo}: {len(tempos)} · p50 {statistics.median(tempos) * 1000:.1f} ms · p95 {p95 * 1000:.1f} ms"
+            )
+        estilo = self.style.ERROR if resultados["erros"] else self.style.SUCCESS
+        self.stdout.write(estilo(f"  erros: {len(resultados['erros'])}"))
+        for erro in resultados["erros"][:5]:
+            self.stdout.write(f"    {erro}")
@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from paginas import lembretes
+
+
+# Para rodar periodicamente (cron, a cada 15 minutos por exemplo): avisa
+# clientes e fotógrafos das sessões das próximas --horas. Rodar de novo não
+# repete os lembretes já enviados
+class Command(BaseCommand):
+    help = "Envia lembretes das sessões que começam nas próximas horas."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--horas", type=float, help="Antecedência (padrão: PAGINAS_LEMBRETES_HORAS).")
+        parser.add_argument("--backend", choices=sorted(lembretes.BACKENDS), help="Padrão: PAGINAS_LEMBRETES_BACKEND.")
+        parser.add_argument("--conexoes", type=int, help="Conexões simultâneas (padrão: PAGINAS_LEMBRETES_CONEXOES).")
+        parser.add_argument("--lote", type=int, help="Mensagens por lote (padrão: PAGINAS_LEMBRETES_LOTE).")
+
+    def handle(self, *args, **options):
+        backend = options["backend"] or settings.PAGINAS_LEMBRETES_BACKEND
+        if backend not in lembretes.BACKENDS:
+            raise CommandError(f'Backend desconhecido: "{backend}".')
+        if backend == "webhook" and not settings.PAGINAS_LEMBRETES_WEBHOOK_URL:
+            raise CommandError("Defina PAGINAS_LEMBRETES_WEBHOOK_URL para usar o webhook.")
+        enviadas, falhas, sessoes = lembretes.enviar(
+            horas=options["horas"], backend=backend, conexoes=options["conexoes"], tamanho_lote=options["lote"]
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{enviadas} mensagem(ns) enviadas com {sessoes} lembrete(s); {falhas} com erro (serão tentadas de novo)."
+        ))
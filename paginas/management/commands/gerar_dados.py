@@ -0,0 +1,161 @@
+import random
+from datetime import date, time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from paginas import busca, resumos
+from paginas.models import Cliente, Fotografo, Portfolio, Sessao
+
+
+PREFIXO = "bench"
+SENHA = "bench-senha-123"
+LOTE = 5000
+
+ESPECIALIDADES = ["Casamento", "Aniversário", "Ensaio", "Corporativo", "Newborn", "Formatura", "Produto"]
+TIPOS = ["Ensaio externo", "Casamento", "Aniversário", "Book", "Evento", "Produto"]
+NOMES = ["Ana", "Bruno", "Carla", "Diego", "Elisa", "Fábio", "Gabriela", "Heitor", "Isabela", "João",
+         "Larissa", "Marcos", "Natália", "Otávio", "Paula", "Rafael", "Sofia", "Tiago", "Vanessa", "Yuri"]
+SOBRENOMES = ["Silva", "Souza", "Oliveira", "Santos", "Lima", "Pereira", "Costa", "Almeida", "Ribeiro", "Gomes"]
+HORARIOS = [time(8), time(10), time(13), time(15), time(17)]
+
+
+# Enche o banco com dados sintéticos para os benchmarks (benchmark_views).
+# Os usuários criados começam com "bench_"; "bench_estudio_0" está no grupo
+# Admin e é o usuário padrão do benchmark. Usa bulk_create, então os resumos e
+# o índice de busca são refeitos no final. As sessões de um fotógrafo nunca
+# se sobrepõem
+class Command(BaseCommand):
+    help = "Gera usuários, clientes, fotógrafos, sessões e fotos sintéticos para os benchmarks."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--estudios", type=int, default=20, help="Usuários que cadastram clientes e sessões.")
+        parser.add_argument("--clientes", type=int, default=20000)
+        parser.add_argument("--fotografos", type=int, default=200)
+        parser.add_argument("--sessoes", type=int, default=100000)
+        parser.add_argument("--fotos", type=int, default=50000)
+        parser.add_argument("--semente", type=int, default=2025)
+        parser.add_argument("--limpar", action="store_true", help="Apaga os dados gerados antes.")
+
+    def handle(self, *args, **options):
+        if options["estudios"] < 1 or options["fotografos"] < 1 or options["clientes"] < 1:
+            raise CommandError("É preciso ao menos um estúdio, um fotógrafo e um cliente.")
+        self.aleatorio = random.Random(options["semente"])
+
+        if options["limpar"]:
+            self.limpar()
+        elif User.objects.filter(username__startswith=f"{PREFIXO}_").exists():
+            raise CommandError("Já existem dados gerados; use --limpar para gerá-los de novo.")
+
+        with transaction.atomic():
+            estudios = self.criar_usuarios("estudio", options["estudios"])
+            Group.objects.get_or_create(name="Admin")[0].user_set.add(estudios[0])
+            clientes = self.criar_clientes(estudios, options["clientes"])
+            fotografos = self.criar_fotografos(options["fotografos"])
+            self.criar_sessoes(clientes, fotografos, options["sessoes"])
+            self.criar_fotos(fotografos, options["fotos"])
+            resumos.recalcular()
+            busca.reindexar()
+        cache.clear()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(estudios)} estúdio(s), {len(clientes)} cliente(s), {len(fotografos)} fotógrafo(s), "
+            f"{options['sessoes']} sessão(ões) e {options['fotos']} foto(s) gerados. "
+            f'Login: "{estudios[0].username}" / "{SENHA}".'
+        ))
+
+    def nome(self):
+        return f"{self.aleatorio.choice(NOMES)} {self.aleatorio.choice(SOBRENOMES)}"
+
+    def telefone(self):
+        return f"(27) 9{self.aleatorio.randint(8000, 9999)}-{self.aleatorio.randint(0, 9999):04d}"
+
+    def limpar(self):
+        usuarios = User.objects.filter(username__startswith=f"{PREFIXO}_")
+        # sessões protegem clientes e fotógrafos (PROTECT), então saem primeiro
+        Sessao.objects.filter(cadastrado_por__in=usuarios).delete()
+        Sessao.objects.filter(fotografo__user__in=usuarios).delete()
+        usuarios.delete()
+
+    def criar_usuarios(self, tipo, quantidade):
+        # o hash é caro; todos os usuários gerados compartilham a mesma senha
+        senha = make_password(SENHA)
+        User.objects.bulk_create(
+            [User(username=f"{PREFIXO}_{tipo}_{i}", password=senha) for i in range(quantidade)],
+            batch_size=LOTE,
+        )
+        return list(User.objects.filter(username__startswith=f"{PREFIXO}_{tipo}_").order_by("pk"))
+
+    def criar_clientes(self, estudios, quantidade):
+        Cliente.objects.bulk_create(
+            [
+                Cliente(nome=self.nome(), telefone=self.telefone(), user=estudios[i % len(estudios)])
+                for i in range(quantidade)
+            ],
+            batch_size=LOTE,
+        )
+        return list(Cliente.objects.filter(user__in=estudios).values_list("pk", "user_id"))
+
+    def criar_fotografos(self, quantidade):
+        usuarios = self.criar_usuarios("fotografo", quantidade)
+        Fotografo.objects.bulk_create(
+            [
+                Fotografo(
+                    nome=self.nome(),
+                    especialidade=self.aleatorio.choice(ESPECIALIDADES),
+                    telefone=self.telefone(),
+                    foto_perfil=f"https://picsum.photos/seed/{PREFIXO}{usuario.pk}/200",
+                    user=usuario,
+                )
+                for usuario in usuarios
+            ],
+            batch_size=LOTE,
+        )
+        grupo, _ = Group.objects.get_or_create(name="Fotógrafo")
+        grupo.user_set.add(*usuarios)
+        return list(Fotografo.objects.filter(user__in=usuarios).values_list("pk", flat=True))
+
+    def criar_sessoes(self, clientes, fotografos, quantidade):
+        # a sessão i vai para o fotógrafo i % F, no horário livre seguinte da
+        # agenda dele: HORARIOS por dia, a partir de um ano atrás
+        inicio = date.today() - timedelta(days=365)
+        lote = []
+        for i in range(quantidade):
+            vaga = i // len(fotografos)
+            cliente_id, dono_id = self.aleatorio.choice(clientes)
+            data = inicio + timedelta(days=vaga // len(HORARIOS))
+            sessao = Sessao(
+                data=data,
+                horario=HORARIOS[vaga % len(HORARIOS)],
+                duracao=self.aleatorio.choice([1, 1, 2]),
+                tipo=self.aleatorio.choice(TIPOS),
+                valor=Decimal(self.aleatorio.randrange(15000, 300000, 500)) / 100,
+                finalizado=data < date.today() and self.aleatorio.random() < 0.8,
+                cliente_id=cliente_id,
+                fotografo_id=fotografos[i % len(fotografos)],
+                cadastrado_por_id=dono_id,
+            )
+            # bulk_create não chama save(), que é quem preenche inicio e fim
+            sessao.calcular_intervalo()
+            lote.append(sessao)
+            if len(lote) == LOTE:
+                Sessao.objects.bulk_create(lote)
+                lote = []
+        Sessao.objects.bulk_create(lote)
+
+    def criar_fotos(self, fotografos, quantidade):
+        lote = []
+        for i in range(quantidade):
+            lote.append(Portfolio(
+                fotografo_id=self.aleatorio.choice(fotografos),
+                foto_url=f"https://picsum.photos/seed/{PREFIXO}{i}/800/600",
+                descricao=f"{self.aleatorio.choice(TIPOS)} {i}",
+            ))
+            if len(lote) == LOTE:
+                Portfolio.objects.bulk_create(lote)
+                lote = []
+        Portfolio.objects.bulk_create(lote)
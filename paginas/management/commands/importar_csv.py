@@ -0,0 +1,35 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from paginas.importacao import IMPORTADORES
+
+
+class Command(BaseCommand):
+    help = "Importa clientes, fotógrafos ou fotos de portfólio a partir de um arquivo CSV."
+
+    def add_arguments(self, parser):
+        parser.add_argument("tipo", choices=sorted(IMPORTADORES))
+        parser.add_argument("arquivo")
+        parser.add_argument(
+            "--usuario", help="Usuário dono dos clientes importados (obrigatório para clientes).",
+        )
+
+    def handle(self, *args, **options):
+        usuario = None
+        if options["usuario"]:
+            try:
+                usuario = User.objects.get(username=options["usuario"])
+            except User.DoesNotExist:
+                raise CommandError(f"Usuário \"{options['usuario']}\" não encontrado.")
+        elif options["tipo"] == "clientes":
+            raise CommandError("Informe --usuario para importar clientes.")
+
+        importador = IMPORTADORES[options["tipo"]](usuario)
+        with open(options["arquivo"], "rb") as arquivo:
+            relatorio = importador.importar(arquivo)
+
+        for linha, mensagem in relatorio.erros:
+            self.stdout.write(self.style.ERROR(f"Linha {linha}: {mensagem}"))
+        self.stdout.write(self.style.SUCCESS(
+            f"{relatorio.criados} registro(s) importado(s), {len(relatorio.erros)} linha(s) com erro."
+        ))
@@ -0,0 +1,56 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from paginas.metricas import registro
+from paginas.urls import urlpatterns
+
+
+# Rotas que não devem ser chamadas só para medir
+IGNORADAS = {"logout"}
+
+
+# Chama N vezes cada rota de paginas/urls.py que não recebe parâmetros (só GET)
+# com o MetricasMiddleware ligado e mostra a tabela de latência e consultas
+class Command(BaseCommand):
+    help = "Mede latência, consultas SQL e tamanho da resposta de cada rota sem parâmetros."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--usuario", help="Nome do usuário logado durante as medições.")
+        parser.add_argument("--vezes", type=int, default=20)
+
+    def rotas(self):
+        for padrao in urlpatterns:
+            if padrao.name and padrao.name not in IGNORADAS and not padrao.pattern.converters:
+                yield padrao.name, "/" + str(padrao.pattern)
+
+    def handle(self, *args, **options):
+        client = Client(raise_request_exception=False)
+        if options["usuario"]:
+            try:
+                client.force_login(User.objects.get(username=options["usuario"]))
+            except User.DoesNotExist:
+                raise CommandError(f'Usuário "{options["usuario"]}" não encontrado.')
+
+        setup_test_environment()
+        try:
+            registro.limpar()
+            for _, url in self.rotas():
+                for _ in range(options["vezes"]):
+                    client.get(url)
+        finally:
+            teardown_test_environment()
+
+        self.stdout.write(f"{'rota':<28}{'p50 ms':>9}{'p99 ms':>9}{'SQL p50':>9}{'SQL ms':>9}{'tpl ms':>9}{'KB':>8}  N+1")
+        for nome, dados in registro.resumo().items():
+            self.stdout.write(
+                f"{nome:<28}"
+                f"{dados['latencia']['p50'] * 1000:>9.1f}"
+                f"{dados['latencia']['p99'] * 1000:>9.1f}"
+                f"{dados['consultas']['p50']:>9}"
+                f"{dados['tempo_sql']['p50'] * 1000:>9.1f}"
+                f"{dados['tempo_template']['p50'] * 1000:>9.1f}"
+                f"{dados['tamanho']['p50'] / 1024:>8.1f}"
+                f"  {dados['ultima_repetida'] or '-'}"
+            )
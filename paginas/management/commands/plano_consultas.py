@@ -0,0 +1,55 @@
+import re
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+
+from paginas.acesso import Principal
+from paginas.views import ClienteList, FotografoList, SessaoList, PortfolioList
+
+
+# Linhas do plano que indicam leitura da tabela inteira ou ordenação em memória.
+# SQLite: "SCAN tabela" sem "USING ... INDEX"; PostgreSQL: "Seq Scan on tabela"
+VARREDURA = re.compile(r"\bSCAN (?!.*\bUSING\b.*\b(INDEX|PRIMARY KEY)\b)|USE TEMP B-TREE|Seq Scan on")
+
+
+class Command(BaseCommand):
+    help = "Mostra o plano de execução das consultas das listagens e aponta varreduras completas de tabela."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default")
+
+    def consulta_da_view(self, view_class, parametros):
+        # Usuário não salvo: o plano depende só do filtro, não dos dados
+        request = RequestFactory().get("/", parametros)
+        request.user = User(pk=0, username="plano")
+        request.principal = Principal(user_id=0)
+        view = view_class()
+        view.setup(request)
+        qs = view.get_queryset().using(self.database)
+        return qs.order_by(*view.ordenacao_cursor)[:view.paginate_by + 1]
+
+    def casos(self):
+        return [
+            ("listar-clientes", self.consulta_da_view(ClienteList, {})),
+            ("listar-fotografos", self.consulta_da_view(FotografoList, {})),
+            ("listar-sessoes", self.consulta_da_view(SessaoList, {})),
+            ("listar-portfolio?fotografo", self.consulta_da_view(PortfolioList, {"fotografo": "1"})),
+            ("cadastrar-usuario (email)", User.objects.using(self.database).filter(email="plano@exemplo.com")),
+        ]
+
+    def handle(self, *args, **options):
+        self.database = options["database"]
+        problemas = []
+        for nome, qs in self.casos():
+            self.stdout.write(self.style.MIGRATE_HEADING(nome))
+            for linha in qs.explain().splitlines():
+                if VARREDURA.search(linha):
+                    problemas.append(nome)
+                    self.stdout.write(self.style.ERROR(f"  {linha}"))
+                else:
+                    self.stdout.write(f"  {linha}")
+
+        if problemas:
+            raise CommandError("Varredura completa de tabela em: " + ", ".join(sorted(set(problemas))))
+        self.stdout.write(self.style.SUCCESS("Nenhuma varredura completa encontrada."))
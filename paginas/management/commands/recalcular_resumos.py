@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from paginas import resumos
+from paginas.models import ResumoCliente, ResumoMensal
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstrói os resumos usados nos relatórios a partir da tabela de sessões. "
+        "Necessário depois de alterações em massa que não disparam signals (bulk_create, update)."
+    )
+
+    def handle(self, *args, **options):
+        resumos.recalcular()
+        self.stdout.write(self.style.SUCCESS(
+            f"{ResumoMensal.objects.count()} resumo(s) por fotógrafo e "
+            f"{ResumoCliente.objects.count()} por cliente recalculados."
+        ))
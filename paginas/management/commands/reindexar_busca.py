@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from paginas import busca
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstrói o índice de busca textual a partir das tabelas. "
+        "Necessário depois de alterações em massa que não disparam signals (bulk_create, update)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default")
+
+    def handle(self, *args, **options):
+        total = busca.reindexar(options["database"])
+        self.stdout.write(self.style.SUCCESS(f"{total} objeto(s) indexados."))
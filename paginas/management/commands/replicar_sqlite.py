@@ -0,0 +1,44 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+# Faz o papel da replicação para testar a réplica localmente com dois arquivos
+# SQLite: copia o banco principal para o arquivo da réplica com a API de
+# backup do SQLite, uma vez ou a cada --intervalo segundos
+class Command(BaseCommand):
+    help = "Copia o banco SQLite principal para o arquivo da réplica (SQLITE_REPLICA_ARQUIVO)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--origem", help="Padrão: o banco principal do settings.")
+        parser.add_argument("--destino", help="Padrão: o banco da réplica do settings.")
+        parser.add_argument("--intervalo", type=float, default=0, help="Repete a cópia a cada N segundos.")
+
+    def arquivo(self, alias):
+        banco = settings.DATABASES.get(alias)
+        if banco is None or banco["ENGINE"] != "django.db.backends.sqlite3":
+            raise CommandError(f'O banco "{alias}" não está configurado como SQLite.')
+        return str(banco["NAME"])
+
+    def handle(self, *args, **options):
+        origem = options["origem"] or self.arquivo("default")
+        destino = options["destino"] or self.arquivo("replica")
+        if origem == destino:
+            raise CommandError("Origem e destino são o mesmo arquivo.")
+
+        while True:
+            self.copiar(origem, destino)
+            self.stdout.write(f"{origem} -> {destino}")
+            if not options["intervalo"]:
+                return
+            time.sleep(options["intervalo"])
+
+    def copiar(self, origem, destino):
+        fonte, alvo = sqlite3.connect(origem), sqlite3.connect(destino)
+        try:
+            fonte.backup(alvo)
+        finally:
+            fonte.close()
+            alvo.close()
@@ -0,0 +1,101 @@
+import signal
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from paginas import tarefas
+from paginas.models import Tarefa
+
+
+# Executa as tarefas da fila (ver paginas/tarefas.py). Fica rodando, com até
+# --concorrencia tarefas ao mesmo tempo, cada uma numa thread com a própria
+# conexão; vários trabalhadores, em máquinas diferentes, podem dividir a mesma
+# fila. SIGTERM/Ctrl+C param de reservar e esperam as que já começaram.
+#
+# Com --porta, responde HTTP nessa porta enquanto estiver rodando (200, ou
+# 503 parando), para a plataforma saber que o processo está vivo; em
+# produção ele roda como um serviço próprio (trabalhador.yaml), que a
+# plataforma reinicia se o processo sair
+class Saude(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path == "/_ah/stop":
+            self.server.parar.set()
+        parado = self.server.parar.is_set()
+        corpo = b"parando\n" if parado else b"ok\n"
+        self.send_response(503 if parado else 200)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = "Executa as tarefas em segundo plano enfileiradas em Tarefa."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concorrencia", type=int, help="Tarefas ao mesmo tempo (padrão: PAGINAS_TAREFAS_CONCORRENCIA).")
+        parser.add_argument("--uma-vez", action="store_true", help="Sai quando a fila estiver vazia.")
+        parser.add_argument("--porta", type=int, help="Responde às verificações de saúde nesta porta.")
+
+    def handle(self, *args, **options):
+        concorrencia = options["concorrencia"] or settings.PAGINAS_TAREFAS_CONCORRENCIA
+        self.parar = threading.Event()
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, lambda *_: self.parar.set())
+        servidor = None
+        if options["porta"]:
+            servidor = ThreadingHTTPServer(("", options["porta"]), Saude)
+            servidor.parar = self.parar
+            threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        try:
+            self.trabalhar(concorrencia, options["uma_vez"])
+        finally:
+            if servidor:
+                servidor.shutdown()
+                servidor.server_close()
+
+    def trabalhar(self, concorrencia, uma_vez):
+        em_andamento = set()
+        with ThreadPoolExecutor(concorrencia) as executor:
+            try:
+                while not self.parar.is_set():
+                    livres = concorrencia - len(em_andamento)
+                    reservadas = tarefas.reservar(livres) if livres else []
+                    em_andamento.update(executor.submit(self.executar, item) for item in reservadas)
+                    if not em_andamento:
+                        if uma_vez:
+                            break
+                        self.parar.wait(settings.PAGINAS_TAREFAS_INTERVALO)
+                        continue
+                    # com vagas e tarefas chegando, volta a olhar a fila de tempos em tempos
+                    prontas, em_andamento = wait(
+                        em_andamento, timeout=settings.PAGINAS_TAREFAS_INTERVALO, return_when=FIRST_COMPLETED
+                    )
+                    for futuro in prontas:
+                        self.relatar(futuro.result())
+            except KeyboardInterrupt:
+                pass
+            for futuro in wait(em_andamento).done:
+                self.relatar(futuro.result())
+
+    def executar(self, item):
+        # como numa requisição: conexão renovada antes e fechada depois
+        close_old_connections()
+        try:
+            return tarefas.executar(item)
+        finally:
+            close_old_connections()
+
+    def relatar(self, item):
+        if item.estado == Tarefa.CONCLUIDA:
+            self.stdout.write(f"{item.nome} #{item.pk}: concluída")
+        else:
+            self.stderr.write(f"{item.nome} #{item.pk}: {item.estado} (tentativa {item.tentativas})\n{item.erro}")
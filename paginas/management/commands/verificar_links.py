@@ -0,0 +1,30 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from paginas import links
+from paginas.models import Link
+
+
+# Para rodar periodicamente (cron): verifica as URLs que não foram
+# verificadas nas últimas --idade horas e guarda o resultado em Link
+class Command(BaseCommand):
+    help = "Verifica se as URLs das fotos do portfólio e de perfil ainda respondem com uma imagem."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--idade", type=float, default=24, help="Reverifica URLs verificadas há mais de N horas.")
+        parser.add_argument("--todas", action="store_true", help="Verifica todas, mesmo as verificadas há pouco.")
+        parser.add_argument("--conexoes", type=int, help="Conexões simultâneas (padrão: PAGINAS_LINKS_CONEXOES).")
+        parser.add_argument("--por-host", type=int, help="Conexões por servidor (padrão: PAGINAS_LINKS_POR_HOST).")
+
+    def handle(self, *args, **options):
+        antes_de = None if options["todas"] else timezone.now() - timedelta(hours=options["idade"])
+        urls = links.urls_a_verificar(antes_de)
+        falhas = links.verificar(urls, conexoes=options["conexoes"], por_host=options["por_host"])
+        removidos = links.remover_orfaos()
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(urls)} URL(s) verificadas, {falhas} com erro; "
+            f"{Link.objects.filter(quebrado=True).count()} marcada(s) como quebradas; "
+            f"{removidos} resultado(s) de URLs que não estão mais cadastradas removidos."
+        ))
@@ -0,0 +1,208 @@
+import threading
+import time
+from collections import Counter, deque
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+
+# Métricas por rota (nome da URL), guardadas na memória de cada processo:
+# latência, quantidade e tempo das consultas SQL, tempo de renderização do
+# template e tamanho da resposta. Cada métrica guarda as últimas
+# PAGINAS_METRICAS_AMOSTRAS medições, de onde saem os percentis.
+# Consultas idênticas repetidas numa mesma requisição (N+1) também são contadas
+
+CAMPOS = {
+    "latencia": "Duração da requisição em segundos.",
+    "consultas": "Consultas SQL por requisição.",
+    "tempo_sql": "Tempo gasto no banco por requisição, em segundos.",
+    "tempo_template": "Tempo de renderização do template, em segundos.",
+    "tamanho": "Tamanho da resposta em bytes.",
+}
+PERCENTIS = (0.5, 0.9, 0.99)
+
+
+def percentil(valores, p):
+    if not valores:
+        return 0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+class Rota:
+
+    def __init__(self, amostras):
+        self.requisicoes = 0
+        # soma e contagem de todas as medições, não só das amostras guardadas
+        self.soma = dict.fromkeys(CAMPOS, 0)
+        self.contagem = dict.fromkeys(CAMPOS, 0)
+        self.amostras = {campo: deque(maxlen=amostras) for campo in CAMPOS}
+        self.suspeitas_n_mais_1 = 0
+        self.ultima_repetida = None
+
+    def resumo(self):
+        return {
+            "requisicoes": self.requisicoes,
+            "suspeitas_n_mais_1": self.suspeitas_n_mais_1,
+            "ultima_repetida": self.ultima_repetida,
+            **{
+                campo: {f"p{int(p * 100)}": percentil(self.amostras[campo], p) for p in PERCENTIS}
+                for campo in CAMPOS
+            },
+        }
+
+
+class Registro:
+
+    def __init__(self):
+        self.trava = threading.Lock()
+        self.rotas = {}
+
+    def registrar(self, nome, medicao, repetida=None):
+        amostras = getattr(settings, "PAGINAS_METRICAS_AMOSTRAS", 1000)
+        with self.trava:
+            rota = self.rotas.get(nome)
+            if rota is None:
+                rota = self.rotas[nome] = Rota(amostras)
+            rota.requisicoes += 1
+            for campo, valor in medicao.items():
+                if valor is None:
+                    continue
+                rota.soma[campo] += valor
+                rota.contagem[campo] += 1
+                rota.amostras[campo].append(valor)
+            if repetida:
+                rota.suspeitas_n_mais_1 += 1
+                rota.ultima_repetida = repetida
+
+    def resumo(self):
+        with self.trava:
+            return {nome: rota.resumo() for nome, rota in sorted(self.rotas.items())}
+
+    def prometheus(self):
+        linhas = []
+        with self.trava:
+            rotas = sorted(self.rotas.items())
+            for campo, ajuda in CAMPOS.items():
+                metrica = f"paginas_{campo}"
+                linhas.append(f"# HELP {metrica} {ajuda}")
+                linhas.append(f"# TYPE {metrica} summary")
+                for nome, rota in rotas:
+                    for p in PERCENTIS:
+                        valor = percentil(rota.amostras[campo], p)
+                        linhas.append(f'{metrica}{{view="{nome}",quantile="{p}"}} {valor}')
+                    linhas.append(f'{metrica}_sum{{view="{nome}"}} {rota.soma[campo]}')
+                    linhas.append(f'{metrica}_count{{view="{nome}"}} {rota.contagem[campo]}')
+            linhas.append("# HELP paginas_n_mais_1_total Requisições com a mesma consulta repetida várias vezes.")
+            linhas.append("# TYPE paginas_n_mais_1_total counter")
+            for nome, rota in rotas:
+                linhas.append(f'paginas_n_mais_1_total{{view="{nome}"}} {rota.suspeitas_n_mais_1}')
+        return "\n".join(linhas) + "\n"
+
+    def limpar(self):
+        with self.trava:
+            self.rotas.clear()
+
+
+registro = Registro()
+
+
+# Conta as consultas da requisição. O SQL chega com os parâmetros separados,
+# então a mesma consulta com ids diferentes conta como repetição
+class Consultas:
+
+    def __init__(self):
+        self.quantidade = 0
+        self.tempo = 0
+        self.por_sql = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        comeco = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.tempo += time.perf_counter() - comeco
+            self.quantidade += 1
+            self.por_sql[sql] += 1
+
+    def repetida(self):
+        limite = getattr(settings, "PAGINAS_METRICAS_REPETICOES", 5)
+        if not self.por_sql:
+            return None
+        sql, vezes = self.por_sql.most_common(1)[0]
+        return f"{vezes}x {sql[:200]}" if vezes >= limite else None
+
+
+# Funciona no WSGI e no ASGI. No ASGI as consultas rodam na thread da
+# requisição (sync_to_async), então os contadores são instalados lá
+class MetricasMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.assincrono = iscoroutinefunction(get_response)
+        if self.assincrono:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.assincrono:
+            return self.__acall__(request)
+        if not getattr(settings, "PAGINAS_METRICAS", True):
+            return self.get_response(request)
+
+        consultas = Consultas()
+        request._metricas_template = None
+        comeco = time.perf_counter()
+        with self.contar_consultas(consultas):
+            resposta = self.get_response(request)
+        self.registrar(request, resposta, consultas, time.perf_counter() - comeco)
+        return resposta
+
+    async def __acall__(self, request):
+        if not getattr(settings, "PAGINAS_METRICAS", True):
+            return await self.get_response(request)
+
+        consultas = Consultas()
+        request._metricas_template = None
+        comeco = time.perf_counter()
+        pilha = await sync_to_async(self.contar_consultas)(consultas)
+        try:
+            resposta = await self.get_response(request)
+        finally:
+            await sync_to_async(pilha.close)()
+        self.registrar(request, resposta, consultas, time.perf_counter() - comeco)
+        return resposta
+
+    def contar_consultas(self, consultas):
+        pilha = ExitStack()
+        for conexao in connections.all():
+            pilha.enter_context(conexao.execute_wrapper(consultas))
+        return pilha
+
+    def registrar(self, request, resposta, consultas, latencia):
+        rota = request.resolver_match
+        registro.registrar(
+            rota.view_name if rota else "-",
+            {
+                "latencia": latencia,
+                "consultas": consultas.quantidade,
+                "tempo_sql": consultas.tempo,
+                "tempo_template": request._metricas_template,
+                # respostas em streaming não têm tamanho conhecido aqui
+                "tamanho": None if resposta.streaming else len(resposta.content),
+            },
+            consultas.repetida(),
+        )
+
+    # a renderização acontece logo depois deste método
+    def process_template_response(self, request, response):
+        comeco = time.perf_counter()
+
+        def medir(resposta):
+            request._metricas_template = time.perf_counter() - comeco
+
+        response.add_post_render_callback(medir)
+        return response
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.30 on 2026-10-18 08:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('paginas', '0008_alter_fotografo_user'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['user', 'id'], name='cliente_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='portfolio',
+            index=models.Index(fields=['fotografo', 'id'], name='portfolio_fotografo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sessao',
+            index=models.Index(fields=['cadastrado_por', 'data', 'horario', 'id'], name='sessao_dono_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sessao',
+            index=models.Index(fields=['fotografo', 'data', 'horario'], name='sessao_fotografo_data_idx'),
+        ),
+        # auth.User pertence ao Django, então o índice usado por
+        # UsuarioCadastroForm.clean_email é criado direto na tabela
+        migrations.RunSQL(
+            sql='CREATE INDEX IF NOT EXISTS paginas_user_email_idx ON auth_user (email)',
+            reverse_sql='DROP INDEX IF EXISTS paginas_user_email_idx',
+        ),
+    ]
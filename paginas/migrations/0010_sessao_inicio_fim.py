@@ -0,0 +1,58 @@
+import datetime
+
+import django.core.validators
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def preencher_intervalo(apps, schema_editor):
+    Sessao = apps.get_model("paginas", "Sessao")
+    sessoes = Sessao.objects.all()
+    for sessao in sessoes.iterator(chunk_size=2000):
+        sessao.inicio = timezone.make_aware(datetime.datetime.combine(sessao.data, sessao.horario))
+        sessao.fim = sessao.inicio + datetime.timedelta(hours=sessao.duracao)
+        sessao.save(update_fields=["inicio", "fim"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('paginas', '0009_indices'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sessao',
+            name='inicio',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='sessao',
+            name='fim',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.RunPython(preencher_intervalo, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='sessao',
+            name='inicio',
+            field=models.DateTimeField(editable=False),
+        ),
+        migrations.AlterField(
+            model_name='sessao',
+            name='fim',
+            field=models.DateTimeField(editable=False),
+        ),
+        migrations.AlterField(
+            model_name='sessao',
+            name='duracao',
+            field=models.PositiveIntegerField(help_text='Duração em horas.', validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(24)]),
+        ),
+        migrations.RemoveIndex(
+            model_name='sessao',
+            name='sessao_fotografo_data_idx',
+        ),
+        migrations.AddIndex(
+            model_name='sessao',
+            index=models.Index(fields=['fotografo', 'inicio'], name='sessao_fotografo_inicio_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.30 on 2026-10-18 08:29
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('paginas', '0010_sessao_inicio_fim'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fotografo',
+            name='agenda_atualizada_em',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.AddField(
+            model_name='sessao',
+            name='atualizado_em',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.30 on 2026-10-18 08:31
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('paginas', '0011_agenda_atualizada'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumoMensal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField()),
+                ('sessoes', models.IntegerField(default=0)),
+                ('finalizadas', models.IntegerField(default=0)),
+                ('horas', models.IntegerField(default=0)),
+                ('receita', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('dono', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                ('fotografo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='paginas.fotografo')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ResumoCliente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField()),
+                ('sessoes', models.IntegerField(default=0)),
+                ('receita', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('cliente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='paginas.cliente')),
+                ('dono', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='resumomensal',
+            constraint=models.UniqueConstraint(fields=('dono', 'mes', 'fotografo'), name='resumo_mensal_unico'),
+        ),
+        migrations.AddConstraint(
+            model_name='resumocliente',
+            constraint=models.UniqueConstraint(fields=('dono', 'mes', 'cliente'), name='resumo_cliente_unico'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-18 08:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('paginas', '0012_resumos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fotografo',
+            name='atualizado_em',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='portfolio',
+            name='atualizado_em',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+from django.db import migrations
+
+from paginas import busca
+
+
+def criar(apps, schema_editor):
+    busca.criar_indice(schema_editor.connection)
+    busca.reindexar(schema_editor.connection.alias, apps)
+
+
+def remover(apps, schema_editor):
+    busca.remover_indice(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('paginas', '0013_versao_cards'),
+    ]
+
+    operations = [
+        migrations.RunPython(criar, remover),
+    ]
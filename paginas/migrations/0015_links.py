@@ -0,0 +1,27 @@
+# Generated by Django 4.2.30 on 2026-10-18 09:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('paginas', '0014_busca'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Link',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.URLField(unique=True)),
+                ('status', models.IntegerField(null=True)),
+                ('tipo_conteudo', models.CharField(blank=True, max_length=100)),
+                ('tamanho', models.BigIntegerField(null=True)),
+                ('erro', models.CharField(blank=True, max_length=255)),
+                ('falhas', models.IntegerField(default=0)),
+                ('quebrado', models.BooleanField(default=False)),
+                ('verificado_em', models.DateTimeField()),
+            ],
+        ),
+    ]
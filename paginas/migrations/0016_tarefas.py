@@ -0,0 +1,35 @@
+# Generated by Django 4.2.30 on 2026-10-18 09:24
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('paginas', '0015_links'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tarefa',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome', models.CharField(max_length=100)),
+                ('argumentos', models.JSONField(default=dict)),
+                ('chave', models.CharField(blank=True, max_length=200, null=True, unique=True)),
+                ('estado', models.CharField(default='pendente', max_length=10)),
+                ('tentativas', models.IntegerField(default=0)),
+                ('max_tentativas', models.IntegerField(default=3)),
+                ('executar_em', models.DateTimeField(default=django.utils.timezone.now)),
+                ('lote', models.CharField(blank=True, db_index=True, max_length=32)),
+                ('erro', models.TextField(blank=True)),
+                ('criada_em', models.DateTimeField(auto_now_add=True)),
+                ('iniciada_em', models.DateTimeField(null=True)),
+                ('concluida_em', models.DateTimeField(null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['estado', 'executar_em'], name='tarefa_fila_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.30 on 2026-10-18 09:28
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('paginas', '0016_tarefas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Lembrete',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('inicio', models.DateTimeField()),
+                ('estado', models.CharField(default='enviando', max_length=10)),
+                ('lote', models.CharField(db_index=True, max_length=32)),
+                ('erro', models.TextField(blank=True)),
+                ('enviado_em', models.DateTimeField(null=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='sessao',
+            index=models.Index(fields=['inicio'], name='sessao_inicio_idx'),
+        ),
+        migrations.AddField(
+            model_name='lembrete',
+            name='destinatario',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='lembrete',
+            name='sessao',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='paginas.sessao'),
+        ),
+        migrations.AddIndex(
+            model_name='lembrete',
+            index=models.Index(fields=['inicio'], name='lembrete_inicio_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='lembrete',
+            constraint=models.UniqueConstraint(fields=('sessao', 'destinatario', 'inicio'), name='lembrete_unico'),
+        ),
+    ]
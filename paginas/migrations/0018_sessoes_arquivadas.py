@@ -0,0 +1,40 @@
+# Generated by Django 4.2.30 on 2026-10-18 09:37
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('paginas', '0017_lembretes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SessaoArquivada',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('data', models.DateField()),
+                ('horario', models.TimeField()),
+                ('tipo', models.CharField(max_length=50)),
+                ('duracao', models.PositiveIntegerField()),
+                ('valor', models.DecimalField(decimal_places=2, max_digits=7)),
+                ('finalizado', models.BooleanField(default=False)),
+                ('inicio', models.DateTimeField()),
+                ('fim', models.DateTimeField()),
+                ('atualizado_em', models.DateTimeField()),
+                ('arquivada_em', models.DateTimeField(default=django.utils.timezone.now)),
+                ('excluida', models.BooleanField(default=False)),
+                ('cadastrado_por', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                ('cliente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='paginas.cliente')),
+                ('fotografo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='paginas.fotografo')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['cadastrado_por', 'data', 'horario', 'id'], name='arquivada_dono_data_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.30 on 2026-10-18 10:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('paginas', '0018_sessoes_arquivadas'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='sessaoarquivada',
+            name='cliente',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='paginas.cliente'),
+        ),
+        migrations.AlterField(
+            model_name='sessaoarquivada',
+            name='fotografo',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='paginas.fotografo'),
+        ),
+    ]
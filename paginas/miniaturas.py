@@ -0,0 +1,232 @@
+import hashlib
+import http.client
+import ipaddress
+import os
+import socket
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from io import BytesIO
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.urls import reverse
+from PIL import Image, ImageOps
+
+
+# Miniaturas das fotos externas (Portfolio.foto_url e Fotografo.foto_perfil).
+# Na primeira vez que uma foto é pedida, a original é baixada uma vez só e
+# todas as variantes são geradas em WebP e JPEG e gravadas em disco, num
+# arquivo por variante com o nome tirado do hash da URL de origem. Quando a
+# pasta passa de PAGINAS_MINIATURAS_LIMITE bytes, os arquivos usados há mais
+# tempo são apagados (a data de modificação marca o último uso).
+#
+# A URL da miniatura leva a origem assinada, então a view não baixa endereços
+# que não vieram dos templates; endereços da rede interna são recusados
+
+SALT = "paginas.miniatura"
+VARIANTES = {
+    "card": (700, 500),  # cards do portfólio (350x250 em telas de alta densidade)
+    "avatar": (160, 160),  # fotos de perfil (40 e 80 px)
+}
+FORMATOS = {
+    "webp": ("WEBP", "image/webp"),
+    "jpg": ("JPEG", "image/jpeg"),
+}
+TAMANHO_MAXIMO_ORIGEM = 20 * 1024 * 1024
+TEMPO_LIMITE = 10
+# falhas ficam em cache para não baixar de novo a cada visita
+TEMPO_FALHA = 60 * 5
+# só regrava a data de uso se a anterior for mais antiga que isso
+INTERVALO_USO = 60 * 60
+
+_travas = [threading.Lock() for _ in range(16)]
+
+
+class OrigemIndisponivel(Exception):
+    pass
+
+
+def url_da_miniatura(origem, variante):
+    token = signing.dumps(origem, salt=SALT, compress=True)
+    return reverse("miniatura", args=[variante, token])
+
+
+def ler_token(token):
+    return signing.loads(token, salt=SALT)
+
+
+def pasta():
+    return Path(getattr(settings, "PAGINAS_MINIATURAS_DIR", settings.BASE_DIR / "cache" / "miniaturas"))
+
+
+def chave(origem):
+    return hashlib.sha256(origem.encode()).hexdigest()
+
+
+def caminho(origem, variante, formato):
+    nome = chave(origem)
+    return pasta() / nome[:2] / f"{nome}-{variante}.{formato}"
+
+
+############################################################################ ORIGEM #############
+
+# Também usado pelo verificador de links (links.py)
+def endereco_permitido(ip):
+    return getattr(settings, "PAGINAS_MINIATURAS_REDE_INTERNA", False) or ipaddress.ip_address(ip).is_global
+
+
+def verificar_endereco(url):
+    partes = urlsplit(url)
+    if partes.scheme not in ("http", "https") or not partes.hostname:
+        raise OrigemIndisponivel(f"URL não suportada: {url}")
+
+
+# Resolve o nome, confere os endereços e conecta num deles. A conferência e a
+# conexão usam a mesma resolução: resolver de novo ao conectar deixaria um DNS
+# que muda de resposta (DNS rebinding) levar a conexão para a rede interna.
+# O nome continua no Host e no SNI/certificado do HTTPS
+def conectar(endereco, timeout, source_address=None):
+    host, porta = endereco
+    if getattr(settings, "PAGINAS_MINIATURAS_REDE_INTERNA", False):
+        return socket.create_connection(endereco, timeout, source_address)
+    try:
+        enderecos = socket.getaddrinfo(host, porta, proto=socket.IPPROTO_TCP)
+    except socket.gaierror as erro:
+        raise OrigemIndisponivel(str(erro))
+    for *_, ip in enderecos:
+        if not endereco_permitido(ip[0]):
+            raise OrigemIndisponivel(f"Endereço interno recusado: {host}")
+    return socket.create_connection((enderecos[0][4][0], porta), timeout, source_address)
+
+
+class ConexaoVerificada(http.client.HTTPConnection):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._create_connection = conectar
+
+
+class ConexaoVerificadaHttps(http.client.HTTPSConnection):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._create_connection = conectar
+
+
+class AberturaVerificada(urllib.request.HTTPHandler, urllib.request.HTTPSHandler):
+
+    def http_open(self, req):
+        return self.do_open(ConexaoVerificada, req)
+
+    def https_open(self, req):
+        return self.do_open(ConexaoVerificadaHttps, req, context=self._context)
+
+
+class RedirecionamentoVerificado(urllib.request.HTTPRedirectHandler):
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        verificar_endereco(newurl)
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+def baixar(origem):
+    verificar_endereco(origem)
+    # sem proxy: a conexão vai direto ao endereço conferido, em cada redirecionamento
+    abrir = urllib.request.build_opener(
+        urllib.request.ProxyHandler({}), AberturaVerificada, RedirecionamentoVerificado
+    ).open
+    pedido = urllib.request.Request(origem, headers={"User-Agent": "pw2025-miniaturas"})
+    try:
+        with abrir(pedido, timeout=TEMPO_LIMITE) as resposta:
+            dados = resposta.read(TAMANHO_MAXIMO_ORIGEM + 1)
+    except (urllib.error.URLError, OSError, ValueError) as erro:
+        raise OrigemIndisponivel(str(erro))
+    if len(dados) > TAMANHO_MAXIMO_ORIGEM:
+        raise OrigemIndisponivel("Imagem de origem grande demais.")
+    return dados
+
+
+############################################################################ GERAÇÃO #############
+
+def gerar(dados):
+    try:
+        with Image.open(BytesIO(dados)) as imagem:
+            imagem = ImageOps.exif_transpose(imagem).convert("RGB")
+    except (OSError, Image.DecompressionBombError) as erro:
+        raise OrigemIndisponivel(f"Imagem inválida: {erro}")
+    for variante, tamanho in VARIANTES.items():
+        # recorta no centro, como o object-fit: cover dos templates
+        reduzida = ImageOps.fit(imagem, tamanho, Image.LANCZOS)
+        for formato, (nome, _) in FORMATOS.items():
+            saida = BytesIO()
+            reduzida.save(saida, nome, quality=80)
+            yield variante, formato, saida.getvalue()
+
+
+def gravar(arquivo, conteudo):
+    arquivo.parent.mkdir(parents=True, exist_ok=True)
+    # grava num temporário e troca: quem estiver lendo nunca vê meio arquivo
+    descritor, temporario = tempfile.mkstemp(dir=arquivo.parent, suffix=".tmp")
+    with os.fdopen(descritor, "wb") as saida:
+        saida.write(conteudo)
+    os.replace(temporario, arquivo)
+
+
+def limpar_excesso(manter=""):
+    limite = getattr(settings, "PAGINAS_MINIATURAS_LIMITE", 500 * 1024 * 1024)
+    arquivos = []
+    for raiz, _, nomes in os.walk(pasta()):
+        for nome in nomes:
+            dados = os.stat(os.path.join(raiz, nome))
+            arquivos.append((dados.st_mtime, dados.st_size, os.path.join(raiz, nome)))
+    total = sum(tamanho for _, tamanho, _ in arquivos)
+    if total <= limite:
+        return
+    # apaga até ficar com folga, para não limpar de novo a cada miniatura nova
+    for _, tamanho, arquivo in sorted(arquivos):
+        if total <= limite * 0.9:
+            break
+        # as miniaturas que acabaram de ser geradas ainda vão ser servidas
+        if manter and os.path.basename(arquivo).startswith(manter):
+            continue
+        try:
+            os.remove(arquivo)
+        except FileNotFoundError:
+            pass
+        total -= tamanho
+
+
+def obter(origem, variante, formato):
+    arquivo = caminho(origem, variante, formato)
+    try:
+        usado_em = arquivo.stat().st_mtime
+    except FileNotFoundError:
+        pass
+    else:
+        if time.time() - usado_em > INTERVALO_USO:
+            os.utime(arquivo)
+        return arquivo
+
+    nome = chave(origem)
+    chave_falha = f"paginas:miniatura-falha:{nome}"
+    # uma trava por origem (dentro do processo): pedidos simultâneos da mesma
+    # foto esperam a primeira geração em vez de baixar de novo
+    with _travas[int(nome[:2], 16) % len(_travas)]:
+        if arquivo.exists():
+            return arquivo
+        if cache.get(chave_falha):
+            raise OrigemIndisponivel(origem)
+        try:
+            for outra_variante, outro_formato, conteudo in gerar(baixar(origem)):
+                gravar(caminho(origem, outra_variante, outro_formato), conteudo)
+        except OrigemIndisponivel:
+            cache.set(chave_falha, True, TEMPO_FALHA)
+            raise
+    limpar_excesso(manter=nome)
+    return arquivo
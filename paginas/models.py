@@ -1,11 +1,58 @@
+from datetime import datetime, timedelta
+
 from django.db import models
 from django.contrib.auth.models import User
+from django.core import signing
+from django.core.validators import MinValueValidator, MaxValueValidator
+from django.urls import reverse
+from django.utils import timezone
+
+
+# Uma sessão dura no máximo um dia. Esse limite é o que permite buscar
+# conflitos lendo só uma faixa curta do índice (fotografo, inicio)
+DURACAO_MAXIMA = 24
+
+
+def intervalo_da_sessao(data, horario, duracao):
+    inicio = timezone.make_aware(datetime.combine(data, horario))
+    return inicio, inicio + timedelta(hours=duracao)
+
+
+# Querysets usados nas listagens: carregam as relações exibidas na tabela
+# junto com a consulta principal, evitando uma consulta por linha
+class SessaoQuerySet(models.QuerySet):
+    def para_listagem(self):
+        return self.select_related("cliente", "fotografo")
+
+    # Sessões do fotógrafo que se sobrepõem a [inicio, fim)
+    def conflitantes(self, fotografo, inicio, fim):
+        return self.filter(
+            fotografo=fotografo,
+            inicio__gte=inicio - timedelta(hours=DURACAO_MAXIMA),
+            inicio__lt=fim,
+            fim__gt=inicio,
+        )
+
+
+class PortfolioQuerySet(models.QuerySet):
+    def para_listagem(self):
+        return self.select_related("fotografo")
+
+    def com_link_quebrado(self):
+        quebrados = Link.objects.filter(url=models.OuterRef("foto_url"), quebrado=True)
+        return self.annotate(link_quebrado=models.Exists(quebrados))
+
 
 class Cliente(models.Model):
     nome = models.CharField(max_length=100, null=True)
     telefone = models.CharField(max_length=20, null=True)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "id"], name="cliente_user_idx"),
+        ]
+
     def __str__(self):
         return f"{self.nome} ({self.telefone})"
 
@@ -15,29 +62,107 @@ class Fotografo(models.Model):
     telefone = models.CharField(max_length=20, null=True)
     foto_perfil = models.URLField(null=True, blank=True)
     user = models.OneToOneField(User, on_delete=models.CASCADE)
+    # Muda sempre que uma sessão do fotógrafo é salva ou excluída (ver signals.py);
+    # é o que o feed .ics usa para responder 304 sem consultar as sessões
+    agenda_atualizada_em = models.DateTimeField(default=timezone.now, editable=False)
+    # Versão do cadastro, usada na chave dos cards em cache
+    atualizado_em = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.nome} - {self.especialidade}"
 
+    def get_url_agenda(self):
+        token = signing.dumps(self.pk, salt="paginas.agenda")
+        return reverse("agenda-fotografo", args=[token])
+
 class Sessao(models.Model):
     data = models.DateField()
     horario = models.TimeField()
     tipo = models.CharField(max_length=50)
-    duracao = models.PositiveIntegerField()
+    duracao = models.PositiveIntegerField(
+        validators=[MinValueValidator(1), MaxValueValidator(DURACAO_MAXIMA)],
+        help_text="Duração em horas.",
+    )
     valor = models.DecimalField(max_digits=7,decimal_places=2)
     finalizado = models.BooleanField(default=False)
     cliente = models.ForeignKey(Cliente, on_delete=models.PROTECT)
     fotografo = models.ForeignKey(Fotografo, on_delete=models.PROTECT)
     cadastrado_por = models.ForeignKey(User, on_delete=models.CASCADE)
+    # Calculados a partir de data/horario/duracao em save()
+    inicio = models.DateTimeField(editable=False)
+    fim = models.DateTimeField(editable=False)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    objects = SessaoQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # SessaoList: filtra pelo dono e pagina por (data, horario, id)
+            models.Index(fields=["cadastrado_por", "data", "horario", "id"], name="sessao_dono_data_idx"),
+            # agenda do fotógrafo e detecção de conflitos
+            models.Index(fields=["fotografo", "inicio"], name="sessao_fotografo_inicio_idx"),
+            # lembretes: sessões que começam nas próximas horas, de todos
+            models.Index(fields=["inicio"], name="sessao_inicio_idx"),
+        ]
+
+    def calcular_intervalo(self):
+        self.inicio, self.fim = intervalo_da_sessao(self.data, self.horario, self.duracao)
+
+    def save(self, *args, **kwargs):
+        self.calcular_intervalo()
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"Sessão: {self.tipo} | Cliente: {self.cliente.nome} | Fotógrafo: {self.fotografo.nome} | {self.data} {self.horario}"
 
+# Sessões que saíram da tabela de Sessao (ver arquivo.py): as finalizadas
+# antigas, movidas por "manage.py arquivar_sessoes", e as excluídas pelo
+# usuário, que continuam consultáveis. O id é o mesmo que tinham em Sessao.
+# Como em Sessao, as arquivadas impedem a exclusão do cliente e do fotógrafo,
+# que levaria o histórico junto; as excluídas são descartadas antes (ver
+# arquivo.descartar_excluidas)
+class SessaoArquivada(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    data = models.DateField()
+    horario = models.TimeField()
+    tipo = models.CharField(max_length=50)
+    duracao = models.PositiveIntegerField()
+    valor = models.DecimalField(max_digits=7, decimal_places=2)
+    finalizado = models.BooleanField(default=False)
+    cliente = models.ForeignKey(Cliente, on_delete=models.PROTECT)
+    fotografo = models.ForeignKey(Fotografo, on_delete=models.PROTECT)
+    cadastrado_por = models.ForeignKey(User, on_delete=models.CASCADE)
+    inicio = models.DateTimeField()
+    fim = models.DateTimeField()
+    atualizado_em = models.DateTimeField()
+    arquivada_em = models.DateTimeField(default=timezone.now)
+    excluida = models.BooleanField(default=False)
+
+    objects = SessaoQuerySet.as_manager()
+
+    arquivada = True  # para os templates, que recebem Sessao e SessaoArquivada
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["cadastrado_por", "data", "horario", "id"], name="arquivada_dono_data_idx"),
+        ]
+
+    def __str__(self):
+        return f"Sessão arquivada: {self.tipo} | {self.data} {self.horario}"
+
 # crie um portfolio para o fotografo de fotos com os links das fotos e não uploads
 class Portfolio(models.Model):
     fotografo = models.ForeignKey(Fotografo, on_delete=models.CASCADE)
     foto_url = models.URLField()
     descricao = models.CharField(max_length=255, null=True, blank=True)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    objects = PortfolioQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["fotografo", "id"], name="portfolio_fotografo_idx"),
+        ]
 
     def __str__(self):
         return f"Portfolio de {self.fotografo.nome}: {self.foto_url}"
@@ -47,3 +172,114 @@ class Portfolio(models.Model):
 
 
 
+
+
+# Resumos mantidos por signals.py a cada sessão salva ou excluída, para os
+# relatórios não precisarem somar a tabela de sessões inteira.
+# Podem ser reconstruídos com "manage.py recalcular_resumos"
+class ResumoMensal(models.Model):
+    dono = models.ForeignKey(User, on_delete=models.CASCADE)
+    fotografo = models.ForeignKey(Fotografo, on_delete=models.CASCADE)
+    mes = models.DateField()  # sempre o dia 1
+    sessoes = models.IntegerField(default=0)
+    finalizadas = models.IntegerField(default=0)
+    horas = models.IntegerField(default=0)
+    receita = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["dono", "mes", "fotografo"], name="resumo_mensal_unico"),
+        ]
+
+    @property
+    def taxa_conclusao(self):
+        return self.finalizadas / self.sessoes if self.sessoes else 0
+
+
+class ResumoCliente(models.Model):
+    dono = models.ForeignKey(User, on_delete=models.CASCADE)
+    cliente = models.ForeignKey(Cliente, on_delete=models.CASCADE)
+    mes = models.DateField()
+    sessoes = models.IntegerField(default=0)
+    receita = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["dono", "mes", "cliente"], name="resumo_cliente_unico"),
+        ]
+
+
+# Resultado da última verificação de cada URL de imagem (Portfolio.foto_url e
+# Fotografo.foto_perfil), feita fora das requisições por
+# "manage.py verificar_links" (ver links.py)
+class Link(models.Model):
+    url = models.URLField(unique=True)
+    status = models.IntegerField(null=True)  # vazio quando não houve resposta
+    tipo_conteudo = models.CharField(max_length=100, blank=True)
+    tamanho = models.BigIntegerField(null=True)
+    erro = models.CharField(max_length=255, blank=True)
+    falhas = models.IntegerField(default=0)  # verificações seguidas com erro
+    quebrado = models.BooleanField(default=False)
+    verificado_em = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.url} ({self.status or self.erro})"
+
+
+# Fila de tarefas em segundo plano, executadas por "manage.py trabalhador"
+# (ver tarefas.py). A chave evita enfileirar duas vezes o mesmo trabalho
+class Tarefa(models.Model):
+    PENDENTE = "pendente"
+    EXECUTANDO = "executando"
+    CONCLUIDA = "concluida"
+    FALHOU = "falhou"
+
+    nome = models.CharField(max_length=100)
+    argumentos = models.JSONField(default=dict)
+    chave = models.CharField(max_length=200, unique=True, null=True, blank=True)
+    estado = models.CharField(max_length=10, default=PENDENTE)
+    tentativas = models.IntegerField(default=0)
+    max_tentativas = models.IntegerField(default=3)
+    executar_em = models.DateTimeField(default=timezone.now)
+    lote = models.CharField(max_length=32, blank=True, db_index=True)  # reserva do trabalhador
+    erro = models.TextField(blank=True)
+    criada_em = models.DateTimeField(auto_now_add=True)
+    iniciada_em = models.DateTimeField(null=True)
+    concluida_em = models.DateTimeField(null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["estado", "executar_em"], name="tarefa_fila_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.nome} ({self.estado})"
+
+
+# Lembrete de uma sessão enviado (ou sendo enviado) a um usuário, gravado
+# antes do envio para que uma nova rodada de "manage.py enviar_lembretes"
+# não mande de novo (ver lembretes.py). Remarcar a sessão muda o início e
+# gera outro lembrete
+class Lembrete(models.Model):
+    ENVIANDO = "enviando"
+    ENVIADO = "enviado"
+    FALHOU = "falhou"
+
+    sessao = models.ForeignKey(Sessao, on_delete=models.CASCADE)
+    destinatario = models.ForeignKey(User, on_delete=models.CASCADE)
+    inicio = models.DateTimeField()
+    estado = models.CharField(max_length=10, default=ENVIANDO)
+    lote = models.CharField(max_length=32, db_index=True)  # rodada que reservou o envio
+    erro = models.TextField(blank=True)
+    enviado_em = models.DateTimeField(null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["sessao", "destinatario", "inicio"], name="lembrete_unico"),
+        ]
+        indexes = [
+            models.Index(fields=["inicio"], name="lembrete_inicio_idx"),
+        ]
+
+    def __str__(self):
+        return f"Lembrete da sessão {self.sessao_id} para {self.destinatario_id} ({self.estado})"
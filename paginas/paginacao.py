@@ -0,0 +1,136 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import Http404
+
+
+# Paginação por cursor (keyset): em vez de OFFSET, cada página continua a
+# partir da chave do último item exibido, então a página 100 custa o mesmo
+# que a primeira. Os campos de ordenacao_cursor precisam terminar em "pk"
+# para que a ordem seja total.
+
+def codificar_cursor(valores):
+    dados = json.dumps(valores, cls=DjangoJSONEncoder, separators=(",", ":"))
+    return base64.urlsafe_b64encode(dados.encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(token):
+    try:
+        preenchimento = "=" * (-len(token) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(token + preenchimento))
+    except (ValueError, TypeError):
+        return None
+    return valores if isinstance(valores, list) else None
+
+
+def filtro_apos(campos, valores, reverso=False):
+    # (a, b, pk) > (x, y, z)  ==>  a > x OR (a = x AND b > y) OR (a = x AND b = y AND pk > z)
+    operador = "lt" if reverso else "gt"
+    condicao = Q()
+    iguais = {}
+    for campo, valor in zip(campos, valores):
+        condicao |= Q(**iguais, **{f"{campo}__{operador}": valor})
+        iguais[campo] = valor
+    return condicao
+
+
+class PaginaCursor:
+
+    def __init__(self, itens, proximo=None, anterior=None, parametros=None):
+        self.object_list = itens
+        self.proximo = proximo
+        self.anterior = anterior
+        self.parametros = parametros
+
+    def has_next(self):
+        return self.proximo is not None
+
+    def has_previous(self):
+        return self.anterior is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def _url(self, nome, token):
+        parametros = self.parametros.copy()
+        parametros.pop("depois", None)
+        parametros.pop("antes", None)
+        parametros[nome] = token
+        return "?" + parametros.urlencode()
+
+    def url_proxima(self):
+        return self._url("depois", self.proximo)
+
+    def url_anterior(self):
+        return self._url("antes", self.anterior)
+
+
+class PaginacaoCursorMixin:
+    paginate_by = 20
+    ordenacao_cursor = ("pk",)
+
+    def chave_cursor(self, obj):
+        return [getattr(obj, campo) for campo in self.ordenacao_cursor]
+
+    def ler_cursor(self, queryset, token):
+        valores = decodificar_cursor(token)
+        if valores is None or len(valores) != len(self.ordenacao_cursor):
+            raise Http404("Página inválida.")
+        meta = queryset.model._meta
+        try:
+            valores = [
+                (meta.pk if campo == "pk" else meta.get_field(campo)).to_python(valor)
+                for campo, valor in zip(self.ordenacao_cursor, valores)
+            ]
+        # o token vem da URL: to_python() recebe listas, objetos e o que mais vier
+        except (ValidationError, TypeError, ValueError):
+            raise Http404("Página inválida.")
+        # None não se compara no filtro (e os campos da ordenação não são nulos)
+        if None in valores:
+            raise Http404("Página inválida.")
+        return valores
+
+    # Consulta da página (com um item a mais, para saber se há outra) e a
+    # função que monta o resultado a partir dos itens lidos
+    def consulta_da_pagina(self, queryset, page_size):
+        campos = self.ordenacao_cursor
+        depois = self.request.GET.get("depois")
+        antes = self.request.GET.get("antes")
+
+        if antes:
+            valores = self.ler_cursor(queryset, antes)
+            qs = queryset.filter(filtro_apos(campos, valores, reverso=True))
+            qs = qs.order_by(*[f"-{campo}" for campo in campos])
+
+            def montar(itens):
+                return self.montar_pagina(itens[:page_size][::-1], True, len(itens) > page_size)
+        else:
+            qs = queryset
+            if depois:
+                qs = qs.filter(filtro_apos(campos, self.ler_cursor(queryset, depois)))
+            qs = qs.order_by(*campos)
+
+            def montar(itens):
+                return self.montar_pagina(itens[:page_size], len(itens) > page_size, bool(depois))
+        return qs[:page_size + 1], montar
+
+    def montar_pagina(self, itens, tem_proxima, tem_anterior):
+        pagina = PaginaCursor(
+            itens,
+            proximo=codificar_cursor(self.chave_cursor(itens[-1])) if itens and tem_proxima else None,
+            anterior=codificar_cursor(self.chave_cursor(itens[0])) if itens and tem_anterior else None,
+            parametros=self.request.GET,
+        )
+        return (None, pagina, itens, pagina.has_other_pages())
+
+    def paginate_queryset(self, queryset, page_size):
+        qs, montar = self.consulta_da_pagina(queryset, page_size)
+        return montar(list(qs))
+
+    # Mesma paginação para as views assíncronas (ver assincrono.py)
+    async def apaginate_queryset(self, queryset, page_size):
+        qs, montar = self.consulta_da_pagina(queryset, page_size)
+        return montar([item async for item in qs])
@@ -0,0 +1,107 @@
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncMonth
+
+from .models import ResumoCliente, ResumoMensal, Sessao, SessaoArquivada
+
+
+CAMPOS_SESSAO = ["cadastrado_por_id", "fotografo_id", "cliente_id", "data", "duracao", "valor", "finalizado"]
+
+
+def valores_da_sessao(sessao):
+    return {campo: getattr(sessao, campo) for campo in CAMPOS_SESSAO}
+
+
+def _somar(modelo, chave, incrementos):
+    # UPDATE primeiro: quando o resumo já existe (o caso comum) é um comando só,
+    # e a transação já começa com a trava de escrita
+    if modelo.objects.filter(**chave).update(**{campo: F(campo) + valor for campo, valor in incrementos.items()}):
+        return
+    try:
+        with transaction.atomic():
+            modelo.objects.create(**chave, **incrementos)
+    except IntegrityError:
+        # outra requisição criou o resumo ao mesmo tempo
+        modelo.objects.filter(**chave).update(**{campo: F(campo) + valor for campo, valor in incrementos.items()})
+
+
+# Soma (sinal=1) ou retira (sinal=-1) a contribuição de uma sessão dos resumos.
+# Os incrementos usam F() para não perder atualizações concorrentes
+def aplicar(valores, sinal):
+    mes = valores["data"].replace(day=1)
+    valor = Decimal(valores["valor"]) * sinal
+
+    with transaction.atomic():
+        _somar(
+            ResumoMensal,
+            {"dono_id": valores["cadastrado_por_id"], "fotografo_id": valores["fotografo_id"], "mes": mes},
+            {
+                "sessoes": sinal,
+                "finalizadas": sinal if valores["finalizado"] else 0,
+                "horas": valores["duracao"] * sinal,
+                "receita": valor,
+            },
+        )
+        _somar(
+            ResumoCliente,
+            {"dono_id": valores["cadastrado_por_id"], "cliente_id": valores["cliente_id"], "mes": mes},
+            {"sessoes": sinal, "receita": valor},
+        )
+
+
+def atualizar(anteriores, atuais):
+    if anteriores == atuais:
+        return
+    if anteriores:
+        aplicar(anteriores, -1)
+    if atuais:
+        aplicar(atuais, 1)
+
+
+# GROUP BY nas sessões ativas e nas arquivadas (que continuam no histórico;
+# as excluídas não), somando os grupos que aparecem nas duas
+def agrupar(chaves, **agregados):
+    grupos = {}
+    for qs in (Sessao.objects.all(), SessaoArquivada.objects.filter(excluida=False)):
+        linhas = qs.annotate(mes=TruncMonth("data")).values(*chaves).annotate(**agregados).order_by()
+        for linha in linhas:
+            chave = tuple(linha[campo] for campo in chaves)
+            if chave in grupos:
+                for campo in agregados:
+                    grupos[chave][campo] += linha[campo]
+            else:
+                grupos[chave] = linha
+    return grupos.values()
+
+
+# Reconstrói os resumos do zero a partir das sessões (GROUP BY no banco)
+@transaction.atomic
+def recalcular():
+    ResumoMensal.objects.all().delete()
+    ResumoCliente.objects.all().delete()
+
+    ResumoMensal.objects.bulk_create(
+        [
+            ResumoMensal(dono_id=linha["cadastrado_por"], fotografo_id=linha["fotografo"], mes=linha["mes"],
+                         sessoes=linha["sessoes"], finalizadas=linha["finalizadas"],
+                         horas=linha["horas"], receita=linha["receita"])
+            for linha in agrupar(
+                ["cadastrado_por", "fotografo", "mes"],
+                sessoes=Count("pk"),
+                finalizadas=Count("pk", filter=Q(finalizado=True)),
+                horas=Sum("duracao"),
+                receita=Sum("valor"),
+            )
+        ],
+        batch_size=1000,
+    )
+    ResumoCliente.objects.bulk_create(
+        [
+            ResumoCliente(dono_id=linha["cadastrado_por"], cliente_id=linha["cliente"], mes=linha["mes"],
+                          sessoes=linha["sessoes"], receita=linha["receita"])
+            for linha in agrupar(["cadastrado_por", "cliente", "mes"], sessoes=Count("pk"), receita=Sum("valor"))
+        ],
+        batch_size=1000,
+    )
@@ -0,0 +1,133 @@
+from django.contrib.auth.models import Group, User
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import busca, miniaturas, resumos, tarefas
+from .acesso import limpar_principal
+from .caches import limpar_card, limpar_cache_fotografos, limpar_disponibilidade
+from .models import Cliente, Fotografo, Portfolio, Sessao
+
+
+@receiver([post_save, post_delete], sender=Fotografo)
+def fotografo_alterado(sender, instance, created=False, **kwargs):
+    limpar_cache_fotografos()
+    limpar_principal(instance.user_id)
+    if kwargs["signal"] is post_delete:
+        limpar_card("card_fotografo", instance.pk, instance.atualizado_em)
+    elif not created:
+        # o nome vai no feed .ics (X-WR-CALNAME); update() não volta a disparar
+        # o post_save e corrige o agenda_atualizada_em antigo que o save() gravou
+        Fotografo.objects.filter(pk=instance.pk).update(agenda_atualizada_em=timezone.now())
+
+
+@receiver(post_delete, sender=Portfolio)
+def portfolio_excluido(sender, instance, **kwargs):
+    fotografo = Fotografo.objects.filter(pk=instance.fotografo_id).values_list("atualizado_em", flat=True).first()
+    limpar_card("card_portfolio", instance.pk, instance.atualizado_em, fotografo)
+
+
+@receiver([post_save, post_delete], sender=Cliente)
+def cliente_alterado(sender, instance, created=False, **kwargs):
+    # só a criação e a exclusão mudam a lista de clientes do usuário
+    if created or kwargs["signal"] is post_delete:
+        limpar_principal(instance.user_id)
+    else:
+        # nome e telefone aparecem no feed .ics dos fotógrafos das sessões dele
+        Fotografo.objects.filter(sessao__cliente=instance).update(agenda_atualizada_em=timezone.now())
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def grupos_alterados(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action.startswith("post_"):
+            limpar_principal(instance.pk)
+    elif action == "pre_clear":
+        # group.user_set.clear(): depois de limpar não dá mais para saber quem saiu
+        for user_id in User.objects.filter(groups=instance).values_list("pk", flat=True):
+            limpar_principal(user_id)
+    elif action.startswith("post_") and pk_set:
+        for user_id in pk_set:
+            limpar_principal(user_id)
+
+
+# O principal guarda os nomes dos grupos: renomear ou excluir um grupo muda o
+# acesso de todos os seus usuários. A exclusão apaga as linhas de
+# User.groups sem m2m_changed, então os usuários são lidos antes
+@receiver(pre_delete, sender=Group)
+def guardar_usuarios_do_grupo(sender, instance, **kwargs):
+    instance._usuarios = list(instance.user_set.values_list("pk", flat=True))
+
+
+@receiver([post_save, post_delete], sender=Group)
+def grupo_alterado(sender, instance, created=False, **kwargs):
+    if created:
+        return
+    usuarios = getattr(instance, "_usuarios", None)
+    if usuarios is None:
+        usuarios = instance.user_set.values_list("pk", flat=True)
+    for user_id in usuarios:
+        limpar_principal(user_id)
+
+
+# Guarda como a sessão estava no banco: se mudou de mês, de fotógrafo ou de
+# valor, o estado antigo também precisa sair dos caches e dos resumos
+@receiver(pre_save, sender=Sessao)
+def guardar_sessao_anterior(sender, instance, raw=False, **kwargs):
+    instance._anterior = None
+    if instance.pk and not raw:
+        instance._anterior = (
+            Sessao.objects.filter(pk=instance.pk).values(*resumos.CAMPOS_SESSAO, "inicio", "fim").first()
+        )
+
+
+def agenda_alterada(fotografo_id, inicio, fim):
+    limpar_disponibilidade(fotografo_id, inicio, fim)
+    # update() não dispara post_save de Fotografo
+    Fotografo.objects.filter(pk=fotografo_id).update(agenda_atualizada_em=timezone.now())
+
+
+@receiver(post_save, sender=Sessao)
+def sessao_salva(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    agenda_alterada(instance.fotografo_id, instance.inicio, instance.fim)
+    anterior = getattr(instance, "_anterior", None)
+    if anterior:
+        inicio, fim = anterior.pop("inicio"), anterior.pop("fim")
+        if (anterior["fotografo_id"], inicio, fim) != (instance.fotografo_id, instance.inicio, instance.fim):
+            agenda_alterada(anterior["fotografo_id"], inicio, fim)
+    resumos.atualizar(anterior, resumos.valores_da_sessao(instance))
+
+
+@receiver(post_delete, sender=Sessao)
+def sessao_excluida(sender, instance, **kwargs):
+    agenda_alterada(instance.fotografo_id, instance.inicio, instance.fim)
+    resumos.aplicar(resumos.valores_da_sessao(instance), -1)
+
+
+@receiver(post_save, sender=Cliente)
+@receiver(post_save, sender=Fotografo)
+@receiver(post_save, sender=Sessao)
+@receiver(post_save, sender=Portfolio)
+def indexar_para_busca(sender, instance, raw=False, using=None, **kwargs):
+    if not raw:
+        busca.indexar([instance], using=using)
+
+
+@receiver(post_delete, sender=Cliente)
+@receiver(post_delete, sender=Fotografo)
+@receiver(post_delete, sender=Sessao)
+@receiver(post_delete, sender=Portfolio)
+def remover_da_busca(sender, instance, using=None, **kwargs):
+    busca.remover([instance], using=using)
+
+
+# Fotos novas: miniaturas e verificação do link pelo trabalhador. A chave é a
+# da URL, então salvar de novo sem trocar a foto não enfileira nada
+@receiver(post_save, sender=Fotografo)
+@receiver(post_save, sender=Portfolio)
+def preparar_foto(sender, instance, raw=False, **kwargs):
+    url = instance.foto_url if sender is Portfolio else instance.foto_perfil
+    if url and not raw:
+        tarefas.enfileirar("preparar_foto", chave=f"preparar-foto:{miniaturas.chave(url)}", url=url)
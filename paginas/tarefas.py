@@ -0,0 +1,131 @@
+import traceback
+import uuid
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import links, miniaturas
+from .models import Tarefa
+
+
+# Fila de tarefas para o que não precisa acontecer durante a requisição.
+# As funções são registradas com @tarefa e enfileiradas pelo nome:
+#
+#   tarefas.enfileirar("preparar_foto", chave=f"preparar-foto:{miniaturas.chave(url)}", url=url)
+#
+# A tarefa é uma linha em Tarefa gravada na mesma transação de quem enfileira:
+# o trabalhador ("manage.py trabalhador") só a enxerga depois do commit e, se
+# houver rollback, ela some junto, como com transaction.on_commit, mas sem
+# perder a tarefa se o processo cair logo depois do commit. Com chave, a
+# mesma tarefa não é enfileirada de novo enquanto a linha existir.
+#
+# Uma tarefa que falha volta para a fila com espera dobrando a cada tentativa,
+# até max_tentativas; uma que passa de PAGINAS_TAREFAS_TEMPO_LIMITE em
+# execução (trabalhador que caiu) é reservada de novo. Por isso as tarefas
+# precisam poder rodar mais de uma vez sem efeito duplicado.
+#
+# Com PAGINAS_TAREFAS_SINCRONAS não há fila: a função roda no próprio
+# processo no commit da transação (testes e desenvolvimento)
+
+ESPERA_INICIAL = 30  # segundos; dobra a cada tentativa
+TENTATIVAS = 3
+
+REGISTRO = {}  # nome -> (função, tentativas)
+
+
+def tarefa(funcao=None, *, tentativas=TENTATIVAS):
+    def registrar(funcao):
+        REGISTRO[funcao.__name__] = (funcao, tentativas)
+        return funcao
+    return registrar(funcao) if funcao else registrar
+
+
+def enfileirar(nome, *, chave=None, atraso=0, **argumentos):
+    funcao, tentativas = REGISTRO[nome]
+    if settings.PAGINAS_TAREFAS_SINCRONAS:
+        transaction.on_commit(partial(funcao, **argumentos))
+        return None
+    nova = Tarefa(
+        nome=nome, argumentos=argumentos, chave=chave, max_tentativas=tentativas,
+        executar_em=timezone.now() + timedelta(seconds=atraso),
+    )
+    try:
+        # savepoint: a chave repetida não pode estragar a transação de quem chamou
+        with transaction.atomic():
+            nova.save()
+    except IntegrityError:
+        return None
+    return nova
+
+
+# Reserva até "limite" tarefas prontas num UPDATE só: dois trabalhadores nunca
+# pegam a mesma linha, porque o UPDATE confere o estado de novo (no SQLite a
+# escrita é exclusiva; no PostgreSQL a linha é relida depois da trava)
+def reservar(limite):
+    agora = timezone.now()
+    perdidas = Q(estado=Tarefa.EXECUTANDO, iniciada_em__lt=agora - timedelta(seconds=settings.PAGINAS_TAREFAS_TEMPO_LIMITE))
+    Tarefa.objects.filter(perdidas, tentativas__gte=F("max_tentativas")).update(
+        estado=Tarefa.FALHOU, erro="Tempo limite esgotado.", concluida_em=agora
+    )
+    prontas = Q(estado=Tarefa.PENDENTE, executar_em__lte=agora) | perdidas
+    lote = uuid.uuid4().hex
+    ids = Tarefa.objects.filter(prontas).order_by("executar_em", "pk").values("pk")[:limite]
+    Tarefa.objects.filter(prontas, pk__in=ids).update(
+        estado=Tarefa.EXECUTANDO, lote=lote, iniciada_em=agora, tentativas=F("tentativas") + 1
+    )
+    return list(Tarefa.objects.filter(lote=lote).order_by("executar_em", "pk"))
+
+
+def executar(item):
+    try:
+        funcao, _ = REGISTRO.get(item.nome, (None, None))
+        if funcao is None:
+            item.max_tentativas = item.tentativas  # sem função, não adianta repetir
+            raise LookupError(f"Tarefa desconhecida: {item.nome}")
+        funcao(**item.argumentos)
+    except Exception:
+        agora = timezone.now()
+        if item.tentativas < item.max_tentativas:
+            espera = ESPERA_INICIAL * 2 ** (item.tentativas - 1)
+            alteracoes = {"estado": Tarefa.PENDENTE, "executar_em": agora + timedelta(seconds=espera)}
+        else:
+            alteracoes = {"estado": Tarefa.FALHOU, "concluida_em": agora}
+        item.estado = alteracoes["estado"]
+        item.erro = traceback.format_exc()
+        # só se a reserva ainda for deste lote (pode ter expirado e sido refeita)
+        Tarefa.objects.filter(pk=item.pk, lote=item.lote).update(erro=item.erro, **alteracoes)
+    else:
+        item.estado = Tarefa.CONCLUIDA
+        Tarefa.objects.filter(pk=item.pk, lote=item.lote).update(
+            estado=Tarefa.CONCLUIDA, erro="", concluida_em=timezone.now()
+        )
+    return item
+
+
+# Executa as tarefas prontas, uma depois da outra, até a fila esvaziar
+def processar(limite=None):
+    executadas = []
+    while limite is None or len(executadas) < limite:
+        reservadas = reservar(1)
+        if not reservadas:
+            break
+        executadas.append(executar(reservadas[0]))
+    return executadas
+
+
+########################################################################### TAREFAS ############
+
+# Gera as miniaturas de uma foto nova antes da primeira visita e já verifica
+# o link, sem esperar a próxima rodada de "manage.py verificar_links"
+@tarefa
+def preparar_foto(url):
+    try:
+        # uma variante basta: o download gera todas
+        miniaturas.obter(url, "card", "webp")
+    except miniaturas.OrigemIndisponivel:
+        pass  # a falha fica registrada pelo verificador de links
+    links.verificar([url])
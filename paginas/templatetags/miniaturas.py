@@ -0,0 +1,14 @@
+from django import template
+
+from paginas.miniaturas import url_da_miniatura
+
+
+register = template.Library()
+
+
+# {{ obj.foto_url|miniatura:"card" }} -> URL da miniatura servida por MiniaturaView
+@register.filter
+def miniatura(url, variante="card"):
+    if not url:
+        return ""
+    return url_da_miniatura(url, variante)
@@ -1,3 +1,1557 @@
-from django.test import TestCase
+import asyncio
+import datetime
+import json
+import os
+import shutil
+import socket
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import closing
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO, StringIO
+from unittest import mock
+from urllib.error import HTTPError, URLError
+from urllib.request import urlopen
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser, Group, User
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, router, transaction
+from django.db.models import Sum
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
+from PIL import Image
+
+from .acesso import obter_principal
+from .banco import COOKIE_PRIMARIO, ReplicaMiddleware, _ler_da_replica
+from . import arquivo, busca, lembretes, links, resumos, tarefas
+from .metricas import Consultas, registro
+from .miniaturas import caminho, url_da_miniatura
+from .models import Cliente, Fotografo, Link, Sessao, Portfolio, ResumoMensal, Tarefa, Lembrete, SessaoArquivada
+from .paginacao import codificar_cursor
+from .views import DisponibilidadeAsync, FotografoListAsync, PortfolioListAsync, SessaoCreate, SessaoList
+
+
+class BaseTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("estudio", password="senha-forte-123")
+        self.fotografo = Fotografo.objects.create(
+            nome="Ana", especialidade="Casamento", telefone="1199", user=self.user
+        )
+        self.client.force_login(self.user)
+
+    def criar_sessoes(self, quantidade, **kwargs):
+        for i in range(quantidade):
+            cliente = Cliente.objects.create(nome=f"Cliente {i}", telefone="1188", user=self.user)
+            dados = {
+                "data": datetime.date(2025, 10, 1) + datetime.timedelta(days=i),
+                "horario": datetime.time(9, 0),
+                "tipo": "Ensaio",
+                "duracao": 1,
+                "valor": Decimal("150.00"),
+                "cliente": cliente,
+                "fotografo": self.fotografo,
+                "cadastrado_por": self.user,
+            }
+            dados.update(kwargs)
+            Sessao.objects.create(**dados)
+
+    def criar_fotos(self, quantidade):
+        for i in range(quantidade):
+            Portfolio.objects.create(
+                fotografo=self.fotografo, foto_url=f"https://exemplo.com/{i}.jpg", descricao=f"Foto {i}"
+            )
+
+    def contar_consultas(self, url):
+        # a primeira requisição aquece os caches; conta-se a seguinte
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as ctx:
+            resposta = self.client.get(url)
+        self.assertEqual(resposta.status_code, 200)
+        return len(ctx.captured_queries)
+
+
+class ListagemConsultasTest(BaseTestCase):
+
+    def test_sessoes_numero_fixo_de_consultas(self):
+        self.criar_sessoes(1)
+        poucas = self.contar_consultas(reverse("listar-sessoes"))
+        self.criar_sessoes(20)
+        muitas = self.contar_consultas(reverse("listar-sessoes"))
+        self.assertEqual(poucas, muitas)
+
+    def test_portfolio_numero_fixo_de_consultas(self):
+        self.criar_fotos(1)
+        poucas = self.contar_consultas(reverse("listar-portfolio"))
+        self.criar_fotos(20)
+        muitas = self.contar_consultas(reverse("listar-portfolio"))
+        self.assertEqual(poucas, muitas)
+
+    def test_clientes_numero_fixo_de_consultas(self):
+        self.criar_sessoes(1)
+        poucas = self.contar_consultas(reverse("listar-clientes"))
+        self.criar_sessoes(20)
+        muitas = self.contar_consultas(reverse("listar-clientes"))
+        self.assertEqual(poucas, muitas)
+
+
+class PaginacaoCursorTest(BaseTestCase):
+
+    def percorrer(self, url):
+        vistos = []
+        resposta = self.client.get(url)
+        while True:
+            pagina = resposta.context["page_obj"]
+            vistos.extend(obj.pk for obj in pagina.object_list)
+            if not pagina.has_next():
+                return vistos, pagina
+            resposta = self.client.get(url + pagina.url_proxima())
+
+    def test_sessoes_percorre_todas_em_ordem(self):
+        # mesmo dia e horário: o desempate fica por conta do pk
+        self.criar_sessoes(25, data=datetime.date(2025, 10, 1))
+        self.criar_sessoes(20)
+        vistos, _ = self.percorrer(reverse("listar-sessoes"))
+        esperado = list(Sessao.objects.order_by("data", "horario", "pk").values_list("pk", flat=True))
+        self.assertEqual(vistos, esperado)
+
+    def test_voltar_pagina(self):
+        self.criar_fotos(45)
+        url = reverse("listar-portfolio")
+        primeira = self.client.get(url).context["page_obj"]
+        segunda = self.client.get(url + primeira.url_proxima()).context["page_obj"]
+        self.assertTrue(segunda.has_previous())
+        volta = self.client.get(url + segunda.url_anterior()).context["page_obj"]
+        self.assertEqual([o.pk for o in volta.object_list], [o.pk for o in primeira.object_list])
+        self.assertFalse(volta.has_previous())
+
+    def test_cursor_preserva_filtros(self):
+        self.criar_fotos(25)
+        url = reverse("listar-portfolio")
+        pagina = self.client.get(url, {"fotografo": self.fotografo.pk}).context["page_obj"]
+        self.assertIn(f"fotografo={self.fotografo.pk}", pagina.url_proxima())
+
+    def test_cursor_invalido(self):
+        resposta = self.client.get(reverse("listar-clientes"), {"depois": "lixo"})
+        self.assertEqual(resposta.status_code, 404)
+        for valores in ([{}, {}, {}], [None, None, None], [[1], "x", 1]):
+            token = codificar_cursor(valores)
+            resposta = self.client.get(reverse("listar-sessoes"), {"depois": token})
+            self.assertEqual(resposta.status_code, 404)
+            resposta = self.client.get(reverse("api-listar-sessoes"), {"antes": token})
+            self.assertEqual(resposta.status_code, 400)
+
+
+class PortfolioFiltroTest(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        outro = User.objects.create_user("outro", password="senha-forte-123")
+        self.outro_fotografo = Fotografo.objects.create(nome="Bia", especialidade="Moda", user=outro)
+        self.criar_fotos(3)
+        Portfolio.objects.create(fotografo=self.outro_fotografo, foto_url="https://exemplo.com/m.jpg", descricao="Desfile")
+
+    def test_filtros_no_banco(self):
+        url = reverse("listar-portfolio")
+        self.assertEqual(len(self.client.get(url, {"fotografo": self.outro_fotografo.pk}).context["objetos"]), 1)
+        self.assertEqual(len(self.client.get(url, {"especialidade": "Casamento"}).context["objetos"]), 3)
+        self.assertEqual(len(self.client.get(url, {"q": "desf"}).context["objetos"]), 1)
+
+    def test_lista_de_fotografos_do_filtro(self):
+        resposta = self.client.get(reverse("listar-portfolio"))
+        self.assertEqual([f["nome"] for f in resposta.context["fotografos"]], ["Ana", "Bia"])
+        self.assertEqual(resposta.context["especialidades"], ["Casamento", "Moda"])
+        # o cache é descartado quando um fotógrafo é salvo
+        self.fotografo.nome = "Carla"
+        self.fotografo.save()
+        resposta = self.client.get(reverse("listar-portfolio"))
+        self.assertEqual([f["nome"] for f in resposta.context["fotografos"]], ["Bia", "Carla"])
+
+    def test_fragmento_parcial(self):
+        self.criar_fotos(30)
+        resposta = self.client.get(reverse("listar-portfolio"), {"parcial": 1})
+        self.assertTemplateUsed(resposta, "paginas/portfolio_cards.html")
+        self.assertTemplateNotUsed(resposta, "paginas/bootstrap.html")
+        self.assertContains(resposta, "portfolio-mais")
+
+
+class PlanoConsultasTest(TestCase):
+
+    def test_listagens_usam_indices(self):
+        saida = StringIO()
+        call_command("plano_consultas", stdout=saida)
+        self.assertIn("sessao_dono_data_idx", saida.getvalue())
+
+
+class ConflitoSessaoTest(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.cliente = Cliente.objects.create(nome="Carlos", telefone="1177", user=self.user)
+        self.sessao = Sessao.objects.create(
+            data=datetime.date(2025, 10, 1), horario=datetime.time(10, 0), tipo="Ensaio", duracao=2,
+            valor=Decimal("200.00"), cliente=self.cliente, fotografo=self.fotografo, cadastrado_por=self.user,
+        )
+
+    def dados(self, horario, duracao=1, **kwargs):
+        dados = {
+            "data": "2025-10-01", "horario": horario, "duracao": duracao, "tipo": "Ensaio",
+            "valor": "100.00", "cliente": self.cliente.pk, "fotografo": self.fotografo.pk,
+        }
+        dados.update(kwargs)
+        return dados
+
+    def test_intervalo_calculado_ao_salvar(self):
+        self.assertEqual(self.sessao.fim - self.sessao.inicio, datetime.timedelta(hours=2))
+
+    def test_recusa_sobreposicao(self):
+        resposta = self.client.post(reverse("cadastrar-sessao"), self.dados("11:30"))
+        self.assertEqual(resposta.status_code, 200)
+        self.assertTrue(resposta.context["form"].has_error("__all__", "conflito"))
+        self.assertEqual(Sessao.objects.count(), 1)
+
+    def test_aceita_horario_encostado(self):
+        resposta = self.client.post(reverse("cadastrar-sessao"), self.dados("12:00"))
+        self.assertRedirects(resposta, reverse("listar-sessoes"))
+        self.assertEqual(Sessao.objects.count(), 2)
+
+    def test_editar_nao_conflita_consigo(self):
+        from .forms import SessaoForm
+        form = SessaoForm(self.dados("10:30"), instance=self.sessao)
+        self.assertTrue(form.is_valid(), form.errors)
+
+    def test_horarios_livres(self):
+        from .agenda import horarios_livres
+        livres = horarios_livres(
+            self.fotografo, datetime.date(2025, 10, 1), datetime.date(2025, 10, 1), 1,
+            limite=5, a_partir_de=self.sessao.inicio - datetime.timedelta(hours=2),
+        )
+        inicios = [datetime.datetime.strftime(timezone.localtime(i), "%H:%M") for i, _ in livres]
+        self.assertEqual(inicios, ["08:00", "08:30", "09:00", "12:00", "12:30"])
+
+
+class DisponibilidadeTest(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.cliente = Cliente.objects.create(nome="Carlos", telefone="1177", user=self.user)
+        self.sessao = Sessao.objects.create(
+            data=datetime.date(2025, 10, 2), horario=datetime.time(10, 0), tipo="Ensaio", duracao=2,
+            valor=Decimal("200.00"), cliente=self.cliente, fotografo=self.fotografo, cadastrado_por=self.user,
+        )
+        self.url = reverse("disponibilidade-fotografo")
+        self.params = {"fotografo": self.fotografo.pk, "ano": 2025, "mes": 10}
+
+    def dia(self, resposta, data):
+        return next(d for d in resposta.json()["dias"] if d["data"] == data)
+
+    def test_blocos_do_dia(self):
+        resposta = self.client.get(self.url, self.params)
+        self.assertEqual(len(resposta.json()["dias"]), 31)
+        dia = self.dia(resposta, "2025-10-02")
+        self.assertEqual(dia["ocupados"], [["10:00", "12:00"]])
+        self.assertEqual(dia["livres"], [["08:00", "10:00"], ["12:00", "20:00"]])
+
+    def test_cache_e_invalidacao(self):
+        self.client.get(self.url, self.params)
+        with self.assertNumQueries(2):  # sessão e usuário; a agenda vem do cache
+            self.client.get(self.url, self.params)
+        self.sessao.horario = datetime.time(14, 0)
+        self.sessao.save()
+        dia = self.dia(self.client.get(self.url, self.params), "2025-10-02")
+        self.assertEqual(dia["ocupados"], [["14:00", "16:00"]])
+
+    def test_mudar_de_mes_limpa_mes_antigo(self):
+        self.client.get(self.url, self.params)
+        self.sessao.data = datetime.date(2025, 11, 5)
+        self.sessao.save()
+        dia = self.dia(self.client.get(self.url, self.params), "2025-10-02")
+        self.assertEqual(dia["ocupados"], [])
+
+    def test_parametros_invalidos(self):
+        self.assertEqual(self.client.get(self.url, {"fotografo": "x"}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, dict(self.params, fotografo=999)).status_code, 404)
+
+    def test_anos_nos_limites(self):
+        for ano, mes, status in [(1, 1, 400), (2, 1, 200), (9998, 12, 200), (9999, 12, 400)]:
+            resposta = self.client.get(self.url, dict(self.params, ano=ano, mes=mes))
+            self.assertEqual(resposta.status_code, status)
+
+
+class ExportacaoTest(BaseTestCase):
+
+    def test_sessoes_em_csv(self):
+        self.criar_sessoes(3)
+        outro = User.objects.create_user("outro", password="senha-forte-123")
+        cliente = Cliente.objects.create(nome="=Alheio", user=outro)
+        Sessao.objects.create(
+            data=datetime.date(2025, 1, 1), horario=datetime.time(9, 0), tipo="Outro", duracao=1,
+            valor=Decimal("10.00"), cliente=cliente, fotografo=self.fotografo, cadastrado_por=outro,
+        )
+        resposta = self.client.get(reverse("exportar-sessoes"))
+        self.assertTrue(resposta.streaming)
+        linhas = b"".join(resposta.streaming_content).decode("utf-8-sig").splitlines()
+        self.assertEqual(len(linhas), 4)
+        self.assertEqual(linhas[1], "01/10/2025;09:00;1;Ensaio;Cliente 0;1188;Ana;150,00;Não")
+
+    def test_clientes_respeitam_dono(self):
+        self.criar_sessoes(2)
+        outro = User.objects.create_user("outro", password="senha-forte-123")
+        Cliente.objects.create(nome="=Alheio", user=outro)
+        linhas = b"".join(self.client.get(reverse("exportar-clientes")).streaming_content).decode("utf-8-sig").splitlines()
+        self.assertEqual(linhas, ["Nome;Telefone", "Cliente 0;1188", "Cliente 1;1188"])
+
+        self.client.force_login(User.objects.create_superuser("admin", password="senha-forte-123"))
+        linhas = b"".join(self.client.get(reverse("exportar-clientes")).streaming_content).decode("utf-8-sig").splitlines()
+        self.assertEqual(linhas[-1], "'=Alheio;")
+
+
+class ImportacaoTest(BaseTestCase):
+
+    def importar(self, tipo, conteudo, usuario=None):
+        from .importacao import IMPORTADORES
+        return IMPORTADORES[tipo](usuario or self.user).importar(conteudo.encode())
+
+    def test_clientes(self):
+        relatorio = self.importar("clientes", "Nome;Telefone\nJoão;1199\n;\nMaria;" + "9" * 30 + "\n")
+        self.assertEqual(relatorio.criados, 1)
+        self.assertEqual([linha for linha, _ in relatorio.erros], [4])
+        self.assertEqual(Cliente.objects.get().user, self.user)
+
+    def test_fotografos_criam_usuarios(self):
+        relatorio = self.importar(
+            "fotografos",
+            "usuario,email,nome,especialidade,telefone,foto_perfil\n"
+            "bia,bia@exemplo.com,Bia,Moda,1199,https://exemplo.com/bia.jpg\n"
+            "bia,,Outra Bia,Moda,,\n"
+            "estudio,,Repetido,Moda,,\n"
+            "caio,,Caio,Eventos,,nao-e-url\n",
+        )
+        self.assertEqual(relatorio.criados, 1)
+        self.assertEqual([linha for linha, _ in relatorio.erros], [3, 4, 5])
+        fotografo = Fotografo.objects.get(nome="Bia")
+        self.assertEqual(fotografo.user.username, "bia")
+        self.assertFalse(fotografo.user.has_usable_password())
+        self.assertTrue(fotografo.user.groups.filter(name="Fotógrafo").exists())
+
+    def test_portfolio_por_id_ou_usuario(self):
+        relatorio = self.importar(
+            "portfolio",
+            "fotografo,foto_url,descricao\n"
+            f"{self.fotografo.pk},https://exemplo.com/1.jpg,Um\n"
+            "estudio,https://exemplo.com/2.jpg,Dois\n"
+            "ninguem,https://exemplo.com/3.jpg,Tres\n"
+            "²,https://exemplo.com/4.jpg,Quatro\n",
+        )
+        self.assertEqual(relatorio.criados, 2)
+        self.assertEqual(self.fotografo.portfolio_set.count(), 2)
+        self.assertEqual([linha for linha, _ in relatorio.erros], [4, 5])
+
+    def test_cp1252_detectado_antes_de_gravar(self):
+        from .importacao import IMPORTADORES, ImportadorClientes, TAMANHO_LOTE
+        # o "é" só aparece depois de vários lotes
+        linhas = [f"Cliente {i};11" for i in range(3 * TAMANHO_LOTE)] + ["José Conceição;11"]
+        conteudo = ("Nome;Telefone\n" + "\n".join(linhas) + "\n").encode("cp1252")
+        with mock.patch.object(ImportadorClientes, "gravar", autospec=True, side_effect=ImportadorClientes.gravar) as gravar:
+            relatorio = IMPORTADORES["clientes"](self.user).importar(conteudo)
+        # cada lote gravado uma vez só, já na codificação certa
+        self.assertEqual(gravar.call_count, 4)
+        self.assertEqual((relatorio.criados, Cliente.objects.count()), (3 * TAMANHO_LOTE + 1, 3 * TAMANHO_LOTE + 1))
+        self.assertTrue(Cliente.objects.filter(nome="José Conceição").exists())
+
+    def test_erro_no_meio_mantem_lotes_anteriores(self):
+        from .importacao import ImportadorClientes, TAMANHO_LOTE
+        gravar = ImportadorClientes.gravar
+        lotes = []
+
+        def gravar_e_falhar(importador, forms):
+            lotes.append(len(forms))
+            if len(lotes) == 2:
+                raise RuntimeError
+            gravar(importador, forms)
+
+        conteudo = "nome;telefone\n" + "".join(f"Cliente {i};11\n" for i in range(TAMANHO_LOTE + 1))
+        with mock.patch.object(ImportadorClientes, "gravar", gravar_e_falhar), self.assertRaises(RuntimeError):
+            self.importar("clientes", conteudo)
+        # um lote por transação: o primeiro ficou, o segundo não
+        self.assertEqual(Cliente.objects.count(), TAMANHO_LOTE)
+
+    def test_arquivo_ilegivel(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        self.client.force_login(User.objects.create_superuser("admin", password="senha-forte-123"))
+        arquivo = SimpleUploadedFile("c.csv", b"nome,telefone\n\x81\x8d,11\n")
+        resposta = self.client.post(reverse("importar"), {"tipo": "clientes", "arquivo": arquivo})
+        self.assertContains(resposta, "salve o CSV em UTF-8")
+        self.assertFalse(Cliente.objects.exists())
+
+    def test_view_restrita_ao_admin(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        arquivo = SimpleUploadedFile("c.csv", b"nome,telefone\nZe,11\n")
+        self.client.post(reverse("importar"), {"tipo": "clientes", "arquivo": arquivo})
+        self.assertFalse(Cliente.objects.exists())
+
+        self.client.force_login(User.objects.create_superuser("admin", password="senha-forte-123"))
+        arquivo.seek(0)
+        resposta = self.client.post(reverse("importar"), {"tipo": "clientes", "arquivo": arquivo})
+        self.assertContains(resposta, "1 registro(s) importado(s)")
+
+
+class AgendaIcsTest(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.cliente = Cliente.objects.create(nome="Carlos; Silva", telefone="1177", user=self.user)
+        hoje = timezone.localdate()
+        self.sessao = Sessao.objects.create(
+            data=hoje, horario=datetime.time(10, 0), tipo="Ensaio", duracao=2,
+            valor=Decimal("200.00"), cliente=self.cliente, fotografo=self.fotografo, cadastrado_por=self.user,
+        )
+        self.fotografo.refresh_from_db()
+        self.url = self.fotografo.get_url_agenda()
+        self.client.logout()
+
+    def conteudo(self, resposta):
+        return b"".join(resposta.streaming_content).decode()
+
+    def test_feed(self):
+        resposta = self.client.get(self.url)
+        self.assertEqual(resposta["Content-Type"], "text/calendar; charset=utf-8")
+        texto = self.conteudo(resposta)
+        self.assertIn(f"UID:sessao-{self.sessao.pk}@pw2025\r\n", texto)
+        self.assertIn("SUMMARY:Ensaio - Carlos\\; Silva\r\n", texto)
+        self.assertTrue(texto.endswith("END:VCALENDAR\r\n"))
+
+    def test_304_sem_consultar_sessoes(self):
+        etag = self.client.get(self.url)["ETag"]
+        with self.assertNumQueries(1):
+            resposta = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resposta.status_code, 304)
+
+    def test_etag_muda_ao_excluir_sessao(self):
+        etag = self.client.get(self.url)["ETag"]
+        self.sessao.delete()
+        resposta = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertNotIn("BEGIN:VEVENT", self.conteudo(resposta))
+
+    def test_etag_muda_com_cliente_e_nome_do_fotografo(self):
+        etag = self.client.get(self.url)["ETag"]
+        self.cliente.telefone = "1166"
+        self.cliente.save()
+        resposta = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertIn("(1166)", self.conteudo(resposta))
+
+        etag = resposta["ETag"]
+        self.fotografo.refresh_from_db()
+        self.fotografo.nome = "Ana Paula"
+        self.fotografo.save()
+        resposta = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertIn("X-WR-CALNAME:Sessões - Ana Paula", self.conteudo(resposta))
+
+    def test_etag_muda_com_a_janela(self):
+        resposta = self.client.get(self.url)
+        etag, ultima_modificacao = resposta["ETag"], resposta["Last-Modified"]
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        # no dia seguinte a janela de HISTORICO andou: outro corpo, outra ETag
+        amanha = timezone.now() + datetime.timedelta(days=1)
+        with mock.patch("django.utils.timezone.now", return_value=amanha):
+            resposta = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(resposta.status_code, 200)
+            self.assertNotEqual(resposta["Last-Modified"], ultima_modificacao)
+
+    def test_token_invalido(self):
+        self.assertEqual(self.client.get(reverse("agenda-fotografo", args=["abc"])).status_code, 404)
+
+
+class ResumoTest(BaseTestCase):
+
+    def resumo(self):
+        return ResumoMensal.objects.get(fotografo=self.fotografo, mes=datetime.date(2025, 10, 1))
+
+    def test_incremental_igual_ao_recalculado(self):
+        from .models import ResumoMensal, ResumoCliente
+        self.criar_sessoes(5)
+        sessao = Sessao.objects.order_by("pk").first()
+        sessao.finalizado = True
+        sessao.valor = Decimal("300.00")
+        sessao.save()
+        movida = Sessao.objects.order_by("pk").last()
+        movida.data = datetime.date(2025, 11, 3)
+        movida.save()
+        Sessao.objects.order_by("pk")[1].delete()
+
+        resumo = self.resumo()
+        self.assertEqual((resumo.sessoes, resumo.finalizadas, resumo.horas, resumo.receita), (3, 1, 3, Decimal("600.00")))
+
+        campos = ("dono_id", "fotografo_id", "mes", "sessoes", "finalizadas", "horas", "receita")
+        incremental = set(ResumoMensal.objects.filter(sessoes__gt=0).values_list(*campos))
+        clientes = set(ResumoCliente.objects.filter(sessoes__gt=0).values_list("cliente_id", "mes", "receita"))
+        call_command("recalcular_resumos", stdout=StringIO())
+        self.assertEqual(set(ResumoMensal.objects.values_list(*campos)), incremental)
+        self.assertEqual(set(ResumoCliente.objects.values_list("cliente_id", "mes", "receita")), clientes)
+
+    def test_relatorio(self):
+        self.criar_sessoes(3)
+        self.client.get(reverse("relatorios"))
+        with self.assertNumQueries(5):  # sessão, usuário, resumos, totais, clientes
+            resposta = self.client.get(reverse("relatorios"), {"ano": 2025})
+        self.assertEqual(resposta.context["totais"]["receita"], Decimal("450.00"))
+        self.assertEqual(len(resposta.context["melhores_clientes"]), 3)
+        self.assertContains(resposta, "10/2025")
+
+
+class PrincipalTest(BaseTestCase):
+
+    def test_sem_consultas_de_grupo_por_requisicao(self):
+        from django.contrib.auth.models import Group
+        self.user.groups.add(Group.objects.create(name="Fotógrafo"))
+        url = reverse("editar-fotografo", args=[self.fotografo.pk])
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertFalse([q for q in ctx.captured_queries if "auth_group" in q["sql"]])
+
+    def test_invalidacao_ao_mudar_grupos(self):
+        from django.contrib.auth.models import Group
+        url = reverse("editar-fotografo", args=[self.fotografo.pk])
+        self.assertEqual(self.client.get(url).status_code, 302)
+        Group.objects.create(name="Fotógrafo").user_set.add(self.user)
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.user.groups.clear()
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+    def test_invalidacao_ao_renomear_ou_excluir_grupo(self):
+        from django.contrib.auth.models import Group
+        url = reverse("editar-fotografo", args=[self.fotografo.pk])
+        grupo = Group.objects.create(name="Fotógrafo")
+        grupo.user_set.add(self.user)
+        self.assertEqual(self.client.get(url).status_code, 200)
+        grupo.name = "Fotógrafos antigos"
+        grupo.save()
+        self.assertEqual(self.client.get(url).status_code, 302)
+        grupo.name = "Fotógrafo"
+        grupo.save()
+        self.assertEqual(self.client.get(url).status_code, 200)
+        grupo.delete()
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+    def test_portfolio_usa_fotografo_do_principal(self):
+        self.client.post(reverse("cadastrar-portfolio"), {"foto_url": "https://exemplo.com/a.jpg"})
+        foto = Portfolio.objects.get()
+        self.assertEqual(foto.fotografo, self.fotografo)
+
+        outro = User.objects.create_user("outro", password="senha-forte-123")
+        self.client.force_login(outro)
+        self.assertEqual(self.client.get(reverse("editar-portfolio", args=[foto.pk])).status_code, 404)
+        # virar fotógrafo invalida o cache
+        Fotografo.objects.create(nome="Bia", user=outro)
+        self.assertEqual(self.client.get(reverse("cadastrar-portfolio")).status_code, 200)
+        self.assertEqual(self.client.get(reverse("editar-portfolio", args=[foto.pk])).status_code, 404)
+
+
+class CacheTemplatesTest(BaseTestCase):
+
+    def test_pagina_publica_em_cache_para_visitantes(self):
+        self.client.logout()
+        self.client.get(reverse("sobre"))
+        with self.assertNumQueries(0):
+            resposta = self.client.get(reverse("sobre"))
+        self.assertContains(resposta, "Sobre o Hermsdorff")
+        # logado, a página é renderizada com o menu completo
+        self.client.force_login(self.user)
+        self.assertContains(self.client.get(reverse("sobre")), "Sair")
+
+    def test_querystring_nao_entra_no_cache(self):
+        self.client.logout()
+        cache.clear()
+        with mock.patch.object(cache, "set", wraps=cache.set) as gravar:
+            for i in range(3):
+                self.client.get(reverse("sobre"), {"a": i})
+            self.assertFalse([c for c in gravar.call_args_list if c.args[0].startswith("paginas:pagina:")])
+            self.client.get(reverse("sobre"))
+            self.assertTrue(gravar.call_args.args[0].endswith(":" + reverse("sobre")))
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(reverse("sobre")).status_code, 200)
+
+    def test_card_de_portfolio_muda_com_edicao(self):
+        self.criar_fotos(1)
+        url = reverse("listar-portfolio")
+        self.assertContains(self.client.get(url), "Foto 0")
+        foto = Portfolio.objects.get()
+        foto.descricao = "Nova descrição"
+        foto.save()
+        self.assertContains(self.client.get(url), "Nova descrição")
+        self.fotografo.nome = "Carla"
+        self.fotografo.save()
+        self.assertContains(self.client.get(url), "Carla")
+        self.assertContains(self.client.get(reverse("listar-fotografos")), "Carla")
+
+    def test_acoes_fora_do_cache(self):
+        self.criar_fotos(1)
+        url = reverse("listar-portfolio")
+        self.assertContains(self.client.get(url), "Excluir")
+        self.client.force_login(User.objects.create_user("outro", password="senha-forte-123"))
+        self.assertNotContains(self.client.get(url), "Excluir")
+
+
+class BancoTest(TestCase):
+
+    def test_pragmas_aplicados_na_conexao(self):
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA synchronous")
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute("PRAGMA busy_timeout")
+            self.assertEqual(cursor.fetchone()[0], 5000)
+
+
+@override_settings(PAGINAS_REPLICAS=["replica"])
+class ReplicaTest(TestCase):
+
+    # Passa uma requisição pelo middleware e devolve os bancos escolhidos
+    # para leitura e escrita dentro da view
+    def rotear(self, metodo="get", view=None, cookies=None):
+        view = (view or SessaoList).as_view()
+        bancos = {}
+
+        def get_response(request):
+            middleware.process_view(request, view, (), {})
+            bancos["leitura"] = router.db_for_read(Sessao)
+            bancos["escrita"] = router.db_for_write(Sessao)
+            bancos["usuario"] = router.db_for_read(User)
+            return HttpResponse()
+
+        middleware = ReplicaMiddleware(get_response)
+        request = getattr(RequestFactory(), metodo)("/")
+        request.COOKIES.update(cookies or {})
+        resposta = middleware(request)
+        return bancos, resposta
+
+    def test_listagem_le_da_replica(self):
+        bancos, _ = self.rotear()
+        self.assertEqual(bancos, {"leitura": "replica", "escrita": "default", "usuario": "default"})
+        # fora da requisição volta para o principal
+        self.assertEqual(router.db_for_read(Sessao), "default")
+
+    def test_outras_views_leem_do_principal(self):
+        bancos, _ = self.rotear(view=SessaoCreate)
+        self.assertEqual(bancos["leitura"], "default")
+
+    def test_leitura_do_principal_logo_depois_de_um_post(self):
+        bancos, resposta = self.rotear(metodo="post", view=SessaoCreate)
+        self.assertEqual(bancos["leitura"], "default")
+        cookie = resposta.cookies[COOKIE_PRIMARIO]
+        self.assertEqual(cookie["max-age"], 10)
+        bancos, _ = self.rotear(cookies={COOKIE_PRIMARIO: cookie.value})
+        self.assertEqual(bancos["leitura"], "default")
+
+    def test_replicacao_entre_dois_arquivos(self):
+        pasta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, pasta)
+        origem, destino = os.path.join(pasta, "principal.sqlite3"), os.path.join(pasta, "replica.sqlite3")
+        with closing(sqlite3.connect(origem)) as banco, banco:
+            banco.execute("CREATE TABLE sessao (tipo TEXT)")
+            banco.execute("INSERT INTO sessao VALUES ('Casamento')")
+        call_command("replicar_sqlite", origem=origem, destino=destino, stdout=StringIO())
+        with closing(sqlite3.connect(destino)) as banco:
+            self.assertEqual(banco.execute("SELECT tipo FROM sessao").fetchall(), [("Casamento",)])
+
+
+class MetricasTest(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        registro.limpar()
+
+    def test_medicoes_por_rota(self):
+        self.criar_sessoes(3)
+        self.client.get(reverse("listar-sessoes"))
+        dados = registro.resumo()["listar-sessoes"]
+        self.assertEqual(dados["requisicoes"], 1)
+        self.assertGreater(dados["latencia"]["p50"], 0)
+        self.assertGreater(dados["consultas"]["p50"], 0)
+        self.assertGreater(dados["tempo_template"]["p50"], 0)
+        self.assertGreater(dados["tamanho"]["p50"], 0)
+        self.assertEqual(dados["suspeitas_n_mais_1"], 0)
+
+    def test_consulta_repetida(self):
+        consultas = Consultas()
+        for pk in range(5):
+            consultas(lambda *args: None, "SELECT * FROM t WHERE id = %s", [pk], False, {})
+        self.assertEqual(consultas.quantidade, 5)
+        self.assertTrue(consultas.repetida().startswith("5x SELECT"))
+
+    def test_endpoint_so_para_equipe(self):
+        url = reverse("metricas")
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.user.is_staff = True
+        self.user.save()
+        self.client.get(reverse("sobre"))
+        self.assertIn("sobre", self.client.get(url).json())
+
+    @override_settings(PAGINAS_METRICAS_TOKEN="segredo")
+    def test_formato_prometheus_com_token(self):
+        self.client.logout()
+        self.client.get(reverse("sobre"))
+        url = reverse("metricas") + "?formato=prometheus"
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION="Bearer errado").status_code, 403)
+        resposta = self.client.get(url, HTTP_AUTHORIZATION="Bearer segredo")
+        self.assertContains(resposta, '# TYPE paginas_latencia summary')
+        self.assertContains(resposta, 'paginas_latencia_count{view="sobre"} 1')
+
+    @override_settings(PAGINAS_METRICAS_AMOSTRAS=2)
+    def test_contagem_alem_das_amostras(self):
+        for _ in range(3):
+            registro.registrar("sobre", {"latencia": 1.0, "tamanho": None})
+        texto = registro.prometheus()
+        self.assertIn('paginas_latencia_sum{view="sobre"} 3.0', texto)
+        self.assertIn('paginas_latencia_count{view="sobre"} 3', texto)
+        self.assertIn('paginas_tamanho_count{view="sobre"} 0', texto)
+
+
+class BenchmarkTest(TestCase):
+
+    def test_gerar_dados_e_comparar_com_a_base(self):
+        call_command("gerar_dados", estudios=2, clientes=10, fotografos=3, sessoes=40, fotos=12, stdout=StringIO())
+        self.assertEqual(Sessao.objects.count(), 40)
+        self.assertEqual(Portfolio.objects.count(), 12)
+        # as sessões geradas não se sobrepõem na agenda de cada fotógrafo
+        for sessao in Sessao.objects.all():
+            self.assertFalse(Sessao.objects.conflitantes(sessao.fotografo_id, sessao.inicio, sessao.fim)
+                             .exclude(pk=sessao.pk).exists())
+        self.assertEqual(ResumoMensal.objects.aggregate(total=Sum("sessoes"))["total"], 40)
+
+        pasta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, pasta)
+        base = os.path.join(pasta, "base.json")
+        call_command("benchmark_views", vezes=1, base=base, salvar=True, stdout=StringIO(), stderr=StringIO())
+        call_command("benchmark_views", vezes=1, base=base, folga_ms=1000, folga_kb=10000, stdout=StringIO(), stderr=StringIO())
+
+        with open(base, encoding="utf-8") as arquivo:
+            dados = json.load(arquivo)
+        dados["listar-sessoes"]["consultas"] -= 1
+        with open(base, "w", encoding="utf-8") as arquivo:
+            json.dump(dados, arquivo)
+        with self.assertRaisesMessage(CommandError, "listar-sessoes"):
+            call_command("benchmark_views", vezes=1, base=base, folga_ms=1000, folga_kb=10000, stdout=StringIO(), stderr=StringIO())
+
+
+class BuscaTest(BaseTestCase):
+
+    def buscar(self, termo):
+        resposta = self.client.get(reverse("buscar"), {"termo": termo})
+        self.assertEqual(resposta.status_code, 200)
+        return {tipo: [obj.pk for obj in objetos] for tipo, _, objetos in resposta.context["resultados"]}
+
+    def test_prefixo_sem_acento_e_telefone(self):
+        cliente = Cliente.objects.create(nome="João Conceição", telefone="(27) 99876-5432", user=self.user)
+        self.assertEqual(self.buscar("joao conc"), {"cliente": [cliente.pk]})
+        self.assertEqual(self.buscar("2799876"), {"cliente": [cliente.pk]})
+        self.assertEqual(self.buscar("casam"), {"fotografo": [self.fotografo.pk]})
+
+    def test_mesmas_regras_das_listagens(self):
+        outro = User.objects.create_user("outro", password="senha-forte-123")
+        Cliente.objects.create(nome="Mariana de outro", user=outro)
+        meu = Cliente.objects.create(nome="Mariana", user=self.user)
+        foto = Portfolio.objects.create(fotografo=self.fotografo, foto_url="https://exemplo.com/m.jpg",
+                                        descricao="Mariana no parque")
+        self.assertEqual(self.buscar("mariana"), {"cliente": [meu.pk], "portfolio": [foto.pk]})
+
+    def test_equipe_acha_as_proprias_sessoes(self):
+        User.objects.filter(pk=self.user.pk).update(is_staff=True)
+        outro = User.objects.create_user("outro", password="senha-forte-123")
+        # mais que os candidatos da busca, e antes na ordem
+        self.criar_sessoes(40, tipo="Newborn", cadastrado_por=outro)
+        self.criar_sessoes(1, tipo="Newborn")
+        minha = Sessao.objects.get(cadastrado_por=self.user)
+        self.assertEqual(self.buscar("newborn"), {"sessao": [minha.pk]})
+
+    def test_indice_acompanha_alteracoes(self):
+        self.criar_sessoes(1, tipo="Ensaio gestante")
+        sessao = Sessao.objects.get()
+        self.assertEqual(self.buscar("gestante"), {"sessao": [sessao.pk]})
+        sessao.tipo = "Newborn"
+        sessao.save()
+        self.assertEqual(self.buscar("gestante"), {})
+        self.assertEqual(self.buscar("newb"), {"sessao": [sessao.pk]})
+        sessao.delete()
+        self.assertEqual(self.buscar("newborn"), {})
+
+    def test_termo_nao_vira_sintaxe(self):
+        self.assertEqual(self.buscar('" OR * NEAR('), {})
+        call_command("reindexar_busca", stdout=StringIO())
+        self.assertEqual(self.buscar("ana"), {"fotografo": [self.fotografo.pk]})
+
+
+class OpcoesSessaoTest(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.outro = User.objects.create_user("outro", password="senha-forte-123")
+        self.alheio = Cliente.objects.create(nome="Cliente alheio", user=self.outro)
+        self.clientes = [Cliente.objects.create(nome=f"Cliente {i:02d}", user=self.user) for i in range(25)]
+
+    def test_formulario_nao_carrega_todas_as_opcoes(self):
+        resposta = self.client.get(reverse("cadastrar-sessao"))
+        self.assertContains(resposta, 'data-autocomplete="%s"' % reverse("opcoes-sessao", args=["cliente"]))
+        self.assertNotContains(resposta, "Cliente 01")
+        self.assertNotContains(resposta, "Cliente alheio")
+
+    def test_edicao_mostra_so_a_opcao_escolhida(self):
+        self.criar_sessoes(1)
+        sessao = Sessao.objects.get()
+        resposta = self.client.get(reverse("editar-sessao", args=[sessao.pk]))
+        self.assertContains(resposta, f'<option value="{sessao.cliente_id}" selected>', html=False)
+        self.assertNotContains(resposta, "Cliente 01")
+
+    def test_opcoes_do_usuario_paginadas(self):
+        url = reverse("opcoes-sessao", args=["cliente"])
+        dados = self.client.get(url).json()
+        self.assertEqual(len(dados["resultados"]), 20)
+        self.assertNotIn(self.alheio.pk, [item["id"] for item in dados["resultados"]])
+        segunda = self.client.get(dados["proxima"]).json()
+        self.assertEqual(len(segunda["resultados"]), 5)
+        self.assertIsNone(segunda["proxima"])
+
+        dados = self.client.get(url, {"termo": "cliente 0"}).json()
+        self.assertNotIn(self.alheio.pk, [item["id"] for item in dados["resultados"]])
+        dados = self.client.get(url, {"termo": "alheio"}).json()
+        self.assertEqual(dados["resultados"], [])
+        dados = self.client.get(reverse("opcoes-sessao", args=["fotografo"]), {"termo": "ana"}).json()
+        self.assertEqual(dados["resultados"], [{"id": self.fotografo.pk, "texto": str(self.fotografo)}])
+
+    def test_recusa_cliente_de_outro_usuario(self):
+        resposta = self.client.post(reverse("cadastrar-sessao"), {
+            "data": "2025-10-01", "horario": "10:00", "duracao": 1, "tipo": "Ensaio",
+            "valor": "100.00", "cliente": self.alheio.pk, "fotografo": self.fotografo.pk,
+        })
+        self.assertTrue(resposta.context["form"].has_error("cliente"))
+        self.assertFalse(Sessao.objects.exists())
+
+
+# Servidor HTTP local no lugar dos sites de onde vêm as fotos
+class OrigemFalsa(BaseHTTPRequestHandler):
+    imagens = {}
+    acessos = []
+
+    def do_GET(self):
+        self.acessos.append(self.path)
+        dados = self.imagens.get(self.path)
+        if dados is None:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def log_message(self, *args):
+        pass
+
+
+def imagem_png(largura, altura):
+    saida = BytesIO()
+    Image.new("RGB", (largura, altura), "red").save(saida, "PNG")
+    return saida.getvalue()
+
+
+class MiniaturaTest(BaseTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.servidor = ThreadingHTTPServer(("127.0.0.1", 0), OrigemFalsa)
+        threading.Thread(target=cls.servidor.serve_forever, daemon=True).start()
+        cls.origem = f"http://127.0.0.1:{cls.servidor.server_port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.servidor.shutdown()
+        cls.servidor.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        pasta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, pasta)
+        configuracao = override_settings(PAGINAS_MINIATURAS_DIR=pasta, PAGINAS_MINIATURAS_REDE_INTERNA=True)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+        grande = imagem_png(3000, 2000)
+        OrigemFalsa.imagens = {"/grande.png": grande, "/outra.png": grande}
+        OrigemFalsa.acessos = []
+
+    def pedir(self, caminho, variante="card", accept="image/webp,*/*"):
+        return self.client.get(url_da_miniatura(self.origem + caminho, variante), HTTP_ACCEPT=accept)
+
+    def test_gera_variantes_e_baixa_a_origem_uma_vez(self):
+        resposta = self.pedir("/grande.png")
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta["Content-Type"], "image/webp")
+        self.assertIn("immutable", resposta["Cache-Control"])
+        self.assertEqual(Image.open(BytesIO(b"".join(resposta.streaming_content))).size, (700, 500))
+
+        resposta = self.pedir("/grande.png", "avatar", accept="image/*")
+        self.assertEqual(resposta["Content-Type"], "image/jpeg")
+        self.assertEqual(Image.open(BytesIO(b"".join(resposta.streaming_content))).size, (160, 160))
+        self.assertEqual(OrigemFalsa.acessos, ["/grande.png"])
+
+        etag = resposta["ETag"]
+        resposta = self.client.get(url_da_miniatura(self.origem + "/grande.png", "avatar"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resposta.status_code, 304)
+
+    def test_apaga_as_usadas_ha_mais_tempo(self):
+        self.pedir("/grande.png")
+        antigo = caminho(self.origem + "/grande.png", "card", "webp")
+        os.utime(antigo, (time.time() - 3600, time.time() - 3600))
+        # cabem as miniaturas de uma foto, não as de duas
+        ocupado = sum(arquivo.stat().st_size for arquivo in antigo.parent.iterdir())
+        with override_settings(PAGINAS_MINIATURAS_LIMITE=ocupado * 3 // 2):
+            self.pedir("/outra.png")
+        self.assertFalse(antigo.exists())
+        self.assertTrue(caminho(self.origem + "/outra.png", "card", "webp").exists())
+
+    def test_origem_indisponivel_redireciona(self):
+        resposta = self.pedir("/nao-existe.png")
+        self.assertRedirects(resposta, self.origem + "/nao-existe.png", fetch_redirect_response=False)
+        self.pedir("/nao-existe.png")
+        # a falha fica em cache: a origem não é consultada de novo
+        self.assertEqual(OrigemFalsa.acessos, ["/nao-existe.png"])
+
+    def test_recusa_rede_interna_e_token_invalido(self):
+        with override_settings(PAGINAS_MINIATURAS_REDE_INTERNA=False):
+            resposta = self.pedir("/grande.png")
+        self.assertEqual(resposta.status_code, 302)
+        self.assertEqual(OrigemFalsa.acessos, [])
+        self.assertEqual(self.client.get(reverse("miniatura", args=["card", "invalido"])).status_code, 404)
+
+    def test_conecta_no_endereco_verificado(self):
+        # o nome resolve primeiro para o endereço "permitido" e depois para
+        # outro (DNS rebinding): a conexão tem que ir para o que foi conferido
+        resolver = socket.getaddrinfo
+        respostas = iter(["127.0.0.1"])
+
+        def getaddrinfo(host, porta, *args, **kwargs):
+            if host != "origem.teste":
+                return resolver(host, porta, *args, **kwargs)
+            ip = next(respostas, "127.0.0.2")
+            return [(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP, "", (ip, porta))]
+
+        origem = f"http://origem.teste:{self.servidor.server_port}/grande.png"
+        with override_settings(PAGINAS_MINIATURAS_REDE_INTERNA=False), \
+                mock.patch("socket.getaddrinfo", getaddrinfo), \
+                mock.patch("paginas.miniaturas.endereco_permitido", lambda ip: ip == "127.0.0.1"):
+            resposta = self.client.get(url_da_miniatura(origem, "card"))
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(OrigemFalsa.acessos, ["/grande.png"])
+
+    def test_cards_usam_miniaturas(self):
+        self.criar_fotos(1)
+        self.assertContains(self.client.get(reverse("listar-portfolio")), "/miniatura/card/")
+
+
+class ServidorDeLinks(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    pedidos = []
+    ocupado = 0  # quantas vezes /ocupado.png ainda responde 503
+
+    def responder(self, corpo):
+        self.pedidos.append((self.command, self.path))
+        if self.path == "/ok.png":
+            self.enviar(200, {"Content-Type": "image/png", "Content-Length": "1234"}, corpo)
+        elif self.path == "/sem-head.png" and self.command == "HEAD":
+            self.enviar(405, {"Content-Length": "0"}, corpo)
+        elif self.path == "/sem-head.png":
+            self.enviar(200, {"Content-Type": "image/jpeg"}, corpo, b"x" * 500)
+        elif self.path == "/mudou.png":
+            self.enviar(301, {"Location": "/ok.png", "Content-Length": "0"}, corpo)
+        elif self.path == "/pagina.png":
+            self.enviar(200, {"Content-Type": "text/html; charset=utf-8", "Content-Length": "10"}, corpo)
+        elif self.path == "/ocupado.png" and ServidorDeLinks.ocupado:
+            ServidorDeLinks.ocupado -= 1
+            self.enviar(503, {"Retry-After": "0", "Content-Length": "0"}, corpo)
+        elif self.path == "/ocupado.png":
+            self.enviar(200, {"Content-Type": "image/png", "Content-Length": "99"}, corpo)
+        else:
+            self.enviar(404, {"Content-Length": "0"}, corpo)
+
+    def enviar(self, status, cabecalhos, corpo, conteudo=b""):
+        self.send_response(status)
+        for nome, valor in cabecalhos.items():
+            self.send_header(nome, valor)
+        self.send_header("Connection", "close")
+        self.end_headers()
+        if corpo:
+            self.wfile.write(conteudo)
+
+    def do_HEAD(self):
+        self.responder(corpo=False)
+
+    def do_GET(self):
+        self.responder(corpo=True)
+
+    def log_message(self, *args):
+        pass
+
+
+@override_settings(PAGINAS_MINIATURAS_REDE_INTERNA=True, PAGINAS_LINKS_INTERVALO=0)
+class LinksTest(BaseTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.servidor = ThreadingHTTPServer(("127.0.0.1", 0), ServidorDeLinks)
+        threading.Thread(target=cls.servidor.serve_forever, daemon=True).start()
+        cls.origem = f"http://127.0.0.1:{cls.servidor.server_port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.servidor.shutdown()
+        cls.servidor.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        ServidorDeLinks.pedidos = []
+        ServidorDeLinks.ocupado = 0
+
+    def verificar(self, *caminhos):
+        urls = [self.origem + caminho for caminho in caminhos]
+        return asyncio.run(links.Verificador(espera=0.01).verificar_todos(urls))
+
+    def test_head_get_redirecionamento_e_tipo(self):
+        resultados = self.verificar("/ok.png", "/sem-head.png", "/mudou.png", "/pagina.png", "/sumiu.png")
+        ok, sem_head, mudou, pagina, sumiu = resultados.values()
+        self.assertTrue(ok.ok)
+        self.assertEqual((ok.status, ok.tipo_conteudo, ok.tamanho), (200, "image/png", 1234))
+        self.assertTrue(sem_head.ok)
+        self.assertEqual(sem_head.tamanho, 500)  # sem Content-Length: contado no GET
+        self.assertTrue(mudou.ok)
+        self.assertFalse(pagina.ok)  # responde, mas não é imagem
+        self.assertEqual(sumiu.status, 404)
+        self.assertIn(("HEAD", "/sem-head.png"), ServidorDeLinks.pedidos)
+        self.assertIn(("GET", "/sem-head.png"), ServidorDeLinks.pedidos)
+        self.assertNotIn(("GET", "/ok.png"), ServidorDeLinks.pedidos)
+
+    def test_repete_com_espera_quando_o_servidor_esta_ocupado(self):
+        ServidorDeLinks.ocupado = 2
+        resultado = self.verificar("/ocupado.png")[self.origem + "/ocupado.png"]
+        self.assertTrue(resultado.ok)
+        self.assertEqual(ServidorDeLinks.pedidos.count(("HEAD", "/ocupado.png")), 3)
+
+    def test_recusa_rede_interna(self):
+        with override_settings(PAGINAS_MINIATURAS_REDE_INTERNA=False):
+            resultado = self.verificar("/ok.png")[self.origem + "/ok.png"]
+        self.assertIsNone(resultado.status)
+        self.assertIn("interno", resultado.erro)
+        self.assertEqual(ServidorDeLinks.pedidos, [])
+
+    def test_portfolio_esconde_links_quebrados(self):
+        outro = User.objects.create_user("outro", password="senha-forte-123")
+        bia = Fotografo.objects.create(nome="Bia", especialidade="Moda", user=outro)
+        Portfolio.objects.create(fotografo=bia, foto_url=self.origem + "/ok.png", descricao="Inteira")
+        Portfolio.objects.create(fotografo=bia, foto_url=self.origem + "/sumiu.png", descricao="Sumiu")
+        Portfolio.objects.create(fotografo=self.fotografo, foto_url=self.origem + "/pagina.png", descricao="Minha")
+
+        saida = StringIO()
+        call_command("verificar_links", stdout=saida)
+        self.assertIn("3 URL(s) verificadas, 2 com erro", saida.getvalue())
+        self.assertTrue(Link.objects.get(url=self.origem + "/sumiu.png").quebrado)
+        # erro que não é 404/410 só marca como quebrado se repetir
+        self.assertFalse(Link.objects.get(url=self.origem + "/pagina.png").quebrado)
+        call_command("verificar_links", "--todas", stdout=StringIO())
+        self.assertTrue(Link.objects.get(url=self.origem + "/pagina.png").quebrado)
+
+        resposta = self.client.get(reverse("listar-portfolio"))
+        self.assertEqual([obj.descricao for obj in resposta.context["objetos"]], ["Inteira", "Minha"])
+        self.assertContains(resposta, "Link quebrado", count=1)
+
+        # verificadas há pouco não são verificadas de novo
+        ServidorDeLinks.pedidos = []
+        call_command("verificar_links", stdout=StringIO())
+        self.assertEqual(ServidorDeLinks.pedidos, [])
+
+
+class ApiTest(BaseTestCase):
+
+    def test_exige_login(self):
+        self.client.logout()
+        resposta = self.client.get(reverse("api-listar-sessoes"))
+        self.assertEqual(resposta.status_code, 401)
+        self.assertEqual(resposta.json()["erro"], "Autenticação necessária.")
+
+    def test_so_as_sessoes_do_usuario_e_cursor(self):
+        self.criar_sessoes(5)
+        outro = User.objects.create_user("outro", password="senha-forte-123")
+        cliente = Cliente.objects.create(nome="Alheio", user=outro)
+        alheia = Sessao.objects.create(
+            data=datetime.date(2025, 9, 1), horario=datetime.time(9), tipo="Ensaio", duracao=1,
+            valor=Decimal("10"), cliente=cliente, fotografo=self.fotografo, cadastrado_por=outro,
+        )
+        dados = self.client.get(reverse("api-listar-sessoes"), {"limite": 3}).json()
+        self.assertEqual(len(dados["resultados"]), 3)
+        self.assertEqual(dados["resultados"][0]["data"], "2025-10-01")
+        self.assertEqual(dados["resultados"][0]["valor"], "150.00")
+        dados = self.client.get(reverse("api-listar-sessoes"), {"limite": 3, "depois": dados["proxima"]}).json()
+        self.assertEqual([s["data"] for s in dados["resultados"]], ["2025-10-04", "2025-10-05"])
+        self.assertIsNone(dados["proxima"])
+        self.assertEqual(self.client.get(reverse("api-sessao", args=[alheia.pk])).status_code, 404)
+        self.assertEqual(self.client.get(reverse("api-listar-sessoes"), {"depois": "xyz"}).status_code, 400)
+
+    def test_campos_restringem_o_select(self):
+        self.criar_sessoes(2)
+        with CaptureQueriesContext(connection) as ctx:
+            dados = self.client.get(reverse("api-listar-sessoes"), {"campos": "tipo,valor"}).json()
+        self.assertEqual(dados["resultados"][0], {"tipo": "Ensaio", "valor": "150.00"})
+        consulta = next(q["sql"] for q in ctx.captured_queries if 'FROM "paginas_sessao"' in q["sql"])
+        self.assertNotIn('"finalizado"', consulta)
+        self.assertEqual(self.client.get(reverse("api-listar-sessoes"), {"campos": "cliente__user__password"}).status_code, 400)
+
+    def test_embutidos_com_consultas_limitadas(self):
+        self.criar_sessoes(2)
+        url = reverse("api-listar-sessoes") + "?incluir=cliente,fotografo"
+        poucas = self.contar_consultas(url)
+        self.criar_sessoes(20)
+        self.assertEqual(self.contar_consultas(url), poucas)
+        sessao = self.client.get(url).json()["resultados"][0]
+        self.assertEqual(sessao["cliente"]["nome"], "Cliente 0")
+        self.assertEqual(sessao["fotografo"], {"id": self.fotografo.pk, "nome": "Ana", "especialidade": "Casamento", "foto_perfil": None})
+
+    def test_etag_e_304(self):
+        self.criar_fotos(2)
+        resposta = self.client.get(reverse("api-listar-portfolio"))
+        self.assertIn("private", resposta["Cache-Control"])
+        resposta = self.client.get(reverse("api-listar-portfolio"), HTTP_IF_NONE_MATCH=resposta["ETag"])
+        self.assertEqual(resposta.status_code, 304)
+        self.criar_fotos(1)
+        resposta = self.client.get(reverse("api-listar-portfolio"), HTTP_IF_NONE_MATCH=resposta["ETag"])
+        self.assertEqual(resposta.status_code, 200)
+
+
+class AssincronoTest(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.async_client.force_login(self.user)
+        self.criar_fotos(3)
+
+    async def pedir(self, view, url, **parametros):
+        request = AsyncRequestFactory().get(url, parametros)
+        request.user = self.user
+        request.principal = SimpleLazyObject(lambda: obter_principal(self.user))
+        resposta = await view.as_view()(request)
+        if hasattr(resposta, "render"):
+            await sync_to_async(resposta.render)()
+        return resposta
+
+    async def test_portfolio_igual_ao_sincrono(self):
+        url = reverse("listar-portfolio")
+        resposta = await self.pedir(PortfolioListAsync, url)
+        self.assertEqual([obj.descricao for obj in resposta.context_data["objetos"]], ["Foto 0", "Foto 1", "Foto 2"])
+        self.assertEqual(resposta.context_data["especialidades"], ["Casamento"])
+        sincrona = await sync_to_async(self.client.get)(url)
+        self.assertEqual(resposta.content, sincrona.content)
+
+        parcial = await self.pedir(PortfolioListAsync, url, parcial=1)
+        self.assertNotIn("fotografos", parcial.context_data)
+
+    async def test_disponibilidade(self):
+        url = reverse("disponibilidade-fotografo")
+        resposta = await self.pedir(DisponibilidadeAsync, url, fotografo=self.fotografo.pk, ano=2025, mes=10)
+        self.assertEqual(len(json.loads(resposta.content)["dias"]), 31)
+        resposta = await self.pedir(DisponibilidadeAsync, url, fotografo=self.fotografo.pk, ano=2025)
+        self.assertEqual(resposta.status_code, 400)
+
+    async def test_login_exigido(self):
+        request = AsyncRequestFactory().get(reverse("listar-fotografos"))
+        request.user = AnonymousUser()
+        request.principal = SimpleLazyObject(lambda: obter_principal(request.user))
+        resposta = await FotografoListAsync.as_view()(request)
+        self.assertEqual(resposta.status_code, 302)
+
+    async def test_middlewares_no_asgi(self):
+        registro.limpar()
+        resposta = await self.async_client.get(reverse("listar-portfolio"))
+        self.assertEqual(resposta.status_code, 200)
+        self.assertContains(resposta, "Foto 2")
+        # as consultas, feitas na thread da requisição, são contadas
+        self.assertGreater(registro.resumo()["listar-portfolio"]["consultas"]["p50"], 0)
+
+    def test_carga_http(self):
+        servidor = ThreadingHTTPServer(("127.0.0.1", 0), ServidorDeLinks)
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        self.addCleanup(servidor.server_close)
+        self.addCleanup(servidor.shutdown)
+        saida = StringIO()
+        call_command(
+            "carga_http", "--servidor", f"local=http://127.0.0.1:{servidor.server_port}",
+            "--caminho", "/ok.png", "--caminho", "/sumiu.png", "--concorrencia", "4", "--duracao", "0.2", stdout=saida,
+        )
+        linhas = saida.getvalue().splitlines()
+        self.assertTrue(linhas[1].startswith("local") and linhas[1].endswith(" 0"))  # sem erros
+        self.assertEqual(linhas[2].split()[2], "0.0")  # só 404: nenhuma resposta válida
+
+
+EXECUCOES = []
+
+
+@tarefas.tarefa
+def anotar(valor):
+    EXECUCOES.append(valor)
+
+
+@tarefas.tarefa(tentativas=2)
+def quebrar():
+    raise RuntimeError("falhou")
+
+
+class TarefasTest(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        EXECUCOES.clear()
+        Tarefa.objects.all().delete()  # as do setUp (fotos novas)
+
+    def test_chave_e_rollback(self):
+        self.assertIsNotNone(tarefas.enfileirar("anotar", chave="a", valor=1))
+        self.assertIsNone(tarefas.enfileirar("anotar", chave="a", valor=1))
+        try:
+            with transaction.atomic():
+                tarefas.enfileirar("anotar", valor=2)
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertEqual(Tarefa.objects.count(), 1)
+
+    def test_processar(self):
+        tarefas.enfileirar("anotar", valor=1)
+        tarefas.enfileirar("anotar", atraso=60, valor=2)
+        self.assertEqual([item.estado for item in tarefas.processar()], [Tarefa.CONCLUIDA])
+        self.assertEqual(EXECUCOES, [1])
+        self.assertEqual(Tarefa.objects.filter(estado=Tarefa.PENDENTE).count(), 1)
+
+    def test_repete_e_desiste(self):
+        tarefa = tarefas.enfileirar("quebrar")
+        tarefas.processar()
+        tarefa.refresh_from_db()
+        self.assertEqual((tarefa.estado, tarefa.tentativas), (Tarefa.PENDENTE, 1))
+        self.assertIn("RuntimeError: falhou", tarefa.erro)
+        self.assertGreater(tarefa.executar_em, timezone.now())
+
+        Tarefa.objects.update(executar_em=timezone.now())
+        tarefas.processar()
+        tarefa.refresh_from_db()
+        self.assertEqual((tarefa.estado, tarefa.tentativas), (Tarefa.FALHOU, 2))
+
+    def test_reserva_unica_e_perdidas(self):
+        tarefas.enfileirar("anotar", valor=1)
+        reservada, = tarefas.reservar(5)
+        self.assertEqual(tarefas.reservar(5), [])
+        # trabalhador caiu: passado o tempo limite, outra reserva pega a tarefa
+        Tarefa.objects.update(iniciada_em=timezone.now() - datetime.timedelta(hours=1))
+        novamente, = tarefas.reservar(5)
+        self.assertNotEqual(novamente.lote, reservada.lote)
+        # a reserva antiga não grava mais nada
+        tarefas.executar(reservada)
+        self.assertEqual(Tarefa.objects.get().estado, Tarefa.EXECUTANDO)
+
+    def test_cadastro_de_cliente(self):
+        self.client.logout()
+        dados = {"username": "novo", "email": "novo@exemplo.com", "password1": "Senha-forte-123", "password2": "Senha-forte-123"}
+        self.client.post(reverse("cadastrar-usuario"), dados)
+        usuario = User.objects.get(username="novo")
+        # já na requisição, sem depender do trabalhador
+        self.assertTrue(usuario.groups.filter(name="Cliente").exists())
+        self.assertTrue(Cliente.objects.filter(user=usuario).exists())
+        self.assertFalse(Tarefa.objects.exists())
+
+    @override_settings(PAGINAS_TAREFAS_SINCRONAS=True)
+    def test_modo_sincrono(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            tarefas.enfileirar("anotar", chave="a", valor=1)
+            self.assertEqual(EXECUCOES, [])  # só no commit
+        self.assertEqual(EXECUCOES, [1])
+        self.assertFalse(Tarefa.objects.exists())
+
+    def test_foto_nova_enfileira(self):
+        Portfolio.objects.create(fotografo=self.fotografo, descricao="Nova", foto_url="https://exemplo.com/nova.jpg")
+        Portfolio.objects.create(fotografo=self.fotografo, descricao="Mesma", foto_url="https://exemplo.com/nova.jpg")
+        tarefa = Tarefa.objects.get()
+        self.assertEqual((tarefa.nome, tarefa.argumentos), ("preparar_foto", {"url": "https://exemplo.com/nova.jpg"}))
+
+
+class TrabalhadorTest(TransactionTestCase):
+
+    def setUp(self):
+        EXECUCOES.clear()
+
+    def test_comando(self):
+        for valor in range(5):
+            tarefas.enfileirar("anotar", valor=valor)
+        tarefas.enfileirar("quebrar")
+        saida, erros = StringIO(), StringIO()
+        call_command("trabalhador", "--uma-vez", "--concorrencia", "3", stdout=saida, stderr=erros)
+        self.assertEqual(sorted(EXECUCOES), list(range(5)))
+        self.assertEqual(saida.getvalue().count("concluída"), 5)
+        self.assertIn("quebrar", erros.getvalue())
+        self.assertEqual(Tarefa.objects.filter(estado=Tarefa.PENDENTE).count(), 1)
+
+    def test_porta_de_saude(self):
+        with closing(socket.socket()) as livre:
+            livre.bind(("127.0.0.1", 0))
+            porta = livre.getsockname()[1]
+        comando = threading.Thread(
+            target=call_command, args=("trabalhador", "--porta", str(porta)), kwargs={"stdout": StringIO()}
+        )
+        comando.start()
+        try:
+            for _ in range(50):
+                try:
+                    resposta = urlopen(f"http://127.0.0.1:{porta}/")
+                    break
+                except URLError:
+                    time.sleep(0.1)
+            self.assertEqual(resposta.status, 200)
+            # o App Engine pede /_ah/stop antes de desligar a instância
+            with self.assertRaises(HTTPError) as parando:
+                urlopen(f"http://127.0.0.1:{porta}/_ah/stop")
+            self.assertEqual(parando.exception.code, 503)
+        finally:
+            comando.join(10)
+        self.assertFalse(comando.is_alive())
+
+
+class ReceptorDeWebhook(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # mantém a conexão aberta entre os lotes
+    lotes = []
+    conexoes = 0
+
+    def setup(self):
+        super().setup()
+        ReceptorDeWebhook.conexoes += 1
+
+    def do_POST(self):
+        self.lotes.append(json.loads(self.rfile.read(int(self.headers["Content-Length"]))))
+        self.send_response(204)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class BackendQuebrado:
+
+    def enviar(self, mensagens):
+        return ["recusado"] * len(mensagens)
+
+    def fechar(self):
+        pass
+
+
+class LembretesTest(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user.email = "estudio@exemplo.com"
+        self.user.save()
+        # sessões às 9h de 01/10, 02/10, ...; a faixa de 48h pega as duas primeiras
+        self.criar_sessoes(4)
+        self.agora = timezone.make_aware(datetime.datetime(2025, 10, 1, 8, 0))
+
+    def enviar(self, **kwargs):
+        return lembretes.enviar(horas=48, agora=self.agora, **kwargs)
+
+    def test_agrupa_e_nao_repete(self):
+        self.assertEqual(self.enviar(backend="email"), (1, 0, 2))
+        mensagem, = mail.outbox
+        self.assertEqual(mensagem.to, ["estudio@exemplo.com"])
+        self.assertEqual(mensagem.subject, "Lembrete: 2 sessões agendadas")
+        self.assertIn("01/10/2025 09:00 - Ensaio - cliente Cliente 0, fotógrafo Ana", mensagem.body)
+
+        self.assertEqual(self.enviar(backend="email"), (0, 0, 0))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(Lembrete.objects.filter(estado=Lembrete.ENVIADO).count(), 2)
+
+        # remarcada dentro da faixa: novo lembrete
+        sessao = Sessao.objects.get(cliente__nome="Cliente 1")
+        sessao.horario = datetime.time(15, 0)
+        sessao.save()
+        self.assertEqual(self.enviar(backend="email"), (1, 0, 1))
+
+    def test_cliente_com_conta_propria(self):
+        conta = User.objects.create_user("carla", email="carla@exemplo.com")
+        Cliente.objects.filter(nome="Cliente 0").update(user=conta)
+        self.enviar(backend="email")
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), ["carla@exemplo.com", "estudio@exemplo.com"])
+        self.assertIn("1 sessão", next(m.subject for m in mail.outbox if m.to == ["carla@exemplo.com"]))
+
+    def test_falha_e_nova_tentativa(self):
+        with mock.patch.dict(lembretes.BACKENDS, {"quebrado": BackendQuebrado}):
+            self.assertEqual(self.enviar(backend="quebrado"), (0, 1, 0))
+        self.assertEqual(set(Lembrete.objects.values_list("estado", "erro")), {(Lembrete.FALHOU, "recusado")})
+        self.assertEqual(self.enviar(backend="email"), (1, 0, 2))
+        self.assertEqual(Lembrete.objects.filter(estado=Lembrete.ENVIADO).count(), 2)
+
+    def test_falha_de_sessao_que_saiu_da_faixa(self):
+        with mock.patch.dict(lembretes.BACKENDS, {"quebrado": BackendQuebrado}):
+            self.enviar(backend="quebrado")
+        Sessao.objects.filter(cliente__nome="Cliente 1").update(finalizado=True)
+        self.assertEqual(self.enviar(backend="email"), (1, 0, 1))
+        # a reserva antiga não fica presa em "enviando"
+        self.assertFalse(Lembrete.objects.filter(estado=Lembrete.ENVIANDO).exists())
+        self.assertEqual(Lembrete.objects.get(sessao__cliente__nome="Cliente 1").estado, Lembrete.FALHOU)
+
+    def test_reserva_nao_usada_e_desfeita(self):
+        # uma linha do lote da rodada cuja sessão não está entre as próximas
+        # (a Cliente 3 é de 04/10, fora da faixa)
+        fora = Sessao.objects.get(cliente__nome="Cliente 3")
+        Lembrete.objects.create(sessao=fora, destinatario=self.user, inicio=self.agora, lote="0" * 32)
+        with mock.patch.object(lembretes.uuid, "uuid4", return_value=uuid.UUID(int=0)):
+            self.assertEqual(self.enviar(backend="email"), (1, 0, 2))
+        self.assertFalse(Lembrete.objects.filter(sessao=fora).exists())
+
+    def test_webhook_em_lotes_na_mesma_conexao(self):
+        for i in range(2):
+            conta = User.objects.create_user(f"conta{i}", email=f"conta{i}@exemplo.com")
+            Cliente.objects.filter(nome=f"Cliente {i}").update(user=conta)
+        servidor = ThreadingHTTPServer(("127.0.0.1", 0), ReceptorDeWebhook)
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        self.addCleanup(servidor.server_close)
+        self.addCleanup(servidor.shutdown)
+        ReceptorDeWebhook.lotes, ReceptorDeWebhook.conexoes = [], 0
+
+        with override_settings(PAGINAS_LEMBRETES_WEBHOOK_URL=f"http://127.0.0.1:{servidor.server_port}/avisos"):
+            self.assertEqual(self.enviar(backend="webhook", conexoes=1, tamanho_lote=2), (3, 0, 4))
+        self.assertEqual([len(lote) for lote in ReceptorDeWebhook.lotes], [2, 1])
+        self.assertEqual(ReceptorDeWebhook.conexoes, 1)
+        emails = {mensagem["email"] for lote in ReceptorDeWebhook.lotes for mensagem in lote}
+        self.assertEqual(emails, {"estudio@exemplo.com", "conta0@exemplo.com", "conta1@exemplo.com"})
+
+    def test_uma_consulta_de_sessoes(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.enviar(backend="email")
+        self.assertEqual(sum('FROM "paginas_sessao"' in consulta["sql"] for consulta in ctx.captured_queries), 1)
+
+    def test_comando(self):
+        saida = StringIO()
+        call_command("enviar_lembretes", "--backend", "email", "--horas", "10000", stdout=saida)
+        self.assertIn("lembrete(s)", saida.getvalue())
+        with self.assertRaises(CommandError):
+            call_command("enviar_lembretes", "--backend", "webhook")
+
+
+class ArquivoTest(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        # 25 sessões, de 01/10/2025 em diante; as de dia par são finalizadas
+        self.criar_sessoes(25)
+        Sessao.objects.filter(data__day__in=range(2, 32, 2)).update(finalizado=True)
+        resumos.recalcular()
+
+    def datas(self, resposta):
+        return [obj.data.day for obj in resposta.context["objetos"]]
+
+    def test_arquiva_finalizadas_antigas(self):
+        resumo = list(ResumoMensal.objects.values_list("sessoes", "finalizadas", "receita"))
+        self.assertEqual(len(busca.buscar("ensaio", "sessao", limite=100)), 25)
+
+        total = arquivo.arquivar(datetime.date(2025, 10, 11), lote=2)
+        self.assertEqual(total, 5)  # dias 2, 4, 6, 8 e 10
+        self.assertEqual(Sessao.objects.count(), 20)
+        self.assertFalse(SessaoArquivada.objects.filter(finalizado=False).exists())
+        # continuam no histórico, mas não na busca
+        self.assertEqual(list(ResumoMensal.objects.values_list("sessoes", "finalizadas", "receita")), resumo)
+        resumos.recalcular()
+        self.assertEqual(list(ResumoMensal.objects.values_list("sessoes", "finalizadas", "receita")), resumo)
+        self.assertEqual(len(busca.buscar("ensaio", "sessao", limite=100)), 20)
+
+        self.assertEqual(arquivo.arquivar(datetime.date(2025, 10, 11)), 0)
+
+    @override_settings(PAGINAS_REPLICAS=["replica"])
+    def test_arquiva_no_principal_com_replicas(self):
+        # "replica" nem existe em DATABASES: qualquer acesso a ela falharia
+        marca = _ler_da_replica.set(True)
+        self.addCleanup(_ler_da_replica.reset, marca)
+        self.assertEqual(router.db_for_read(Sessao), "replica")
+        self.assertEqual(arquivo.arquivar(datetime.date(2025, 10, 11)), 5)
+        self.assertEqual(SessaoArquivada.objects.using("default").count(), 5)
+
+    def test_listagem_intercala_arquivadas(self):
+        arquivo.arquivar(datetime.date(2025, 10, 11))
+        url = reverse("listar-sessoes")
+        self.assertNotIn(2, self.datas(self.client.get(url)))
+
+        resposta = self.client.get(url, {"arquivadas": "1"})
+        self.assertEqual(self.datas(resposta), list(range(1, 21)))
+        self.assertContains(resposta, "Arquivada", count=5)
+        proxima = self.client.get(url + resposta.context["page_obj"].url_proxima())
+        self.assertEqual(self.datas(proxima), list(range(21, 26)))
+        anterior = self.client.get(url + proxima.context["page_obj"].url_anterior())
+        self.assertEqual(self.datas(anterior), list(range(1, 21)))
+
+        # arquivadas de outro usuário não aparecem
+        SessaoArquivada.objects.update(cadastrado_por=User.objects.create_user("outro"))
+        self.assertEqual(len(self.datas(self.client.get(url, {"arquivadas": "1"}))), 20)
+
+    def test_exclusao_logica(self):
+        sessao = Sessao.objects.get(data__day=3)
+        self.client.post(reverse("excluir-sessao", args=[sessao.pk]))
+        self.assertFalse(Sessao.objects.filter(pk=sessao.pk).exists())
+        self.assertTrue(SessaoArquivada.objects.get(pk=sessao.pk).excluida)
+        # excluída sai dos resumos, como antes
+        self.assertEqual(ResumoMensal.objects.get().sessoes, 24)
+        resumos.recalcular()
+        self.assertEqual(ResumoMensal.objects.get().sessoes, 24)
+        self.assertContains(self.client.get(reverse("listar-sessoes"), {"arquivadas": "1"}), "Excluída")
+
+    def test_cliente_de_sessao_excluida_pode_ser_excluido(self):
+        self.user.groups.add(Group.objects.get_or_create(name="Admin")[0])
+        sessao = Sessao.objects.get(data__day=3)
+        self.client.post(reverse("excluir-sessao", args=[sessao.pk]))
+        self.client.post(reverse("excluir-cliente", args=[sessao.cliente_id]))
+        self.assertFalse(Cliente.objects.filter(pk=sessao.cliente_id).exists())
+        self.assertFalse(SessaoArquivada.objects.filter(pk=sessao.pk).exists())
+
+    def test_cliente_com_historico_nao_pode_ser_excluido(self):
+        self.user.groups.add(Group.objects.get_or_create(name="Admin")[0])
+        arquivo.arquivar(datetime.date(2025, 10, 11))
+        arquivada = SessaoArquivada.objects.first()
+        resposta = self.client.post(reverse("excluir-cliente", args=[arquivada.cliente_id]))
+        self.assertContains(resposta, "o cliente tem sessões cadastradas")
+        self.assertTrue(Cliente.objects.filter(pk=arquivada.cliente_id).exists())
+        # com sessão ativa também, e o fotógrafo idem
+        resposta = self.client.post(reverse("excluir-fotografo", args=[self.fotografo.pk]))
+        self.assertContains(resposta, "o fotógrafo tem sessões cadastradas")
+
+    def test_exportacao(self):
+        arquivo.arquivar(datetime.date(2025, 10, 11))
+        url = reverse("exportar-sessoes")
+        linhas = b"".join(self.client.get(url).streaming_content).decode("utf-8-sig").splitlines()
+        self.assertEqual(len(linhas), 21)
+        linhas = b"".join(self.client.get(url, {"arquivadas": "1"}).streaming_content).decode("utf-8-sig").splitlines()
+        self.assertEqual([linha[:2] for linha in linhas[1:]], [f"{dia:02}" for dia in range(1, 26)])
+
+    def test_api_so_ativas(self):
+        arquivo.arquivar(datetime.date(2025, 10, 11))
+        resposta = self.client.get(reverse("api-listar-sessoes"), {"arquivadas": "1", "limite": "100"})
+        self.assertEqual(len(resposta.json()["resultados"]), 20)
+
+    def test_comando(self):
+        saida = StringIO()
+        call_command("arquivar_sessoes", "--dias", "0", stdout=saida)
+        self.assertIn("12 sessão(ões)", saida.getvalue())
+        self.assertFalse(Sessao.objects.filter(finalizado=True).exists())
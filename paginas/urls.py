@@ -1,7 +1,14 @@
+from django.conf import settings
 from django.urls import path
 from django.contrib.auth import views as auth_views
 from .views import *
 
+
+# No ASGI (settings.PAGINAS_ASYNC) estas rotas usam as views assíncronas
+def escolher_view(sincrona, assincrona):
+    return (assincrona if settings.PAGINAS_ASYNC else sincrona).as_view()
+
+
 urlpatterns = [
     path("", Inicio.as_view(), name="inicio"),
     path('sobre/', SobreView.as_view(), name='sobre'),  # Página sobre
@@ -55,7 +62,30 @@ urlpatterns = [
 
 
     path("listar/clientes/", ClienteList.as_view(), name="listar-clientes"),
-    path("listar/fotografos/", FotografoList.as_view(), name="listar-fotografos"),
+    path("listar/fotografos/", escolher_view(FotografoList, FotografoListAsync), name="listar-fotografos"),
     path("listar/sessoes/", SessaoList.as_view(), name="listar-sessoes"), 
-    path("listar/portfolio/", PortfolioList.as_view(), name="listar-portfolio"),
+    path("listar/portfolio/", escolher_view(PortfolioList, PortfolioListAsync), name="listar-portfolio"),
+
+    path("relatorios/", RelatorioView.as_view(), name="relatorios"),
+    path("buscar/", BuscaView.as_view(), name="buscar"),
+
+    path("importar/", ImportarView.as_view(), name="importar"),
+    path("exportar/clientes/", ClienteExportar.as_view(), name="exportar-clientes"),
+    path("exportar/sessoes/", SessaoExportar.as_view(), name="exportar-sessoes"),
+
+    path("api/clientes/", ClienteApi.as_view(), name="api-listar-clientes"),
+    path("api/clientes/<int:pk>/", ClienteApi.as_view(), name="api-cliente"),
+    path("api/fotografos/", FotografoApi.as_view(), name="api-listar-fotografos"),
+    path("api/fotografos/<int:pk>/", FotografoApi.as_view(), name="api-fotografo"),
+    path("api/sessoes/", SessaoApi.as_view(), name="api-listar-sessoes"),
+    path("api/sessoes/<int:pk>/", SessaoApi.as_view(), name="api-sessao"),
+    path("api/portfolio/", PortfolioApi.as_view(), name="api-listar-portfolio"),
+    path("api/portfolio/<int:pk>/", PortfolioApi.as_view(), name="api-portfolio"),
+
+    path("sessao/opcoes/<str:campo>/", OpcoesSessaoView.as_view(), name="opcoes-sessao"),
+    path("agenda/disponibilidade/", escolher_view(DisponibilidadeView, DisponibilidadeAsync), name="disponibilidade-fotografo"),
+    path("agenda/<str:token>.ics", AgendaFotografoView.as_view(), name="agenda-fotografo"),
+    path("miniatura/<str:variante>/<str:token>/", MiniaturaView.as_view(), name="miniatura"),
+
+    path("metricas/", MetricasView.as_view(), name="metricas"),
 ]
@@ -1,18 +1,41 @@
+import heapq
+from itertools import islice
+
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.views import LoginView
-from django.views.generic import TemplateView, ListView
-from django.views.generic.edit import CreateView, UpdateView, DeleteView
+from django.views.generic import TemplateView, ListView, View
+from django.views.generic.edit import CreateView, UpdateView, DeleteView, FormView
 from django.urls import reverse_lazy
 from django.shortcuts import get_object_or_404
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseRedirect, JsonResponse, StreamingHttpResponse
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import PermissionDenied
+from django.utils.crypto import constant_time_compare
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
 from django.contrib.messages.views import SuccessMessageMixin
 from django.contrib.auth.models import User, Group
-from braces.views import GroupRequiredMixin
-
-from .models import Cliente, Fotografo, Sessao, Portfolio
-from .forms import UsuarioCadastroForm
-
-
-class Inicio(TemplateView):
+from django.db import transaction
+from django.db.models import ProtectedError, Q, Sum
+from django.utils import timezone
+
+from .models import Cliente, Fotografo, Sessao, SessaoArquivada, Portfolio, ResumoMensal, ResumoCliente
+from .forms import UsuarioCadastroForm, SessaoForm, ImportacaoForm, opcoes_da_sessao
+from .caches import PaginaPublicaCacheMixin, fotografos_para_filtro, especialidades_para_filtro, disponibilidade_em_cache
+from .caches import afotografos_para_filtro, adisponibilidade_em_cache
+from .paginacao import PaginacaoCursorMixin
+from .assincrono import ListaAssincronaMixin, ViewAssincronaMixin
+from .exportacao import ExportarCsvMixin
+from .api import ApiMixin, Embutido
+from .importacao import IMPORTADORES
+from .calendario import gerar_ics, janela
+from .acesso import GrupoRequeridoMixin, FotografoDoUsuarioMixin
+from .metricas import registro
+from . import arquivo, busca, miniaturas
+
+
+class Inicio(PaginaPublicaCacheMixin, TemplateView):
     template_name = "paginas/inicio.html"
 
 
@@ -20,16 +43,16 @@ class Inicio(TemplateView):
 
 #Páginas Sobreview, ClienteView, FotógrafoView e SessãoView
 
-class SobreView(TemplateView):
+class SobreView(PaginaPublicaCacheMixin, TemplateView):
     template_name = 'paginas/sobre.html'
 
-class Clienteview(TemplateView):
+class Clienteview(PaginaPublicaCacheMixin, TemplateView):
     template_name = "paginas/cliente.html"
 
-class Fotografoview(TemplateView):
+class Fotografoview(PaginaPublicaCacheMixin, TemplateView):
     template_name = "paginas/fotografo.html"
 
-class Sessãoview(TemplateView):
+class Sessãoview(PaginaPublicaCacheMixin, TemplateView):
     template_name = "paginas/sessao.html"
     
 
@@ -47,6 +70,27 @@ class UserOwnedQuerysetMixin(LoginRequiredMixin):
         return super().form_valid(form)
 
 
+class SessaoFormMixin:
+    form_class = SessaoForm
+
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs["usuario"] = self.request.user
+        return kwargs
+
+    # Trava a linha do fotógrafo e confere o conflito de novo antes de salvar:
+    # duas reservas simultâneas para o mesmo horário não passam juntas.
+    # A trava é um UPDATE e não um SELECT ... FOR UPDATE porque no SQLite a
+    # transação precisa começar escrevendo; se começar lendo, ela falha com
+    # "database is locked" quando outra escrita acontece no meio
+    def form_valid(self, form):
+        with transaction.atomic():
+            Fotografo.objects.filter(pk=form.instance.fotografo_id).update(agenda_atualizada_em=timezone.now())
+            if not form.verificar_conflito():
+                return self.form_invalid(form)
+            return super().form_valid(form)
+
+
 class CadastroClienteView(SuccessMessageMixin, CreateView):
     form_class = UsuarioCadastroForm
     template_name = "paginas/login.html"
@@ -54,11 +98,14 @@ class CadastroClienteView(SuccessMessageMixin, CreateView):
     success_message = "Usuário cadastrado com sucesso!"
     extra_context = {"titulo": "Cadastro de Cliente", 'botao': 'Cadastrar'}
 
+    # usuário, grupo e cliente juntos: sem o Cliente o usuário não consegue
+    # usar o sistema, então isso não fica para o trabalhador
     def form_valid(self, form):
-        url = super().form_valid(form)
-        grupo, _ = Group.objects.get_or_create(name="Cliente")
-        self.object.groups.add(grupo)
-        Cliente.objects.get_or_create(user=self.object)
+        with transaction.atomic():
+            url = super().form_valid(form)
+            grupo, _ = Group.objects.get_or_create(name="Cliente")
+            self.object.groups.add(grupo)
+            Cliente.objects.get_or_create(user=self.object)
         return url
 
 
@@ -101,10 +148,9 @@ class FotografoCreate(LoginRequiredMixin, CreateView):
         form.instance.user = self.request.user
         return super().form_valid(form)
     
-class SessaoCreate(UserOwnedQuerysetMixin, CreateView):
+class SessaoCreate(SessaoFormMixin, UserOwnedQuerysetMixin, CreateView):
     model = Sessao
-    fields = ["data", "horario", "duracao", "tipo", "valor", "finalizado", "cliente", "fotografo"]
-    template_name = "paginas/form.html"
+    template_name = "paginas/sessao_form.html"
     success_url = reverse_lazy("listar-sessoes")
     extra_context = {"titulo": "Cadastrar sessão",
                      'botao': 'Cadastrar'}
@@ -117,7 +163,7 @@ class SessaoCreate(UserOwnedQuerysetMixin, CreateView):
             initial['fotografo'] = get_object_or_404(Fotografo, pk=fotografo_id)
         return initial
     
-class PortfolioCreate(LoginRequiredMixin, CreateView):
+class PortfolioCreate(FotografoDoUsuarioMixin, LoginRequiredMixin, CreateView):
     model = Portfolio
     fields = ["foto_url", "descricao"]
     template_name = "paginas/form.html"
@@ -125,14 +171,13 @@ class PortfolioCreate(LoginRequiredMixin, CreateView):
     extra_context = {"titulo": "Adicionar Foto ao Portfólio", "botao": "Adicionar"}
 
     def form_valid(self, form):
-        fotografo = get_object_or_404(Fotografo, user=self.request.user)
-        form.instance.fotografo = fotografo
+        form.instance.fotografo_id = self.get_fotografo_id()
         return super().form_valid(form)    
 
 
 ########################################################################### UPDATE#############
 
-class ClienteUpdate(GroupRequiredMixin, LoginRequiredMixin, UpdateView):
+class ClienteUpdate(GrupoRequeridoMixin, LoginRequiredMixin, UpdateView):
     group_required = ["Cliente", "Admin"]
     model = Cliente
     fields = ["nome", "telefone"]
@@ -145,7 +190,7 @@ class ClienteUpdate(GroupRequiredMixin, LoginRequiredMixin, UpdateView):
         return get_object_or_404(Cliente, pk=self.kwargs["pk"])
 
 
-class FotografoUpdate(GroupRequiredMixin, LoginRequiredMixin, UpdateView):
+class FotografoUpdate(GrupoRequeridoMixin, LoginRequiredMixin, UpdateView):
     group_required = ["Fotógrafo", "Admin"]
     model = Fotografo
     fields = ["nome", "especialidade", "telefone", "foto_perfil"]
@@ -157,15 +202,14 @@ class FotografoUpdate(GroupRequiredMixin, LoginRequiredMixin, UpdateView):
     def get_object(self, queryset=None):
         return get_object_or_404(Fotografo, pk=self.kwargs["pk"], user=self.request.user)
 
-class SessaoUpdate(UserOwnedQuerysetMixin, UpdateView):
+class SessaoUpdate(SessaoFormMixin, UserOwnedQuerysetMixin, UpdateView):
     model = Sessao
-    fields = ["data", "horario", "duracao", "tipo", "valor", "finalizado", "cliente", "fotografo"]
-    template_name = "paginas/form.html"
+    template_name = "paginas/sessao_form.html"
     success_url = reverse_lazy("excluir-sessoes")
     extra_context = {"titulo": "Editar sessão",
                      'botao': 'Salvar'}
 
-class PortfolioUpdate(LoginRequiredMixin, UpdateView):
+class PortfolioUpdate(FotografoDoUsuarioMixin, LoginRequiredMixin, UpdateView):
     model = Portfolio
     fields = ["foto_url", "descricao"]
     template_name = "paginas/form.html"
@@ -173,16 +217,33 @@ class PortfolioUpdate(LoginRequiredMixin, UpdateView):
     extra_context = {"titulo": "Editar Foto do Portfólio", "botao": "Salvar"}
 
     def get_object(self, queryset=None):
-        fotografo = get_object_or_404(Fotografo, user=self.request.user)
-        return get_object_or_404(Portfolio, pk=self.kwargs["pk"], fotografo=fotografo)    
+        return get_object_or_404(Portfolio, pk=self.kwargs["pk"], fotografo_id=self.get_fotografo_id())    
 
 ########################################################################### DELETE#############
 
-class ClienteDelete(GroupRequiredMixin, LoginRequiredMixin, DeleteView):
+# Cliente e fotógrafo com sessões (ativas ou arquivadas) não podem ser
+# excluídos: em vez do erro 500, o formulário mostra o motivo
+class ExclusaoProtegidaMixin:
+    campo_sessao = None
+    mensagem_protegida = "Não é possível excluir: há sessões cadastradas."
+
+    def form_valid(self, form):
+        try:
+            with transaction.atomic():
+                arquivo.descartar_excluidas(**{self.campo_sessao: self.object})
+                return super().form_valid(form)
+        except ProtectedError:
+            form.add_error(None, self.mensagem_protegida)
+            return self.form_invalid(form)
+
+
+class ClienteDelete(ExclusaoProtegidaMixin, GrupoRequeridoMixin, LoginRequiredMixin, DeleteView):
     group_required = ["Cliente", "Admin"]
     model = Cliente
     template_name = "paginas/form.html"
     success_url = reverse_lazy("listar-clientes")
+    campo_sessao = "cliente"
+    mensagem_protegida = "Não é possível excluir: o cliente tem sessões cadastradas."
     extra_context = {"titulo": "Excluir cliente",
                      'botao': 'Excluir'}
 
@@ -193,11 +254,13 @@ class ClienteDelete(GroupRequiredMixin, LoginRequiredMixin, DeleteView):
         return get_object_or_404(qs, pk=self.kwargs["pk"])
 
 
-class FotografoDelete(GroupRequiredMixin, LoginRequiredMixin, DeleteView):
+class FotografoDelete(ExclusaoProtegidaMixin, GrupoRequeridoMixin, LoginRequiredMixin, DeleteView):
     group_required = ["Fotógrafo", "Admin"]
     model = Fotografo
     template_name = "paginas/form.html"
     success_url = reverse_lazy("listar-fotografos")
+    campo_sessao = "fotografo"
+    mensagem_protegida = "Não é possível excluir: o fotógrafo tem sessões cadastradas."
     extra_context = {"titulo": "Excluir fotógrafo",
                      'botao': 'Excluir'}
 
@@ -218,60 +281,444 @@ class SessaoDelete(UserOwnedQuerysetMixin, DeleteView):
             pk=self.kwargs["pk"],
             cadastrado_por=self.request.user,
         )
+
+    # exclusão lógica: uma cópia fica no arquivo (ver arquivo.py)
+    def form_valid(self, form):
+        arquivo.excluir(self.object)
+        return HttpResponseRedirect(self.get_success_url())
     
 
-class PortfolioDelete(LoginRequiredMixin, DeleteView):
+class PortfolioDelete(FotografoDoUsuarioMixin, LoginRequiredMixin, DeleteView):
     model = Portfolio
     template_name = "paginas/form.html"
     success_url = reverse_lazy("listar-portfolio")
     extra_context = {"titulo": "Excluir Foto do Portfólio", "botao": "Excluir"}
 
     def get_object(self, queryset=None):
-        fotografo = get_object_or_404(Fotografo, user=self.request.user)
-        return get_object_or_404(Portfolio, pk=self.kwargs["pk"], fotografo=fotografo)
+        return get_object_or_404(Portfolio, pk=self.kwargs["pk"], fotografo_id=self.get_fotografo_id())
 
 ############################################################################ LIST #############
 
 
-class ClienteList(LoginRequiredMixin, ListView):
+class ClienteList(LoginRequiredMixin, PaginacaoCursorMixin, ListView):
     model = Cliente
     template_name = "paginas/cliente_list.html"
     context_object_name = "objetos"
+    usar_replica = True  # ver banco.py
 
     def get_queryset(self):
+        qs = Cliente.objects.all()
         if self.request.user.is_superuser or self.request.user.is_staff:
-            return Cliente.objects.all()
-        return Cliente.objects.filter(user=self.request.user)
+            return qs
+        return qs.filter(user=self.request.user)
 
-class FotografoList(LoginRequiredMixin, ListView):
+class FotografoList(LoginRequiredMixin, PaginacaoCursorMixin, ListView):
     model = Fotografo
     template_name = "paginas/fotografo_list.html"
     context_object_name = "objetos"
+    usar_replica = True  # ver banco.py
 
     def get_queryset(self):
         return Fotografo.objects.filter(user=self.request.user)
 
-class SessaoList(UserOwnedQuerysetMixin, ListView):
+class SessaoList(UserOwnedQuerysetMixin, PaginacaoCursorMixin, ListView):
     model = Sessao
     template_name = "paginas/sessao_list.html"
     context_object_name = "objetos"
+    usar_replica = True  # ver banco.py
+    ordenacao_cursor = ("data", "horario", "pk")
 
-class PortfolioList(LoginRequiredMixin, ListView):
+    def get_queryset(self):
+        return super().get_queryset().para_listagem()
+
+    # ?arquivadas=1 inclui as sessões do arquivo (ver arquivo.py)
+    def incluir_arquivadas(self):
+        return self.request.GET.get("arquivadas") == "1"
+
+    def get_queryset_arquivadas(self):
+        return SessaoArquivada.objects.filter(cadastrado_por=self.request.user).para_listagem()
+
+    # as duas tabelas têm o mesmo índice (dono, data, horario, id): lê uma
+    # página de cada, a partir do mesmo cursor, e intercala
+    def paginate_queryset(self, queryset, page_size):
+        if not self.incluir_arquivadas():
+            return super().paginate_queryset(queryset, page_size)
+        ativas, montar = self.consulta_da_pagina(queryset, page_size)
+        arquivadas, _ = self.consulta_da_pagina(self.get_queryset_arquivadas(), page_size)
+        reverso = bool(self.request.GET.get("antes"))
+        itens = heapq.merge(ativas, arquivadas, key=self.chave_cursor, reverse=reverso)
+        return montar(list(islice(itens, page_size + 1)))
+
+    def get_context_data(self, **kwargs):
+        return super().get_context_data(arquivadas=self.incluir_arquivadas(), **kwargs)
+
+class PortfolioList(LoginRequiredMixin, PaginacaoCursorMixin, ListView):
     model = Portfolio
     template_name = "paginas/portfolio_list.html"
     context_object_name = "objetos"
+    usar_replica = True  # ver banco.py
 
     def get_queryset(self):
-        # Se recebe o ID de um fotografo busca só as fotos dele, se não, lista todos
+        # Filtros vêm da querystring e são aplicados no banco
+        qs = Portfolio.objects.para_listagem().com_link_quebrado()
+        # fotos com link quebrado (ver links.py) só aparecem para o dono, marcadas
+        qs = qs.filter(Q(link_quebrado=False) | Q(fotografo_id=self.request.principal.fotografo_id))
         fotografo_id = self.request.GET.get('fotografo')
-        if fotografo_id:
-            return Portfolio.objects.filter(fotografo__id=fotografo_id) 
-        return Portfolio.objects.all()
-        
-
-
-
-
+        if fotografo_id and fotografo_id.isdigit():
+            qs = qs.filter(fotografo__id=fotografo_id)
+        especialidade = self.request.GET.get('especialidade')
+        if especialidade:
+            qs = qs.filter(fotografo__especialidade=especialidade)
+        busca = self.request.GET.get('q', '').strip()
+        if busca:
+            qs = qs.filter(descricao__icontains=busca)
+        return qs
+
+    # Com ?parcial=1 devolve só os cards, usado pelo botão "Carregar mais"
+    def get_template_names(self):
+        if self.request.GET.get('parcial'):
+            return ["paginas/portfolio_cards.html"]
+        return super().get_template_names()
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        if not self.request.GET.get('parcial'):
+            context["fotografos"] = fotografos_para_filtro()
+            context["especialidades"] = especialidades_para_filtro()
+        return context
+
+
+# Versões assíncronas, usadas no ASGI (ver assincrono.py e urls.py)
+class FotografoListAsync(ListaAssincronaMixin, FotografoList):
+    pass
+
+
+class PortfolioListAsync(ListaAssincronaMixin, PortfolioList):
+
+    async def contexto_extra(self):
+        if self.request.GET.get('parcial'):
+            return {}
+        fotografos = await afotografos_para_filtro()
+        return {"fotografos": fotografos, "especialidades": especialidades_para_filtro(fotografos)}
+
+
+############################################################################ RELATÓRIOS #############
+
+# Receita, horas e conclusão por fotógrafo e mês, lidos das tabelas de resumo
+class RelatorioView(UserOwnedQuerysetMixin, ListView):
+    model = ResumoMensal
+    owner_field = "dono"
+    template_name = "paginas/relatorio.html"
+    context_object_name = "resumos"
+    usar_replica = True  # ver banco.py
+
+    def get_ano(self):
+        ano = self.request.GET.get("ano", "")
+        return int(ano) if ano.isdigit() and 1 <= int(ano) <= 9999 else timezone.localdate().year
 
+    def get_queryset(self):
+        return (
+            super().get_queryset()
+            .filter(mes__year=self.get_ano(), sessoes__gt=0)
+            .select_related("fotografo")
+            .order_by("fotografo__nome", "fotografo_id", "mes")
+        )
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        ano = self.get_ano()
+        context["ano"] = ano
+        context["totais"] = self.object_list.aggregate(
+            sessoes=Sum("sessoes"), finalizadas=Sum("finalizadas"), horas=Sum("horas"), receita=Sum("receita"),
+        )
+        context["melhores_clientes"] = (
+            ResumoCliente.objects.filter(dono=self.request.user, mes__year=ano)
+            .values("cliente_id", "cliente__nome")
+            .annotate(sessoes=Sum("sessoes"), receita=Sum("receita"))
+            .filter(sessoes__gt=0)
+            .order_by("-receita")[:10]
+        )
+        return context
+
+
+############################################################################ BUSCA #############
+
+# Busca em clientes, fotógrafos, sessões e fotos pelo índice de busca.py. Os
+# resultados passam pelo queryset da listagem de cada tipo, então valem as
+# mesmas regras de acesso das listagens
+class BuscaView(LoginRequiredMixin, TemplateView):
+    template_name = "paginas/busca.html"
+    limite = 10
+    listagens = [
+        ("cliente", "Clientes", ClienteList),
+        ("fotografo", "Fotógrafos", FotografoList),
+        ("sessao", "Sessões", SessaoList),
+        ("portfolio", "Portfólio", PortfolioList),
+    ]
+
+    # tipos em que a listagem mostra à equipe os objetos de todos os usuários
+    tipos_da_equipe = {"cliente"}
+
+    def resultados(self, termo):
+        user = self.request.user
+        equipe = user.is_staff or user.is_superuser
+        for tipo, titulo, listagem in self.listagens:
+            # o mesmo dono da listagem: sem ele, os resultados de outros usuários
+            # ocupariam os candidatos e a listagem depois os descartaria
+            dono_id = None if equipe and tipo in self.tipos_da_equipe else user.pk
+            # mais candidatos que o limite: a listagem ainda pode barrar alguns
+            ids = busca.buscar(termo, tipo, dono_id=dono_id, limite=self.limite * 3)
+            if not ids:
+                continue
+            view = listagem()
+            view.setup(self.request)
+            encontrados = view.get_queryset().in_bulk(ids)
+            objetos = [encontrados[pk] for pk in ids if pk in encontrados][:self.limite]
+            if objetos:
+                yield tipo, titulo, objetos
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        termo = self.request.GET.get("termo", "").strip()
+        context["termo"] = termo
+        context["resultados"] = list(self.resultados(termo)) if termo else []
+        return context
+
+
+############################################################################ EXPORTAR #############
+
+class ClienteExportar(ExportarCsvMixin, ClienteList):
+    nome_arquivo = "clientes.csv"
+    colunas = [("Nome", "nome"), ("Telefone", "telefone")]
+
+
+class SessaoExportar(ExportarCsvMixin, SessaoList):
+    nome_arquivo = "sessoes.csv"
+    colunas = [
+        ("Data", "data"),
+        ("Horário", "horario"),
+        ("Duração (h)", "duracao"),
+        ("Tipo", "tipo"),
+        ("Cliente", "cliente__nome"),
+        ("Telefone do cliente", "cliente__telefone"),
+        ("Fotógrafo", "fotografo__nome"),
+        ("Valor", "valor"),
+        ("Finalizado", "finalizado"),
+    ]
+
+    def querysets(self):
+        if self.incluir_arquivadas():
+            return [self.get_queryset(), self.get_queryset_arquivadas()]
+        return [self.get_queryset()]
+
+
+############################################################################ API #############
+
+class ClienteApi(ApiMixin, ClienteList):
+    campos = ("id", "nome", "telefone")
+
+
+class FotografoApi(ApiMixin, FotografoList):
+    campos = ("id", "nome", "especialidade", "telefone", "foto_perfil", "atualizado_em")
+
+
+class SessaoApi(ApiMixin, SessaoList):
+    campos = (
+        "id", "data", "horario", "duracao", "tipo", "valor", "finalizado",
+        "cliente_id", "fotografo_id", "atualizado_em",
+    )
+    embutidos = {
+        "cliente": Embutido("cliente_id", Cliente, ("id", "nome", "telefone")),
+        "fotografo": Embutido("fotografo_id", Fotografo, ("id", "nome", "especialidade", "foto_perfil")),
+    }
+
+    # a API lista só as sessões ativas
+    def incluir_arquivadas(self):
+        return False
+
+
+class PortfolioApi(ApiMixin, PortfolioList):
+    campos = ("id", "foto_url", "descricao", "fotografo_id", "link_quebrado", "atualizado_em")
+    embutidos = {
+        "fotografo": Embutido("fotografo_id", Fotografo, ("id", "nome", "especialidade", "foto_perfil")),
+    }
+
+
+############################################################################ IMPORTAR #############
+
+class ImportarView(GrupoRequeridoMixin, LoginRequiredMixin, FormView):
+    group_required = ["Admin"]
+    form_class = ImportacaoForm
+    template_name = "paginas/importar.html"
+    extra_context = {"titulo": "Importar CSV", "botao": "Importar"}
 
+    def form_valid(self, form):
+        importador = IMPORTADORES[form.cleaned_data["tipo"]](self.request.user)
+        try:
+            relatorio = importador.importar(form.cleaned_data["arquivo"].file)
+        except UnicodeDecodeError:
+            form.add_error("arquivo", "Não foi possível ler o arquivo: salve o CSV em UTF-8.")
+            return self.form_invalid(form)
+        return self.render_to_response(self.get_context_data(form=form, relatorio=relatorio))
+
+
+############################################################################ AGENDA #############
+
+# Blocos livres e ocupados de um fotógrafo no mês, usado pelo formulário de sessão
+# ?fotografo=<pk>&ano=<aaaa>&mes=<mm>
+class DisponibilidadeView(LoginRequiredMixin, View):
+
+    def ler_parametros(self):
+        fotografo_id = int(self.request.GET["fotografo"])
+        ano = int(self.request.GET["ano"])
+        mes = int(self.request.GET["mes"])
+        # a consulta vai um dia além do mês para os dois lados: nos anos 1 e
+        # 9999 isso sai do intervalo de datetime
+        if not (1 <= mes <= 12 and 2 <= ano <= 9998):
+            raise ValueError
+        return fotografo_id, ano, mes
+
+    def responder(self, dados):
+        if dados is None:
+            raise Http404("Fotógrafo não encontrado.")
+        return JsonResponse(dados)
+
+    def get(self, request):
+        try:
+            parametros = self.ler_parametros()
+        except (KeyError, ValueError):
+            return JsonResponse({"erro": "Informe fotografo, ano e mes."}, status=400)
+        return self.responder(disponibilidade_em_cache(*parametros))
+
+
+class DisponibilidadeAsync(ViewAssincronaMixin, DisponibilidadeView):
+
+    async def get(self, request):
+        try:
+            parametros = self.ler_parametros()
+        except (KeyError, ValueError):
+            return JsonResponse({"erro": "Informe fotografo, ano e mes."}, status=400)
+        return self.responder(await adisponibilidade_em_cache(*parametros))
+
+
+# Opções dos campos cliente e fotógrafo do formulário de sessão, em páginas
+# de 20. Com termo, usa o índice de busca (busca.py); sem termo, as mais recentes
+class OpcoesSessaoView(LoginRequiredMixin, View):
+    por_pagina = 20
+
+    def get(self, request, campo):
+        if campo not in ("cliente", "fotografo"):
+            raise Http404("Campo desconhecido.")
+        qs, dono_id = opcoes_da_sessao(campo, request.user)
+        termo = request.GET.get("termo", "").strip()
+        pagina = request.GET.get("pagina", "1")
+        pagina = int(pagina) if pagina.isdigit() and int(pagina) > 0 else 1
+        inicio = (pagina - 1) * self.por_pagina
+
+        # um a mais que a página para saber se existe a próxima
+        if busca.termos(termo):
+            ids = busca.buscar(termo, campo, dono_id=dono_id, limite=self.por_pagina + 1, deslocamento=inicio)
+            encontrados = qs.in_bulk(ids[:self.por_pagina])
+            objetos = [encontrados[pk] for pk in ids[:self.por_pagina] if pk in encontrados]
+            tem_mais = len(ids) > self.por_pagina
+        else:
+            objetos = list(qs.order_by("-pk")[inicio:inicio + self.por_pagina + 1])
+            tem_mais = len(objetos) > self.por_pagina
+            objetos = objetos[:self.por_pagina]
+
+        proxima = None
+        if tem_mais:
+            parametros = request.GET.copy()
+            parametros["pagina"] = pagina + 1
+            proxima = f"{request.path}?{parametros.urlencode()}"
+        return JsonResponse({
+            "resultados": [{"id": obj.pk, "texto": str(obj)} for obj in objetos],
+            "proxima": proxima,
+        })
+
+
+# Feed .ics das sessões de um fotógrafo. O token na URL substitui o login,
+# já que aplicativos de calendário não mandam cookies. A resposta 304 custa
+# uma consulta por chave primária, sem tocar nas sessões
+class AgendaFotografoView(View):
+
+    def get(self, request, token):
+        try:
+            fotografo_id = signing.loads(token, salt="paginas.agenda")
+        except signing.BadSignature:
+            raise Http404("Agenda não encontrada.")
+        fotografo = Fotografo.objects.filter(pk=fotografo_id).values("nome", "agenda_atualizada_em").first()
+        if fotografo is None:
+            raise Http404("Agenda não encontrada.")
+
+        atualizada_em = fotografo["agenda_atualizada_em"]
+        desde, janela_andou_em = janela()
+        etag = quote_etag(f"{fotografo_id}-{atualizada_em.timestamp():.6f}-{desde.date().isoformat()}")
+        ultima_modificacao = int(max(atualizada_em, janela_andou_em).timestamp())
+        resposta = get_conditional_response(request, etag=etag, last_modified=ultima_modificacao)
+        if resposta is None:
+            resposta = StreamingHttpResponse(
+                gerar_ics(fotografo_id, fotografo["nome"], desde), content_type="text/calendar; charset=utf-8"
+            )
+        resposta["ETag"] = etag
+        resposta["Last-Modified"] = http_date(ultima_modificacao)
+        resposta["Cache-Control"] = "private, no-cache"
+        return resposta
+
+
+############################################################################ MINIATURAS #############
+
+# Miniatura de uma foto externa (ver miniaturas.py). O arquivo gerado nunca
+# muda para a mesma URL, então pode ficar um ano no cache do navegador. Se a
+# origem falhar, redireciona para ela
+class MiniaturaView(View):
+
+    def get(self, request, variante, token):
+        if variante not in miniaturas.VARIANTES:
+            raise Http404("Variante desconhecida.")
+        try:
+            origem = miniaturas.ler_token(token)
+        except signing.BadSignature:
+            raise Http404("Miniatura não encontrada.")
+
+        formato = "webp" if "image/webp" in request.headers.get("Accept", "") else "jpg"
+        try:
+            arquivo = miniaturas.obter(origem, variante, formato)
+            conteudo = open(arquivo, "rb")
+        except (miniaturas.OrigemIndisponivel, FileNotFoundError):
+            resposta = HttpResponseRedirect(origem)
+            resposta["Cache-Control"] = f"public, max-age={miniaturas.TEMPO_FALHA}"
+            return resposta
+
+        etag = quote_etag(arquivo.name)
+        resposta = get_conditional_response(request, etag=etag)
+        if resposta is not None:
+            conteudo.close()
+        else:
+            resposta = FileResponse(conteudo, content_type=miniaturas.FORMATOS[formato][1])
+        resposta["ETag"] = etag
+        resposta["Cache-Control"] = "public, max-age=31536000, immutable"
+        resposta["Vary"] = "Accept"
+        return resposta
+
+
+############################################################################ MÉTRICAS #############
+
+# Métricas por rota (ver metricas.py), em JSON ou, com ?formato=prometheus, no
+# formato texto do Prometheus. Só para a equipe (is_staff) ou para quem mandar
+# "Authorization: Bearer <PAGINAS_METRICAS_TOKEN>", como o coletor do Prometheus
+class MetricasView(View):
+
+    def dispatch(self, request, *args, **kwargs):
+        token = getattr(settings, "PAGINAS_METRICAS_TOKEN", "")
+        autorizado = request.user.is_staff or (
+            token and constant_time_compare(request.headers.get("Authorization", ""), f"Bearer {token}")
+        )
+        if not autorizado:
+            raise PermissionDenied
+        return super().dispatch(request, *args, **kwargs)
+
+    def get(self, request):
+        if request.GET.get("formato") == "prometheus":
+            return HttpResponse(registro.prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8")
+        return JsonResponse(registro.resumo())
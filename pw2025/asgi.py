@@ -5,6 +5,14 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
+
+Works with any ASGI server, for example:
+
+    uvicorn pw2025.asgi:application --workers 4
+    daphne pw2025.asgi:application
+    gunicorn pw2025.asgi:application -k uvicorn.workers.UvicornWorker
+
+app.yaml has the configuration used in deployment.
 """
 
 import os
@@ -12,5 +20,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "pw2025.settings")
+# usa as views assíncronas (ver PAGINAS_ASYNC em settings.py)
+os.environ.setdefault("PAGINAS_ASYNC", "1")
 
 application = get_asgi_application()
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -46,11 +47,14 @@ CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
 CRISPY_TEMPLATE_PACK = "bootstrap5"
 
 MIDDLEWARE = [
+    "paginas.metricas.MetricasMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "paginas.acesso.PrincipalMiddleware",
+    "paginas.banco.ReplicaMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -79,14 +83,166 @@ WSGI_APPLICATION = "pw2025.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+# PAGINAS_BANCO escolhe o banco: "sqlite" (padrão) ou "postgres".
+# No PostgreSQL as conexões são reaproveitadas entre requisições
+# (CONN_MAX_AGE) e testadas antes do uso (CONN_HEALTH_CHECKS); para um pool
+# compartilhado entre processos, coloque um PgBouncer na frente.
+
+PAGINAS_BANCO = os.environ.get("PAGINAS_BANCO", "sqlite")
+
+if PAGINAS_BANCO == "postgres":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": os.environ.get("POSTGRES_DB", "pw2025"),
+            "USER": os.environ.get("POSTGRES_USER", "pw2025"),
+            "PASSWORD": os.environ.get("POSTGRES_PASSWORD", ""),
+            "HOST": os.environ.get("POSTGRES_HOST", "127.0.0.1"),
+            "PORT": os.environ.get("POSTGRES_PORT", "5432"),
+            "CONN_MAX_AGE": int(os.environ.get("POSTGRES_CONN_MAX_AGE", 60)),
+            "CONN_HEALTH_CHECKS": True,
+        }
     }
+else:
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.environ.get("SQLITE_ARQUIVO", BASE_DIR / "db.sqlite3"),
+            "CONN_MAX_AGE": int(os.environ.get("SQLITE_CONN_MAX_AGE", 0)),
+        }
+    }
+
+# Réplica só de leitura para as listagens e relatórios (paginas/banco.py):
+# POSTGRES_REPLICA_HOST no PostgreSQL ou SQLITE_REPLICA_ARQUIVO no SQLite.
+# Para testar localmente com dois arquivos SQLite, rode junto
+# "python manage.py replicar_sqlite --intervalo 2", que faz o papel da replicação
+if PAGINAS_BANCO == "postgres" and os.environ.get("POSTGRES_REPLICA_HOST"):
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "HOST": os.environ["POSTGRES_REPLICA_HOST"],
+        "PORT": os.environ.get("POSTGRES_REPLICA_PORT", DATABASES["default"]["PORT"]),
+    }
+elif PAGINAS_BANCO != "postgres" and os.environ.get("SQLITE_REPLICA_ARQUIVO"):
+    DATABASES["replica"] = {**DATABASES["default"], "NAME": os.environ["SQLITE_REPLICA_ARQUIVO"]}
+
+if "replica" in DATABASES:
+    # nos testes a réplica é o próprio banco de teste
+    DATABASES["replica"]["TEST"] = {"MIRROR": "default"}
+
+PAGINAS_REPLICAS = [alias for alias in DATABASES if alias != "default"]
+DATABASE_ROUTERS = ["paginas.banco.RoteadorReplica"]
+
+# Segundos em que o usuário lê do principal depois de um POST
+PAGINAS_REPLICA_JANELA = int(os.environ.get("PAGINAS_REPLICA_JANELA", 10))
+
+# PRAGMAs aplicados em cada conexão SQLite (paginas/banco.py). Com WAL os
+# leitores não esperam as escritas, e synchronous=NORMAL só sincroniza o
+# disco nos checkpoints, o que é seguro com WAL (uma queda de energia pode
+# perder as últimas transações, mas não corrompe o banco)
+PAGINAS_SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": int(os.environ.get("SQLITE_BUSY_TIMEOUT", 5000)),
+    "mmap_size": int(os.environ.get("SQLITE_MMAP_SIZE", 128 * 1024 * 1024)),
+    "temp_store": "MEMORY",
 }
 
 
+# Métricas por rota (paginas/metricas.py), em /metricas/ para a equipe.
+# O custo é um cronômetro por requisição e um contador por consulta SQL
+PAGINAS_METRICAS = os.environ.get("PAGINAS_METRICAS", "1") == "1"
+PAGINAS_METRICAS_AMOSTRAS = 1000  # medições guardadas por rota para os percentis
+PAGINAS_METRICAS_REPETICOES = 5  # mesma consulta N vezes na requisição = suspeita de N+1
+PAGINAS_METRICAS_TOKEN = os.environ.get("PAGINAS_METRICAS_TOKEN", "")  # para o Prometheus
+
+
+# Miniaturas das fotos externas (paginas/miniaturas.py): pasta e tamanho
+# máximo em bytes; passando disso, as usadas há mais tempo são apagadas
+PAGINAS_MINIATURAS_DIR = os.environ.get("PAGINAS_MINIATURAS_DIR", BASE_DIR / "cache" / "miniaturas")
+PAGINAS_MINIATURAS_LIMITE = int(os.environ.get("PAGINAS_MINIATURAS_LIMITE", 500 * 1024 * 1024))
+
+
+# Verificador de links (paginas/links.py): conexões abertas ao mesmo tempo,
+# no total e por servidor, e intervalo mínimo em segundos entre dois pedidos
+# ao mesmo servidor
+PAGINAS_LINKS_CONEXOES = 20
+PAGINAS_LINKS_POR_HOST = 2
+PAGINAS_LINKS_INTERVALO = 0.5
+
+
+# Fila de tarefas (paginas/tarefas.py): tarefas executadas ao mesmo tempo por
+# "manage.py trabalhador", espera em segundos quando a fila está vazia e
+# tempo em segundos depois do qual uma tarefa em execução é dada como perdida
+# e volta para a fila. O trabalhador precisa estar rodando em produção (o
+# serviço do trabalhador.yaml); sem ele as tarefas só se acumulam. Ele e o
+# site precisam ver o mesmo banco, então fora do desenvolvimento use
+# PAGINAS_BANCO=postgres: o SQLite é local de cada máquina.
+# PAGINAS_TAREFAS_SINCRONAS roda as tarefas no próprio processo, no commit,
+# sem trabalhador
+PAGINAS_TAREFAS_CONCORRENCIA = int(os.environ.get("PAGINAS_TAREFAS_CONCORRENCIA", 4))
+PAGINAS_TAREFAS_INTERVALO = 1.0
+PAGINAS_TAREFAS_TEMPO_LIMITE = 10 * 60
+PAGINAS_TAREFAS_SINCRONAS = os.environ.get("PAGINAS_TAREFAS_SINCRONAS") == "1"
+
+
+# Lembretes de sessões (paginas/lembretes.py): antecedência em horas, backend
+# ("email" ou "webhook", que recebe POSTs em JSON), conexões abertas ao mesmo
+# tempo e mensagens por lote
+PAGINAS_LEMBRETES_HORAS = 24
+PAGINAS_LEMBRETES_BACKEND = os.environ.get("PAGINAS_LEMBRETES_BACKEND", "email")
+PAGINAS_LEMBRETES_WEBHOOK_URL = os.environ.get("PAGINAS_LEMBRETES_WEBHOOK_URL", "")
+PAGINAS_LEMBRETES_CONEXOES = 4
+PAGINAS_LEMBRETES_LOTE = 100
+
+# E-mail. Em desenvolvimento, um servidor SMTP local que só mostra as
+# mensagens: python -m aiosmtpd -n -l localhost:1025
+EMAIL_HOST = os.environ.get("EMAIL_HOST", "localhost")
+EMAIL_PORT = int(os.environ.get("EMAIL_PORT", 1025))
+EMAIL_HOST_USER = os.environ.get("EMAIL_HOST_USER", "")
+EMAIL_HOST_PASSWORD = os.environ.get("EMAIL_HOST_PASSWORD", "")
+EMAIL_USE_TLS = os.environ.get("EMAIL_USE_TLS") == "1"
+DEFAULT_FROM_EMAIL = os.environ.get("DEFAULT_FROM_EMAIL", "lembretes@pw2025.local")
+
+
+# Views assíncronas no lugar das síncronas (listagens de portfólio e de
+# fotógrafos e disponibilidade). Ligado por pw2025/asgi.py: no WSGI cada
+# view assíncrona ganharia um loop próprio e ficaria mais lenta
+PAGINAS_ASYNC = os.environ.get("PAGINAS_ASYNC") == "1"
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# PAGINAS_CACHE escolhe o backend: "memoria" (padrão, um cache por processo),
+# "arquivo" (compartilhado entre processos da mesma máquina) ou "redis".
+# Com mais de um processo use "arquivo" ou "redis", senão a invalidação
+# feita por um processo não chega aos outros
+
+PAGINAS_CACHE = os.environ.get("PAGINAS_CACHE", "memoria")
+
+if PAGINAS_CACHE == "redis":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ.get("PAGINAS_CACHE_URL", "redis://127.0.0.1:6379/1"),
+        }
+    }
+elif PAGINAS_CACHE == "arquivo":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.environ.get("PAGINAS_CACHE_DIR", BASE_DIR / "cache"),
+            "OPTIONS": {"MAX_ENTRIES": 10000},
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "OPTIONS": {"MAX_ENTRIES": 10000},
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -133,3 +289,6 @@ LOGIN_REDIRECT_URL = '/'
 LOGIN_URL = 'login'
 LOGOUT_REDIRECT_URL = 'login'
 
+# Por quanto tempo (segundos) os grupos, clientes e fotógrafo do usuário ficam
+# em cache entre requisições. 0 desliga o cache e recarrega a cada requisição
+PAGINAS_PRINCIPAL_TIMEOUT = 60 * 15